@@ -0,0 +1,290 @@
+"""Backtest the patterns over every historical bar of the stored universe.
+
+    python backtest.py -p "15% Reversal" -i 1d -e NSE --fetch 5y
+    python backtest.py -i 1h --horizon 7 --horizon 35 -o backtest.json
+
+Each condition is evaluated at every bar at once with rolling-window array
+operations (see Condition.vectorized), so a ticker costs a handful of numpy
+calls instead of one detect_pattern call per bar. A signal is the first bar of
+a run of matches; for each one the forward N-bar return and the drawdown
+(lowest low over those N bars against the signal close) are collected, and
+every bar's forward return is the baseline the signals are compared with.
+"""
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytz
+from numpy.lib.stride_tricks import sliding_window_view
+
+from bar_store import get_bar_store
+from conditions import PATTERNS, get_pattern
+from indicators import average_true_range
+from universe_cache import get_universe
+
+DEFAULT_HORIZONS = (5, 10, 20)
+INTERVALS = ["1d", "1h", "30m", "15m", "5d"]
+
+def _window_sums(values, size):
+    sums = np.concatenate([[0.0], np.cumsum(values)])
+    return sums[size:] - sums[:-size]
+
+class BarArrays:
+    """A history() frame as float arrays with the rolling-window helpers the vectorized checks use"""
+
+    def __init__(self, data):
+        self.n = len(data)
+        self.high = data['High'].to_numpy(dtype=np.float64)
+        self.low = data['Low'].to_numpy(dtype=np.float64)
+        self.close = data['Close'].to_numpy(dtype=np.float64)
+        self.volume = data['Volume'].to_numpy(dtype=np.float64)
+        # The batch checks read the same pandas rolling mean
+        self.atr = np.asarray(average_true_range(data), dtype=np.float64)
+        self._close_ewm = None
+
+    def shift(self, values, periods):
+        """values[t - periods] at t, NaN before the start"""
+        shifted = np.full(self.n, np.nan)
+        if periods < self.n:
+            shifted[periods:] = values[:self.n - periods]
+        return shifted
+
+    def rolling(self, values, size, how, lag=0):
+        """Reduce the size bars ending lag bars before each bar.
+
+        how is 'max', 'min' or 'mean' (NaN skipped, like pandas), 'strict_min'
+        (NaN propagates) or 'all'/'any' over a bool array. Bars without a full
+        window get NaN, or False for 'all'/'any'.
+        """
+        boolean = how in ('all', 'any')
+        result = np.zeros(self.n, dtype=bool) if boolean else np.full(self.n, np.nan)
+        first = size - 1 + lag
+        if first >= self.n:
+            return result
+        values = values[:self.n - lag]
+        if how in ('all', 'any', 'mean'):
+            # Window sums from cumulative sums: O(n) whatever the window size
+            if how == 'mean':
+                present = ~np.isnan(values)
+                counts = _window_sums(present.astype(np.float64), size)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    reduced = np.where(counts > 0, _window_sums(np.where(present, values, 0.0), size) / counts, np.nan)
+            else:
+                hits = _window_sums(values.astype(np.float64), size)
+                reduced = hits == size if how == 'all' else hits > 0
+        else:
+            windows = sliding_window_view(values, size)
+            if how == 'max':
+                reduced = np.fmax.reduce(windows, axis=1)
+            elif how == 'min':
+                reduced = np.fmin.reduce(windows, axis=1)
+            elif how == 'strict_min':
+                reduced = windows.min(axis=1)
+            else:
+                raise ValueError(f"Unknown rolling reduction: {how}")
+        result[first:] = reduced
+        return result
+
+    def trailing(self, values, size):
+        """(n, size) array of the size values ending at each bar, NaN-padded at the start"""
+        padded = np.concatenate([np.full(size - 1, np.nan), values])
+        return sliding_window_view(padded, size)
+
+    def window_ema(self, span, window, size):
+        """(n, size) array: the last size values of an adjust=False EMA of Close seeded
+        at the first of the window bars ending at each bar (what ema(tail=window) gives).
+
+        An EMA seeded at bar s differs from the whole-series EMA by the seed gap
+        decayed since s, so every window follows from one ewm pass. Windows with
+        a missing close are recomputed with pandas, which handles NaN its own way.
+        """
+        if self._close_ewm is None:
+            self._close_ewm = pd.Series(self.close).ewm(span=span, adjust=False).mean().to_numpy()
+        ewm = self._close_ewm
+        decay = 1 - 2.0 / (span + 1)
+        bars = np.arange(self.n)
+        seed = np.maximum(bars - window + 1, 0)
+        gap = self.close[seed] - ewm[seed]
+        positions = bars[:, None] - np.arange(size - 1, -1, -1)[None, :]
+        valid = positions >= 0
+        positions = np.where(valid, positions, 0)
+        powers = decay ** np.arange(window)
+        values = np.where(valid, powers[np.maximum(positions - seed[:, None], 0)] * gap[:, None] + ewm[positions], np.nan)
+        missing = np.isnan(self.close)
+        if missing.any():
+            for bar in np.flatnonzero(np.convolve(missing, np.ones(window), mode='full')[:self.n] > 0):
+                tail = pd.Series(self.close[seed[bar]:bar + 1]).ewm(span=span, adjust=False).mean().to_numpy()[-size:]
+                values[bar, size - len(tail):] = tail
+        return values
+
+def pattern_matches(bars, pattern, cache=None):
+    """Bool array: does pattern match on data[:t + 1] at each bar t.
+
+    cache ({condition name: array}) lets several patterns share condition results.
+    """
+    cache = {} if cache is None else cache
+    matched = np.arange(bars.n) >= pattern.min_bars - 1
+    for condition in pattern.conditions:
+        if condition.vectorized is None:
+            raise ValueError(f"Condition {condition.name} has no vectorized check")
+        if condition.name not in cache:
+            cache[condition.name] = condition.vectorized(bars)
+        matched &= cache[condition.name]
+    return matched
+
+def forward_returns(bars, horizon):
+    """(return, drawdown) at each bar over the next horizon bars; NaN where the history ends too early"""
+    returns = np.full(bars.n, np.nan)
+    drawdowns = np.full(bars.n, np.nan)
+    if horizon < bars.n:
+        returns[:bars.n - horizon] = bars.close[horizon:] / bars.close[:bars.n - horizon] - 1
+        lowest = bars.rolling(bars.low, horizon, 'min')
+        drawdowns[:bars.n - horizon] = np.minimum(lowest[horizon:] / bars.close[:bars.n - horizon] - 1, 0.0)
+    return returns, drawdowns
+
+def backtest_frame(data, patterns, horizons=DEFAULT_HORIZONS):
+    """Signals and forward outcomes of each pattern over one ticker's history.
+
+    Returns {pattern name: {'matched_bars', 'signals', horizon: (returns, drawdowns)
+    at the signal bars}} plus a 'baseline' entry with every bar's forward returns.
+    """
+    bars = BarArrays(data)
+    cache = {}
+    outcomes = {horizon: forward_returns(bars, horizon) for horizon in horizons}
+    result = {'baseline': {horizon: outcomes[horizon][0] for horizon in horizons}}
+    for pattern in patterns:
+        matched = pattern_matches(bars, pattern, cache)
+        signals = matched & ~np.concatenate([[False], matched[:-1]])
+        result[pattern.name] = {'matched_bars': int(matched.sum()), 'signals': int(signals.sum())}
+        for horizon in horizons:
+            returns, drawdowns = outcomes[horizon]
+            result[pattern.name][horizon] = (returns[signals], drawdowns[signals])
+    return result
+
+def _summarize(returns, drawdowns):
+    usable = ~np.isnan(returns)
+    returns, drawdowns = returns[usable], drawdowns[usable]
+    if not len(returns):
+        return {'evaluated': 0, 'hit_rate': None, 'mean_return': None, 'median_return': None,
+                'mean_drawdown': None, 'worst_drawdown': None}
+    return {
+        'evaluated': int(len(returns)),
+        'hit_rate': float((returns > 0).mean()),
+        'mean_return': float(returns.mean()),
+        'median_return': float(np.median(returns)),
+        'mean_drawdown': float(drawdowns.mean()),
+        'worst_drawdown': float(drawdowns.min())
+    }
+
+def run_backtest(frames, pattern_names, interval, horizons=DEFAULT_HORIZONS):
+    """Backtest patterns over {ticker: frame}; returns one report row per (pattern, horizon)"""
+    patterns = [get_pattern(name) for name in pattern_names]
+    frames = {ticker: data for ticker, data in frames.items() if data is not None and not data.empty}
+    results = {ticker: backtest_frame(data, patterns, horizons) for ticker, data in frames.items()}
+
+    rows = []
+    for horizon in horizons:
+        baseline = np.concatenate([result['baseline'][horizon] for result in results.values()] or [np.array([])])
+        baseline = baseline[~np.isnan(baseline)]
+        for pattern in patterns:
+            per_ticker = [result[pattern.name] for result in results.values()]
+            empty = np.array([])
+            returns = np.concatenate([entry[horizon][0] for entry in per_ticker] or [empty])
+            drawdowns = np.concatenate([entry[horizon][1] for entry in per_ticker] or [empty])
+            rows.append(dict({
+                'pattern': pattern.name,
+                'interval': interval,
+                'horizon': horizon,
+                'tickers': len(per_ticker),
+                'tickers_with_signals': sum(1 for entry in per_ticker if entry['signals']),
+                'matched_bars': sum(entry['matched_bars'] for entry in per_ticker),
+                'signals': sum(entry['signals'] for entry in per_ticker),
+                'baseline_hit_rate': float((baseline > 0).mean()) if len(baseline) else None,
+                'baseline_mean_return': float(baseline.mean()) if len(baseline) else None
+            }, **_summarize(returns, drawdowns)))
+    return rows
+
+def load_frames(tickers, interval):
+    """Every stored bar of each ticker from the bar store"""
+    store = get_bar_store()
+    frames = {}
+    for ticker in tickers:
+        try:
+            frames[ticker] = store.get_bars(ticker, interval)
+        except Exception as e:
+            print(f"Error reading stored bars for {ticker}: {e}")
+    return frames
+
+def _percent(value):
+    return "-" if value is None else f"{value * 100:.2f}%"
+
+def format_report(rows):
+    header = (f"{'pattern':<28}{'interval':<9}{'horizon':>8}{'signals':>9}{'tickers':>9}{'hit rate':>10}"
+              f"{'mean ret':>10}{'median':>10}{'mean dd':>10}{'worst dd':>10}{'base hit':>10}{'base ret':>10}")
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(
+            f"{row['pattern']:<28}{row['interval']:<9}{row['horizon']:>8}{row['signals']:>9}{row['tickers_with_signals']:>9}"
+            f"{_percent(row['hit_rate']):>10}{_percent(row['mean_return']):>10}{_percent(row['median_return']):>10}"
+            f"{_percent(row['mean_drawdown']):>10}{_percent(row['worst_drawdown']):>10}"
+            f"{_percent(row['baseline_hit_rate']):>10}{_percent(row['baseline_mean_return']):>10}"
+        )
+    return "\n".join(lines)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest pattern signals over the stored price history.")
+    parser.add_argument("-p", "--pattern", action="append", help="Pattern name (repeatable, default: every pattern)")
+    parser.add_argument("-i", "--interval", action="append", choices=INTERVALS, help="Interval (repeatable, default: 1d)")
+    parser.add_argument("-e", "--exchange", choices=["NSE", "NIFTY50", "ALL"], default="NSE")
+    parser.add_argument("--horizon", type=int, action="append", help="Forward bars to measure (repeatable, default: 5, 10, 20)")
+    parser.add_argument("--fetch", metavar="PERIOD", help="Download this much history (e.g. 5y) into the bar store first")
+    parser.add_argument("--limit", type=int, help="Backtest only the first N tickers of the universe")
+    parser.add_argument("-o", "--output", help="Write the report rows to this JSON file")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    patterns = []
+    for name in args.pattern or [pattern.name for pattern in PATTERNS.values()]:
+        pattern = get_pattern(name)
+        if pattern is None:
+            print(f"Unknown pattern: {name}. Choose from: {', '.join(p.name for p in PATTERNS.values())}")
+            return 2
+        patterns.append(pattern.name)
+    horizons = sorted(set(args.horizon or DEFAULT_HORIZONS))
+
+    tickers = get_universe(args.exchange, offline=not args.fetch)
+    if args.limit:
+        tickers = tickers[:args.limit]
+    if not tickers:
+        print(f"No tickers available for {args.exchange}")
+        return 1
+
+    rows = []
+    for interval in args.interval or ["1d"]:
+        if args.fetch:
+            from fetch_data import fetch_history_batch
+            print(f"Downloading {args.fetch} of {interval} history for {len(tickers)} tickers...")
+            fetch_history_batch(tickers, interval, args.fetch)
+        started = time.perf_counter()
+        frames = load_frames(tickers, interval)
+        loaded = time.perf_counter()
+        interval_rows = run_backtest(frames, patterns, interval, horizons)
+        bars = sum(len(data) for data in frames.values())
+        print(f"{interval}: {bars} bars of {sum(1 for data in frames.values() if not data.empty)} tickers, "
+              f"loaded in {loaded - started:.1f}s, backtested in {time.perf_counter() - loaded:.1f}s")
+        rows.extend(interval_rows)
+
+    print()
+    print(format_report(rows))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'generated_at': datetime.now(pytz.UTC).isoformat(), 'rows': rows}, f, indent=2)
+        print(f"Wrote {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+import pandas as pd
+import pytz
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+_SQL_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'dividends', 'splits']
+
+class BarStore:
+    """Persistent per-(ticker, interval) OHLCV bars in a local SQLite file.
+
+    Bars are keyed by their UTC timestamp, so appending an overlapping fetch
+    simply replaces the bars it repeats (e.g. a still-forming last candle).
+    The fetch_memo table remembers, per (ticker, interval), the last period
+    that returned data and when a ticker that keeps returning nothing may be
+    tried again.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.environ.get("SCANNER_BAR_STORE", os.path.join("data", "ohlcv.sqlite"))
+        self._local = threading.local()
+        self.ensure_schema()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def ensure_schema(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS bars (
+                    ticker TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    open REAL, high REAL, low REAL, close REAL,
+                    volume REAL, dividends REAL, splits REAL,
+                    PRIMARY KEY (ticker, interval, ts)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS series (
+                    ticker TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    tz TEXT,
+                    index_name TEXT,
+                    period TEXT,
+                    has_period_issues INTEGER NOT NULL DEFAULT 0,
+                    last_ts INTEGER,
+                    updated_at TEXT,
+                    PRIMARY KEY (ticker, interval)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS fetch_memo (
+                    ticker TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    period TEXT,
+                    has_period_issues INTEGER NOT NULL DEFAULT 0,
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    retry_at TEXT,
+                    last_error TEXT,
+                    updated_at TEXT,
+                    PRIMARY KEY (ticker, interval)
+                )
+            """)
+
+    def get_series_info(self, ticker, interval):
+        row = self._connect().execute(
+            "SELECT tz, index_name, period, has_period_issues, last_ts, updated_at FROM series WHERE ticker = ? AND interval = ?",
+            (ticker, interval)
+        ).fetchone()
+        if row is None or row[4] is None:
+            return None
+        return {
+            'tz': row[0],
+            'index_name': row[1],
+            'period': row[2],
+            'has_period_issues': bool(row[3]),
+            'last_timestamp': pd.Timestamp(row[4], unit='ns', tz='UTC').tz_convert(row[0] or 'UTC'),
+            'updated_at': row[5]
+        }
+
+    def append_bars(self, ticker, interval, data, period=None, has_period_issues=False):
+        """Upsert the bars in a history()-shaped frame and update the series metadata."""
+        if data is None or data.empty:
+            return
+        index = pd.DatetimeIndex(data.index)
+        tz = str(index.tz) if index.tz is not None else None
+        utc_index = index.tz_convert('UTC') if index.tz is not None else index.tz_localize('UTC')
+        timestamps = utc_index.astype('datetime64[ns, UTC]').asi8.tolist()
+        columns = [
+            data[column].astype('float64').tolist() if column in data.columns else [0.0] * len(data)
+            for column in BAR_COLUMNS
+        ]
+        rows = [
+            (ticker, interval, ts, *values)
+            for ts, values in zip(timestamps, zip(*columns))
+        ]
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO bars (ticker, interval, ts, {', '.join(_SQL_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.execute("""
+                INSERT INTO series (ticker, interval, tz, index_name, period, has_period_issues, last_ts, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (ticker, interval) DO UPDATE SET
+                    tz = excluded.tz,
+                    index_name = excluded.index_name,
+                    period = COALESCE(excluded.period, series.period),
+                    has_period_issues = CASE WHEN excluded.period IS NULL THEN series.has_period_issues ELSE excluded.has_period_issues END,
+                    last_ts = MAX(COALESCE(series.last_ts, 0), excluded.last_ts),
+                    updated_at = excluded.updated_at
+            """, (
+                ticker, interval, tz, data.index.name, period, int(bool(has_period_issues)),
+                max(timestamps), datetime.now(pytz.UTC).isoformat()
+            ))
+
+    def get_bars(self, ticker, interval, since=None):
+        """Load stored bars as a history()-shaped frame, optionally only those at or after since."""
+        info = self.get_series_info(ticker, interval)
+        if info is None:
+            return pd.DataFrame()
+        query = f"SELECT ts, {', '.join(_SQL_COLUMNS)} FROM bars WHERE ticker = ? AND interval = ?"
+        params = [ticker, interval]
+        if since is not None:
+            since = pd.Timestamp(since)
+            since = since.tz_convert('UTC') if since.tzinfo is not None else since.tz_localize('UTC')
+            query += " AND ts >= ?"
+            params.append(since.value)
+        query += " ORDER BY ts"
+        rows = self._connect().execute(query, params).fetchall()
+        if not rows:
+            return pd.DataFrame()
+        frame = pd.DataFrame.from_records(rows, columns=['ts'] + BAR_COLUMNS)
+        index = pd.DatetimeIndex(pd.to_datetime(frame.pop('ts'), unit='ns', utc=True))
+        index = index.tz_convert(info['tz']) if info['tz'] else index.tz_localize(None)
+        index.name = info['index_name']
+        frame.index = index
+        frame['Volume'] = frame['Volume'].fillna(0).astype('int64')
+        return frame
+
+    def get_fetch_memos(self, tickers, interval):
+        """{ticker: memo} for the tickers with a fetch memo; retry_at and updated_at are UTC datetimes or None"""
+        memos = {}
+        tickers = list(tickers)
+        conn = self._connect()
+        for start in range(0, len(tickers), 500):
+            chunk = tickers[start:start + 500]
+            rows = conn.execute(
+                f"SELECT ticker, period, has_period_issues, failures, retry_at, last_error, updated_at FROM fetch_memo WHERE interval = ? AND ticker IN ({', '.join('?' * len(chunk))})",
+                [interval, *chunk]
+            ).fetchall()
+            for row in rows:
+                memos[row[0]] = {
+                    'period': row[1],
+                    'has_period_issues': bool(row[2]),
+                    'failures': row[3],
+                    'retry_at': datetime.fromisoformat(row[4]) if row[4] else None,
+                    'last_error': row[5],
+                    'updated_at': datetime.fromisoformat(row[6]) if row[6] else None
+                }
+        return memos
+
+    def get_fetch_memo(self, ticker, interval):
+        return self.get_fetch_memos([ticker], interval).get(ticker)
+
+    def remember_period(self, ticker, interval, period, has_period_issues=False):
+        """Record the period that just returned data, clearing any failure streak"""
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO fetch_memo (ticker, interval, period, has_period_issues, failures, retry_at, last_error, updated_at)
+                VALUES (?, ?, ?, ?, 0, NULL, NULL, ?)
+            """, (ticker, interval, period, int(bool(has_period_issues)), datetime.now(pytz.UTC).isoformat()))
+
+    def record_fetch_failure(self, ticker, interval, retry_delay, error=None):
+        """Extend the failure streak of a ticker that returned nothing.
+
+        retry_delay(failures) gives the seconds until the next attempt; returns
+        the new retry time.
+        """
+        now = datetime.now(pytz.UTC)
+        conn = self._connect()
+        with conn:
+            row = conn.execute(
+                "SELECT failures FROM fetch_memo WHERE ticker = ? AND interval = ?", (ticker, interval)
+            ).fetchone()
+            failures = (row[0] if row else 0) + 1
+            retry_at = now + timedelta(seconds=retry_delay(failures))
+            conn.execute("""
+                INSERT INTO fetch_memo (ticker, interval, failures, retry_at, last_error, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (ticker, interval) DO UPDATE SET
+                    failures = excluded.failures,
+                    retry_at = excluded.retry_at,
+                    last_error = excluded.last_error,
+                    updated_at = excluded.updated_at
+            """, (ticker, interval, failures, retry_at.isoformat(), error, now.isoformat()))
+        return retry_at
+
+    def delete_series(self, ticker, interval):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM bars WHERE ticker = ? AND interval = ?", (ticker, interval))
+            conn.execute("DELETE FROM series WHERE ticker = ? AND interval = ?", (ticker, interval))
+            conn.execute("DELETE FROM fetch_memo WHERE ticker = ? AND interval = ?", (ticker, interval))
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_bar_store():
+    """Process-wide BarStore shared by the fetch layer."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = BarStore()
+        return _store
@@ -0,0 +1,343 @@
+"""Reproducible performance benchmarks for pattern detection, the result cache, a full scan,
+fetching through a local Yahoo/NSE stand-in server and the historical backtester.
+
+    python -m benchmarks.run                      # full suite, JSON to stdout
+    python -m benchmarks.run --quick -o out.json  # smaller sizes, JSON to a file
+    python -m benchmarks.run --compare old.json   # print the change against an earlier run
+
+Everything runs inside a temporary working directory, so cache files, scan
+logs and the analytics store never touch the real ones.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+os.environ.setdefault("SCANNER_ANALYTICS", "0")
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from benchmarks.synthetic import PLANTABLE, synthetic_universe
+
+SUITE_VERSION = 1
+
+def _stats(samples):
+    samples = sorted(samples)
+    return {
+        'count': len(samples),
+        'total_seconds': sum(samples),
+        'mean_seconds': statistics.fmean(samples),
+        'median_seconds': statistics.median(samples),
+        'p95_seconds': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        'min_seconds': samples[0]
+    }
+
+def _quiet(fn, *args, **kwargs):
+    # detect_pattern and friends print per-ticker diagnostics; keep them out of the timings
+    import builtins
+    original = builtins.print
+    builtins.print = lambda *a, **k: None
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        builtins.print = original
+
+def bench_detect_pattern(seed, tickers, repeats):
+    """Per-call detect_pattern latency for each pattern, cold (indicator cache cleared) and warm"""
+    from indicators import clear_indicator_cache
+    from pattern_detection import detect_pattern
+    from scan_logger import finish_scan_log
+
+    results = {}
+    for pattern in PLANTABLE:
+        frames = synthetic_universe(tickers, seed=seed, plant=pattern, plant_every=4)
+        cold, warm = [], []
+        matched = 0
+        for _ in range(repeats):
+            clear_indicator_cache()
+            matched = 0
+            for ticker, data in frames.items():
+                started = time.perf_counter()
+                matched += _quiet(detect_pattern, data, pattern, ticker, "1h", "BENCH")
+                cold.append(time.perf_counter() - started)
+            for ticker, data in frames.items():
+                started = time.perf_counter()
+                _quiet(detect_pattern, data, pattern, ticker, "1h", "BENCH")
+                warm.append(time.perf_counter() - started)
+        finish_scan_log(pattern, "1h", "BENCH")
+        results[pattern] = {
+            'tickers': tickers,
+            'planted': len(range(0, tickers, 4)),
+            'matched': matched,
+            'cold': _stats(cold),
+            'warm': _stats(warm)
+        }
+    return results
+
+def bench_cache_round_trip(seed, sizes, repeats):
+    """save/get of final results and a progress journal checkpoint + replay at each size"""
+    from cache_manager import CacheManager
+
+    cache_manager = CacheManager()
+    results = {}
+    for size in sizes:
+        frames = synthetic_universe(size, seed=seed, n_bars=300)
+        stocks = [(ticker, f"Company {ticker}", data) for ticker, data in frames.items()]
+        issues = stocks[:max(1, size // 10)]
+        save, load, checkpoint, replay = [], [], [], []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            cache_manager.save_final_results("Bench", "1h", f"N{size}", stocks, issues, size)
+            save.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            loaded = cache_manager.get_final_results("Bench", "1h", f"N{size}")
+            load.append(time.perf_counter() - started)
+            assert loaded and len(loaded['matching_stocks']) == size
+
+            processed = set()
+            matching = []
+            cache_manager.clear_progress_cache("Bench", "1h", f"P{size}")
+            started = time.perf_counter()
+            for start in range(0, size, 10):
+                chunk = stocks[start:start + 10]
+                processed.update(ticker for ticker, _, _ in chunk)
+                matching.extend(chunk)
+                cache_manager.save_progress_to_cache("Bench", "1h", f"P{size}", processed, matching, [], size)
+            checkpoint.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            progress = cache_manager.get_progress_from_cache("Bench", "1h", f"P{size}")
+            replay.append(time.perf_counter() - started)
+            assert progress and len(progress['matching_stocks']) == size
+        results[str(size)] = {
+            'matches': size,
+            'save_final': _stats(save),
+            'load_final': _stats(load),
+            'journal_checkpoints': _stats(checkpoint),
+            'journal_replay': _stats(replay)
+        }
+    return results
+
+def bench_full_scan(seed, tickers, workers, batch_size):
+    """scan_tickers end to end for every pattern in one pass, with the fetch layer stubbed by synthetic data"""
+    import scanner
+    from scan_logger import begin_scan_log, finish_scan_log
+
+    universe = {}
+    for i, pattern in enumerate(PLANTABLE):
+        # One block of tickers per pattern, each with its own names
+        block = synthetic_universe(tickers // len(PLANTABLE), seed=seed + i, plant=pattern, plant_every=10)
+        universe.update((f"{ticker}-{i}", data) for ticker, data in block.items())
+
+    original_fetch, original_name = scanner.fetch_stock_data_batch, scanner.get_company_name
+    scanner.fetch_stock_data_batch = lambda chunk, interval, chunk_size=50, offline=None: {t: (universe[t], False) for t in chunk}
+    scanner.get_company_name = lambda ticker: ticker
+    try:
+        for pattern in PLANTABLE:
+            begin_scan_log(pattern, "1h", "BENCH")
+        started = time.perf_counter()
+        matches = dict.fromkeys(PLANTABLE, 0)
+        detect_seconds = 0.0
+        count = 0
+        results = _quiet(lambda: list(scanner.scan_tickers(
+            list(universe), list(PLANTABLE), "1h", "BENCH", max_workers=workers, batch_size=batch_size
+        )))
+        wall = time.perf_counter() - started
+        for result in results:
+            count += 1
+            detect_seconds += result['detect_seconds']
+            for pattern, matched in result['pattern_matches'].items():
+                matches[pattern] += matched
+        for pattern in PLANTABLE:
+            finish_scan_log(pattern, "1h", "BENCH")
+    finally:
+        scanner.fetch_stock_data_batch, scanner.get_company_name = original_fetch, original_name
+
+    return {
+        'tickers': count,
+        'patterns': list(PLANTABLE),
+        'workers': workers,
+        'batch_size': batch_size,
+        'wall_seconds': wall,
+        'tickers_per_second': count / wall if wall else 0.0,
+        'detect_seconds': detect_seconds,
+        'matches': matches
+    }
+
+def bench_stand_in_fetch(seed, tickers, workers, batch_size, behaviour):
+    """A scan through the real fetch layer against a local stand-in server with simulated latency and throttling"""
+    from fetch_fixtures import FixtureStore, canonical_url
+    from stand_in_server import StandInServer
+
+    fixtures = FixtureStore(os.path.abspath("fixtures"))
+    universe = synthetic_universe(tickers, seed=seed, n_bars=300)
+    for ticker, data in universe.items():
+        fixtures.save_history(ticker, "1h", data)
+    equity_list = "SYMBOL,NAME OF COMPANY,SERIES\n" + "\n".join(f"{t[:-3]},Company {t[:-3]},EQ" for t in universe)
+    fixtures.save_response(
+        'GET', canonical_url('GET', "https://archives.nseindia.com/content/equities/EQUITY_L.csv"),
+        200, {'Content-Type': 'text/csv'}, equity_list.encode('utf-8')
+    )
+
+    stand_in = StandInServer(fixtures.root, port=0, seed=seed, **behaviour).start()
+    try:
+        env = dict(
+            os.environ,
+            SCANNER_STAND_IN_URL=stand_in.url,
+            SCANNER_FIXTURE_DIR=fixtures.root,
+            SCANNER_FETCH_MODE="live",
+            SCANNER_BAR_STORE=os.path.abspath("stand_in_bars.sqlite"),
+            SCANNER_SYMBOL_METADATA=os.path.abspath("stand_in_symbols.json")
+        )
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.stand_in_fetch", "--workers", str(workers), "--batch-size", str(batch_size)],
+            cwd=os.getcwd(), env=dict(env, PYTHONPATH=REPO_ROOT), capture_output=True, text=True, timeout=1800
+        )
+    finally:
+        stand_in.stop()
+    if completed.returncode != 0:
+        raise RuntimeError(f"stand-in fetch run failed: {completed.stderr[-2000:]}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result.update(workers=workers, batch_size=batch_size, behaviour=behaviour, server=stand_in.stats)
+    return result
+
+def bench_backtest(seed, tickers, n_bars):
+    """run_backtest over years of synthetic daily bars for every pattern"""
+    from backtest import run_backtest
+
+    frames = synthetic_universe(tickers, seed=seed, n_bars=n_bars, interval='1d', plant_every=5)
+    started = time.perf_counter()
+    rows = run_backtest(frames, list(PLANTABLE), '1d')
+    wall = time.perf_counter() - started
+    return {
+        'tickers': len(frames),
+        'bars': tickers * n_bars,
+        'wall_seconds': wall,
+        'bars_per_second': tickers * n_bars / wall if wall else 0.0,
+        'signals': {row['pattern']: row['signals'] for row in rows if row['horizon'] == rows[0]['horizon']}
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+def run_suite(seed=42, quick=False, only=None):
+    sizes = {
+        'detect_tickers': 40 if quick else 200,
+        'detect_repeats': 1 if quick else 3,
+        'cache_sizes': [10, 100] if quick else [10, 100, 1000],
+        'cache_repeats': 1 if quick else 3,
+        'scan_tickers': 150 if quick else 1500,
+        'scan_workers': 8,
+        'scan_batch_size': 25,
+        'stand_in_tickers': 100 if quick else 500,
+        'backtest_tickers': 200 if quick else 2000,
+        'backtest_bars': 1250,
+        'stand_in_behaviour': {'latency': 0.05, 'jitter': 0.02, 'ticker_latency': 0.002, 'error_rate': 0.01, 'throttle_rate': 0.02, 'rps': 20.0}
+    }
+    benchmarks = {
+        'detect_pattern': lambda: bench_detect_pattern(seed, sizes['detect_tickers'], sizes['detect_repeats']),
+        'cache_round_trip': lambda: bench_cache_round_trip(seed, sizes['cache_sizes'], sizes['cache_repeats']),
+        'full_scan': lambda: bench_full_scan(seed, sizes['scan_tickers'], sizes['scan_workers'], sizes['scan_batch_size']),
+        'stand_in_fetch': lambda: bench_stand_in_fetch(
+            seed, sizes['stand_in_tickers'], sizes['scan_workers'], sizes['scan_batch_size'], sizes['stand_in_behaviour']
+        ),
+        'backtest': lambda: bench_backtest(seed, sizes['backtest_tickers'], sizes['backtest_bars'])
+    }
+    report = {
+        'suite_version': SUITE_VERSION,
+        'generated_at': datetime.now(pytz.UTC).isoformat(),
+        'git_commit': _git_commit(),
+        'seed': seed,
+        'quick': quick,
+        'sizes': sizes,
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__
+        },
+        'results': {}
+    }
+
+    workdir = tempfile.mkdtemp(prefix="scanner-bench-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        for name, bench in benchmarks.items():
+            if only and name not in only:
+                continue
+            started = time.perf_counter()
+            report['results'][name] = bench()
+            report['results'][name]['elapsed_seconds'] = time.perf_counter() - started
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+def _flatten(value, prefix=""):
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(_flatten(item, f"{prefix}.{key}" if prefix else key))
+        return flat
+    return {prefix: value}
+
+def compare(previous, current):
+    """Lines comparing every *_seconds metric present in both reports"""
+    before = _flatten(previous.get('results', {}))
+    after = _flatten(current.get('results', {}))
+    lines = []
+    for key in sorted(after):
+        if not key.endswith(('mean_seconds', 'median_seconds', 'wall_seconds', 'total_seconds')) or key not in before:
+            continue
+        old, new = before[key], after[key]
+        if old:
+            lines.append(f"{key:<70}{old:>12.5f}{new:>12.5f}{(new / old - 1) * 100:>+9.1f}%")
+    return lines
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the scanner benchmark suite and emit JSON results.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--quick", action="store_true", help="Smaller sizes for a fast smoke run")
+    parser.add_argument("--only", action="append", choices=["detect_pattern", "cache_round_trip", "full_scan", "stand_in_fetch", "backtest"])
+    parser.add_argument("-o", "--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Earlier JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    report = run_suite(seed=args.seed, quick=args.quick, only=args.only)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(payload)
+    else:
+        print(payload)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        print(f"{'metric':<70}{'before':>12}{'after':>12}{'change':>10}", file=sys.stderr)
+        for line in compare(previous, report):
+            print(line, file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
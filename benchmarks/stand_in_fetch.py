@@ -0,0 +1,52 @@
+"""Scan every ticker in the fixture store through the real fetch layer.
+
+Run by benchmarks.run with SCANNER_STAND_IN_URL and SCANNER_FIXTURE_DIR set, so
+all traffic goes to a local stand_in_server; prints one JSON line of results.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pattern", action="append")
+    parser.add_argument("--interval", default="1h")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=25)
+    args = parser.parse_args(argv)
+
+    import builtins
+    from fetch_fixtures import get_fixture_store
+    from http_client import get_http_client
+    from scan_metrics import get_stage_metrics, stage_rows
+    from scanner import scan_tickers
+
+    tickers = get_fixture_store().history_tickers(args.interval)
+    patterns = args.pattern or ["Volatility Contraction"]
+    output = builtins.print
+    builtins.print = lambda *a, **k: None
+    try:
+        started = time.perf_counter()
+        results = list(scan_tickers(tickers, patterns, args.interval, "BENCH", max_workers=args.workers, batch_size=args.batch_size))
+        wall = time.perf_counter() - started
+    finally:
+        builtins.print = output
+
+    print(json.dumps({
+        'tickers': len(results),
+        'with_data': sum(1 for result in results if not result['data'].empty),
+        'wall_seconds': wall,
+        'tickers_per_second': len(results) / wall if wall else 0.0,
+        'stages': stage_rows(get_stage_metrics().snapshot()),
+        'http': get_http_client().metrics()
+    }))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
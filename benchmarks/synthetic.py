@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+from conditions import get_pattern
+
+INTERVAL_FREQ = {'15m': '15min', '30m': '30min', '1h': 'h', '1d': 'D', '5d': '5D'}
+PLANTABLE = ("Volatility Contraction", "Low Volume Stock Selection", "15% Reversal")
+
+def _frame(open_, high, low, close, volume, interval, end):
+    index = pd.date_range(end=end, periods=len(close), freq=INTERVAL_FREQ.get(interval, 'h'), tz='Asia/Kolkata')
+    index.name = 'Datetime' if interval in ('15m', '30m', '1h') else 'Date'
+    return pd.DataFrame({
+        'Open': open_,
+        'High': high,
+        'Low': low,
+        'Close': close,
+        'Volume': volume.astype('int64'),
+        'Dividends': 0.0,
+        'Stock Splits': 0.0
+    }, index=index)
+
+def _random_walk(rng, n_bars, price=100.0, volatility=0.01):
+    close = price * np.exp(np.cumsum(rng.normal(0, volatility, n_bars)))
+    open_ = np.concatenate([[price], close[:-1]])
+    spread = np.abs(rng.normal(0, volatility, n_bars)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.integers(50_000, 500_000, n_bars)
+    return open_, high, low, close, volume
+
+def _plant_volatility_contraction(rng, open_, high, low, close, volume, tail=30):
+    # Flat closes with a steadily shrinking bar range: True Range equals the
+    # range, so the 14-bar ATR falls monotonically and by well over 15%
+    mid = close[-tail - 1]
+    ranges = mid * 0.04 * 0.93 ** np.arange(tail)
+    open_[-tail:] = mid
+    close[-tail:] = mid
+    high[-tail:] = mid + ranges / 2
+    low[-tail:] = mid - ranges / 2
+
+def _plant_low_volume(rng, open_, high, low, close, volume):
+    # Shaped over the 120-bar detection window: a 5-25% consolidation, one 3-30%
+    # impulse bar between bars 60 and 100, then a tight, quiet base that the
+    # EMA20 catches up with and that stays above the 15% reversal level
+    base = close[-121]
+    window = np.empty(120)
+    window[:45] = base * (1 + 0.05 * np.sin(np.linspace(0, 6 * np.pi, 45)))
+    window[45:80] = base * (1 + rng.normal(0, 0.002, 35))
+    window[80:] = base * 1.06 * (1 + rng.normal(0, 0.001, 40))
+    close[-120:] = window
+    open_[-120:] = np.concatenate([[close[-121]], window[:-1]])
+    spread = window * 0.003
+    high[-120:] = np.maximum(open_[-120:], window) + spread
+    low[-120:] = np.minimum(open_[-120:], window) - spread
+    volume[-120:] = rng.integers(200_000, 300_000, 120)
+    volume[-20:] = rng.integers(100_000, 150_000, 20)
+
+def synthetic_ohlcv(n_bars=300, seed=0, interval='1h', plant=None, end="2026-01-30 15:15", price=100.0, volatility=0.01):
+    """Seeded history()-shaped OHLCV frame, optionally with a pattern planted in its last bars.
+
+    plant is one of PLANTABLE (case-insensitive) or None for a plain random
+    walk. The same arguments always give the same frame.
+    """
+    rng = np.random.default_rng(seed)
+    open_, high, low, close, volume = _random_walk(rng, n_bars, price, volatility)
+    if plant is not None:
+        pattern = get_pattern(plant)
+        if pattern is None or pattern.name not in PLANTABLE:
+            raise ValueError(f"Cannot plant unknown pattern {plant!r}")
+        if n_bars < 150:
+            raise ValueError("Planting a pattern needs at least 150 bars")
+        if pattern.name == "Volatility Contraction":
+            _plant_volatility_contraction(rng, open_, high, low, close, volume)
+        else:
+            _plant_low_volume(rng, open_, high, low, close, volume)
+    return _frame(open_, high, low, close, volume, interval, end)
+
+def synthetic_universe(count, seed=0, n_bars=300, interval='1h', plant=None, plant_every=10):
+    """{ticker: frame} for count synthetic tickers; every plant_every-th one carries the planted pattern"""
+    frames = {}
+    for i in range(count):
+        planted = plant if plant is not None and plant_every and i % plant_every == 0 else None
+        frames[f"SYN{i:05d}.NS"] = synthetic_ohlcv(n_bars, seed=seed * 100_003 + i, interval=interval, plant=planted)
+    return frames
@@ -1,13 +1,130 @@
 import os
 import json
 from datetime import datetime, timedelta
+import numpy as np
 import pytz
 import pandas as pd
 from io import StringIO
 
+from scan_metrics import timed
+
+RESULT_SECTIONS = ('matching_stocks', 'stocks_with_issues')
+BINARY_FORMAT = 'npz-v1'
+# Progress journal records are flushed on every checkpoint but only fsynced every
+# JOURNAL_FSYNC_EVERY checkpoints (and whenever a caller asks for sync).
+JOURNAL_FSYNC_EVERY = int(os.environ.get("SCANNER_JOURNAL_FSYNC_EVERY", "5"))
+
+def _fsync_directory(path):
+    """Make new directory entries durable; a no-op where directories cannot be opened (Windows)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _frame_schema(data):
+    index = data.index
+    is_datetime = isinstance(index, pd.DatetimeIndex)
+    return {
+        'columns': [str(column) for column in data.columns],
+        'dtypes': [str(dtype) for dtype in data.dtypes],
+        'index_kind': 'datetime' if is_datetime else 'plain',
+        'index_name': index.name,
+        'tz': str(index.tz) if is_datetime and index.tz is not None else None
+    }
+
+def _index_values(data, schema):
+    index = data.index
+    if schema['index_kind'] != 'datetime':
+        return np.asarray(index)
+    if schema['tz']:
+        return index.tz_convert('UTC').astype('datetime64[ns, UTC]').asi8
+    return index.astype('datetime64[ns]').asi8
+
+def _column_values(data, position):
+    values = data.iloc[:, position].to_numpy()
+    return values.astype(str) if values.dtype == object else values
+
+def _frames_to_arrays(frames):
+    """Pack frames into columnar arrays, one set per distinct schema.
+
+    Frames sharing a schema are concatenated column by column; each frame is
+    then just a (group, start, stop) slice, so loading N frames reads a
+    handful of arrays instead of N documents.
+    """
+    groups = []
+    group_ids = {}
+    members = []
+    placements = []
+    for data in frames:
+        schema = _frame_schema(data)
+        key = json.dumps(schema)
+        if key not in group_ids:
+            group_ids[key] = len(groups)
+            groups.append(schema)
+            members.append([])
+        group_id = group_ids[key]
+        start = sum(len(frame) for frame in members[group_id])
+        members[group_id].append(data)
+        placements.append({'group': group_id, 'start': start, 'stop': start + len(data)})
+
+    arrays = {}
+    for group_id, (schema, group_frames) in enumerate(zip(groups, members)):
+        arrays[f"g{group_id}_index"] = np.concatenate([_index_values(data, schema) for data in group_frames])
+        for position in range(len(schema['columns'])):
+            arrays[f"g{group_id}_c{position}"] = np.concatenate([_column_values(data, position) for data in group_frames])
+    return arrays, groups, placements
+
+def _group_loader(arrays, groups):
+    """Return a function building the frame for a placement, decoding each group once"""
+    decoded = {}
+
+    def decode(group_id):
+        schema = groups[group_id]
+        index_values = arrays[f"g{group_id}_index"]
+        if schema['index_kind'] == 'datetime':
+            if schema['tz']:
+                index = pd.DatetimeIndex(pd.to_datetime(index_values, unit='ns', utc=True)).tz_convert(schema['tz'])
+            else:
+                index = pd.DatetimeIndex(pd.to_datetime(index_values, unit='ns'))
+        else:
+            index = pd.Index(index_values)
+        columns = []
+        for position, dtype in enumerate(schema['dtypes']):
+            values = arrays[f"g{group_id}_c{position}"]
+            if str(values.dtype) != dtype:
+                try:
+                    values = values.astype(dtype)
+                except (TypeError, ValueError):
+                    pass
+            columns.append(values)
+        return index, columns
+
+    def build(placement):
+        group_id = placement['group']
+        if group_id not in decoded:
+            decoded[group_id] = decode(group_id)
+        index, columns = decoded[group_id]
+        schema = groups[group_id]
+        start, stop = placement['start'], placement['stop']
+        frame_index = index[start:stop]
+        frame_index.name = schema['index_name']
+        return pd.DataFrame(
+            {column: values[start:stop] for column, values in zip(schema['columns'], columns)},
+            index=frame_index
+        )
+
+    return build
+
 class CacheManager:
     def __init__(self):
         self.cache_dir = "cache"
+        self._journals = {}
         self.ensure_cache_directory()
         self.cleanup_old_cache()  # Add cache cleanup on initialization
 
@@ -30,6 +147,66 @@ class CacheManager:
     def get_cache_key(self, pattern, interval, exchange):
         return f"{pattern}_{interval}_{exchange}"
 
+    def _binary_paths(self, cache_key, suffix=""):
+        base = os.path.join(self.cache_dir, f"{cache_key}{suffix}")
+        return f"{base}.manifest.json", f"{base}.npz"
+
+    def _write_results(self, cache_key, suffix, meta, matching_stocks, stocks_with_issues):
+        """Write frames to a columnar .npz file and meta plus frame layout to a small JSON manifest.
+
+        The manifest is replaced last, so readers never see it pointing at a
+        half-written array file.
+        """
+        manifest_file, arrays_file = self._binary_paths(cache_key, suffix)
+        sections = {'matching_stocks': matching_stocks, 'stocks_with_issues': stocks_with_issues}
+        stocks = [stock for section in RESULT_SECTIONS for stock in sections[section]]
+        arrays, groups, placements = _frames_to_arrays([data for _, _, data in stocks])
+
+        manifest = dict(meta, format=BINARY_FORMAT, arrays=os.path.basename(arrays_file), groups=groups)
+        position = 0
+        for section in RESULT_SECTIONS:
+            entries = []
+            for ticker, company_name, _ in sections[section]:
+                entries.append(dict(placements[position], ticker=ticker, company_name=company_name))
+                position += 1
+            manifest[section] = entries
+
+        temp_arrays = f"{arrays_file}.tmp"
+        with open(temp_arrays, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(temp_arrays, arrays_file)
+
+        temp_manifest = f"{manifest_file}.tmp"
+        with open(temp_manifest, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(temp_manifest, manifest_file)
+
+    def _read_manifest(self, cache_key, suffix=""):
+        manifest_file, _ = self._binary_paths(cache_key, suffix)
+        if not os.path.exists(manifest_file):
+            return None
+        with open(manifest_file, 'r') as f:
+            return json.load(f)
+
+    def _read_results(self, manifest):
+        """Rebuild (matching_stocks, stocks_with_issues) lists from a manifest and its array file"""
+        arrays_file = os.path.join(self.cache_dir, manifest['arrays'])
+        sections = {}
+        with np.load(arrays_file, allow_pickle=False) as npz:
+            arrays = {name: npz[name] for name in npz.files}
+        build = _group_loader(arrays, manifest['groups'])
+        for section in RESULT_SECTIONS:
+            sections[section] = [
+                (entry['ticker'], entry['company_name'], build(entry))
+                for entry in manifest.get(section, [])
+            ]
+        return sections['matching_stocks'], sections['stocks_with_issues']
+
+    def _remove_binary(self, cache_key, suffix=""):
+        for path in self._binary_paths(cache_key, suffix):
+            if os.path.exists(path):
+                os.remove(path)
+
     def get_next_expiry(self):
         ist = pytz.timezone('Asia/Kolkata')
         now = datetime.now(ist)
@@ -44,38 +221,34 @@ class CacheManager:
         current_time = datetime.now(pytz.UTC)
         return current_time < expiry
 
+    @timed('cache_write')
     def save_to_cache(self, pattern, interval, exchange, matching_stocks, stocks_with_issues):
         cache_key = self.get_cache_key(pattern, interval, exchange)
-        cache_file = os.path.join(self.cache_dir, f"{cache_key}.json")
-
-        # Convert stock data to serializable format
-        serialized_matching_stocks = []
-        for ticker, company_name, data in matching_stocks:
-            serialized_matching_stocks.append({
-                'ticker': ticker,
-                'company_name': company_name,
-                'data': data.to_json()
-            })
-
-        serialized_stocks_with_issues = []
-        for ticker, company_name, data in stocks_with_issues:
-            serialized_stocks_with_issues.append({
-                'ticker': ticker,
-                'company_name': company_name,
-                'data': data.to_json()
-            })
-
-        cache_data = {
-            'expiry': self.get_next_expiry().isoformat(),
-            'matching_stocks': serialized_matching_stocks,
-            'stocks_with_issues': serialized_stocks_with_issues
-        }
-
-        with open(cache_file, 'w') as f:
-            json.dump(cache_data, f)
+        self._write_results(
+            cache_key,
+            "",
+            {'expiry': self.get_next_expiry().isoformat()},
+            matching_stocks,
+            stocks_with_issues
+        )
 
     def get_from_cache(self, pattern, interval, exchange):
         cache_key = self.get_cache_key(pattern, interval, exchange)
+
+        try:
+            manifest = self._read_manifest(cache_key)
+            if manifest is not None:
+                if not self.is_cache_valid(manifest):
+                    return None
+                return self._read_results(manifest)
+        except Exception as e:
+            print(f"Error reading cache: {e}")
+            return None
+
+        return self._get_from_json_cache(cache_key)
+
+    def _get_from_json_cache(self, cache_key):
+        """Legacy reader for caches written as JSON documents of to_json() frames"""
         cache_file = os.path.join(self.cache_dir, f"{cache_key}.json")
 
         if not os.path.exists(cache_file):
@@ -113,52 +286,184 @@ class CacheManager:
             print(f"Error reading cache: {e}")
             return None
 
-    def save_progress_to_cache(self, pattern, interval, exchange, processed_stocks, matching_stocks, stocks_with_issues, total_stocks):
+    def _journal_path(self, cache_key):
+        return os.path.join(self.cache_dir, f"{cache_key}_progress.journal")
+
+    def _segment_name(self, cache_key, sequence):
+        return f"{cache_key}_progress_{sequence:06d}.npz"
+
+    def _read_journal(self, cache_key):
+        """Journal records in order; a torn last line from a crash is ignored"""
+        records = []
+        with open(self._journal_path(cache_key), 'r') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break
+        return records
+
+    def _journal_state(self, cache_key):
+        """What the journal already holds: processed tickers, frame counts and next segment number"""
+        state = self._journals.get(cache_key)
+        if state is not None:
+            return state
+        # verified: the caller's processed set has been checked against the journal once
+        state = {'processed': set(), 'matching_stocks': 0, 'stocks_with_issues': 0, 'sequence': 0, 'unsynced': 0, 'verified': False}
+        if os.path.exists(self._journal_path(cache_key)):
+            for record in self._read_journal(cache_key):
+                state['processed'].update(record.get('processed', []))
+                for section in RESULT_SECTIONS:
+                    state[section] += len(record.get(section, []))
+                if record.get('segment'):
+                    state['sequence'] += 1
+        self._journals[cache_key] = state
+        return state
+
+    def _reset_journal(self, cache_key):
+        journal_file = self._journal_path(cache_key)
+        if os.path.exists(journal_file):
+            os.remove(journal_file)
+        segment_prefix = f"{cache_key}_progress_"
+        for file in os.listdir(self.cache_dir):
+            if file.startswith(segment_prefix) and file.endswith(".npz"):
+                os.remove(os.path.join(self.cache_dir, file))
+        self._journals.pop(cache_key, None)
+
+    @timed('cache_write')
+    def save_progress_to_cache(self, pattern, interval, exchange, processed_stocks, matching_stocks, stocks_with_issues, total_stocks, sync=False,
+                               newly_processed=None):
+        """Append only what changed since the last checkpoint to the progress journal.
+
+        Each record lists newly processed tickers and references a segment .npz
+        holding just the new matched/limited-data frames, so a checkpoint costs
+        the same at ticker 1,900 as at ticker 10. Passing newly_processed (the
+        tickers added to processed_stocks since the last successful checkpoint)
+        skips diffing the whole processed set after the first checkpoint.
+        Segments are fsynced before the record that references them is
+        written. Returns True when the checkpoint was saved.
+        """
         try:
-            # Ensure processed stocks don't exceed total stocks
-            processed_set = set(processed_stocks)
-            total_stocks = max(total_stocks, len(processed_set))
-            
             cache_key = self.get_cache_key(pattern, interval, exchange)
-            progress_file = os.path.join(self.cache_dir, f"{cache_key}_progress.json")
+            state = self._journal_state(cache_key)
+
+            # The caller's lists only ever grow during a scan; anything else means a new scan
+            if (len(matching_stocks) < state['matching_stocks'] or
+                    len(stocks_with_issues) < state['stocks_with_issues'] or
+                    len(processed_stocks) < len(state['processed']) or
+                    not (state['verified'] or state['processed'].issubset(processed_stocks))):
+                self._reset_journal(cache_key)
+                state = self._journal_state(cache_key)
+
+            if newly_processed is not None and state['verified']:
+                new_processed = [ticker for ticker in dict.fromkeys(newly_processed) if ticker not in state['processed']]
+            else:
+                new_processed = [ticker for ticker in processed_stocks if ticker not in state['processed']]
+            new_stocks = {
+                'matching_stocks': list(matching_stocks[state['matching_stocks']:]),
+                'stocks_with_issues': list(stocks_with_issues[state['stocks_with_issues']:])
+            }
+            total_stocks = max(total_stocks, len(state['processed']) + len(new_processed))
 
-            progress_data = {
+            record = {
                 'last_update': datetime.now(pytz.UTC).isoformat(),
                 'total_stocks': total_stocks,
-                'processed_stocks': list(processed_set),  # Convert to list for JSON serialization
-                'matching_stocks': [
-                    {
-                        'ticker': ticker,
-                        'company_name': company_name,
-                        'data': data.to_json()
-                    }
-                    for ticker, company_name, data in matching_stocks
-                ],
-                'stocks_with_issues': [
-                    {
-                        'ticker': ticker,
-                        'company_name': company_name,
-                        'data': data.to_json()
-                    }
-                    for ticker, company_name, data in stocks_with_issues
-                ]
+                'processed': new_processed,
+                'segment': None
             }
-
-            with open(progress_file, 'w') as f:
-                json.dump(progress_data, f)
+            frames = [stock for section in RESULT_SECTIONS for stock in new_stocks[section]]
+            if frames:
+                segment = self._segment_name(cache_key, state['sequence'])
+                arrays, groups, placements = _frames_to_arrays([data for _, _, data in frames])
+                with open(os.path.join(self.cache_dir, segment), 'wb') as f:
+                    np.savez(f, **arrays)
+                    f.flush()
+                    os.fsync(f.fileno())
+                _fsync_directory(self.cache_dir)
+                record['segment'] = segment
+                record['groups'] = groups
+                position = 0
+                for section in RESULT_SECTIONS:
+                    record[section] = []
+                    for ticker, company_name, _ in new_stocks[section]:
+                        record[section].append(dict(placements[position], ticker=ticker, company_name=company_name))
+                        position += 1
+
+            new_journal = not os.path.exists(self._journal_path(cache_key))
+            with open(self._journal_path(cache_key), 'a') as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                state['unsynced'] += 1
+                if sync or new_journal or state['unsynced'] >= JOURNAL_FSYNC_EVERY:
+                    os.fsync(f.fileno())
+                    state['unsynced'] = 0
+            if new_journal:
+                _fsync_directory(self.cache_dir)
+
+            state['processed'].update(new_processed)
+            for section in RESULT_SECTIONS:
+                state[section] += len(new_stocks[section])
+            if record['segment']:
+                state['sequence'] += 1
+            state['verified'] = True
+            return True
         except Exception as e:
             print(f"Error saving progress: {e}")
+            return False
+
+    def _replay_journal(self, cache_key):
+        """Rebuild progress_data, frames included, from the journal records.
 
+        Replay stops at a record whose segment is missing or unreadable, as
+        after a crash; the next checkpoint then finds the journal out of step
+        with the caller and rewrites it.
+        """
+        records = self._read_journal(cache_key)
+        if not records:
+            return None
+        progress_data = {
+            'last_update': records[-1]['last_update'],
+            'total_stocks': records[-1]['total_stocks'],
+            'processed_stocks': [],
+            'matching_stocks': [],
+            'stocks_with_issues': []
+        }
+        for record in records:
+            if not record.get('segment'):
+                progress_data['processed_stocks'].extend(record.get('processed', []))
+                continue
+            try:
+                with np.load(os.path.join(self.cache_dir, record['segment']), allow_pickle=False) as npz:
+                    arrays = {name: npz[name] for name in npz.files}
+            except Exception as e:
+                print(f"Error reading progress segment {record['segment']}: {e}")
+                break
+            progress_data['processed_stocks'].extend(record.get('processed', []))
+            build = _group_loader(arrays, record['groups'])
+            for section in RESULT_SECTIONS:
+                progress_data[section].extend(
+                    (entry['ticker'], entry['company_name'], build(entry))
+                    for entry in record.get(section, [])
+                )
+        return progress_data
+
+    @timed('cache_read')
     def get_progress_from_cache(self, pattern, interval, exchange):
         cache_key = self.get_cache_key(pattern, interval, exchange)
         progress_file = os.path.join(self.cache_dir, f"{cache_key}_progress.json")
 
-        if not os.path.exists(progress_file):
-            return None
-
         try:
-            with open(progress_file, 'r') as f:
-                progress_data = json.load(f)
+            source = 'journal'
+            progress_data = self._replay_journal(cache_key) if os.path.exists(self._journal_path(cache_key)) else None
+            if progress_data is None:
+                source = 'binary'
+                progress_data = self._read_manifest(cache_key, "_progress")
+            if progress_data is None:
+                source = 'json'
+                if not os.path.exists(progress_file):
+                    return None
+                with open(progress_file, 'r') as f:
+                    progress_data = json.load(f)
 
             # Validate cache data
             required_keys = ['last_update', 'total_stocks', 'processed_stocks', 'matching_stocks', 'stocks_with_issues']
@@ -174,28 +479,38 @@ class CacheManager:
             if progress_data['total_stocks'] <= 0:
                 return None
 
-            matching_stocks = [
-                (
-                    stock['ticker'],
-                    stock['company_name'],
-                    pd.read_json(StringIO(stock['data']))
-                )
-                for stock in progress_data['matching_stocks']
-            ]
+            if source == 'json':
+                matching_stocks = [
+                    (
+                        stock['ticker'],
+                        stock['company_name'],
+                        pd.read_json(StringIO(stock['data']))
+                    )
+                    for stock in progress_data['matching_stocks']
+                ]
 
-            stocks_with_issues = [
-                (
-                    stock['ticker'],
-                    stock['company_name'],
-                    pd.read_json(StringIO(stock['data']))
-                )
-                for stock in progress_data['stocks_with_issues']
-            ]
+                stocks_with_issues = [
+                    (
+                        stock['ticker'],
+                        stock['company_name'],
+                        pd.read_json(StringIO(stock['data']))
+                    )
+                    for stock in progress_data['stocks_with_issues']
+                ]
+            elif source == 'binary':
+                matching_stocks, stocks_with_issues = self._read_results(progress_data)
+            else:
+                matching_stocks = progress_data['matching_stocks']
+                stocks_with_issues = progress_data['stocks_with_issues']
 
             # Ensure we don't have duplicate processed stocks
             processed_stocks = set(progress_data['processed_stocks'])
             total_stocks = max(progress_data['total_stocks'], len(processed_stocks))
 
+            if source == 'journal':
+                # Rebuilt lazily from the journal on the next checkpoint
+                self._journals.pop(cache_key, None)
+
             return {
                 'processed_stocks': processed_stocks,
                 'matching_stocks': matching_stocks,
@@ -218,10 +533,10 @@ class CacheManager:
         except Exception as e:
             print(f"Error clearing cache: {e}")
 
+    @timed('cache_write')
     def save_final_results(self, pattern, interval, exchange, matching_stocks, stocks_with_issues, total_stocks):
         try:
             cache_key = self.get_cache_key(pattern, interval, exchange)
-            results_file = os.path.join(self.cache_dir, f"{cache_key}_final.json")
             
             total_stocks = max(total_stocks, 
                              len([t for t, _, _ in matching_stocks]) + 
@@ -229,94 +544,126 @@ class CacheManager:
             
             results_data = {
                 'timestamp': datetime.now(pytz.UTC).isoformat(),
-                'total_stocks': total_stocks,
-                'matching_stocks': [
-                    {
-                        'ticker': ticker,
-                        'company_name': company_name,
-                        'data': data.to_json()
-                    }
-                    for ticker, company_name, data in matching_stocks
-                ],
-                'stocks_with_issues': [
-                    {
-                        'ticker': ticker,
-                        'company_name': company_name,
-                        'data': data.to_json()
-                    }
-                    for ticker, company_name, data in stocks_with_issues
-                ]
+                'total_stocks': total_stocks
             }
             
             if not os.path.exists(self.cache_dir):
                 os.makedirs(self.cache_dir)
             
-            temp_file = os.path.join(self.cache_dir, f"{cache_key}_final.tmp")
-            with open(temp_file, 'w') as f:
-                json.dump(results_data, f)
+            self._write_results(cache_key, "_final", results_data, matching_stocks, stocks_with_issues)
             
-            os.replace(temp_file, results_file)
+            legacy_file = os.path.join(self.cache_dir, f"{cache_key}_final.json")
+            if os.path.exists(legacy_file):
+                os.remove(legacy_file)
             
             self.clear_progress_cache(pattern, interval, exchange)
             
         except Exception as e:
             print(f"Error saving final results: {e}")
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
 
+    @timed('cache_read')
     def get_final_results(self, pattern, interval, exchange):
         try:
             cache_key = self.get_cache_key(pattern, interval, exchange)
-            results_file = os.path.join(self.cache_dir, f"{cache_key}_final.json")
-            
-            if not os.path.exists(results_file):
-                return None
-                
-            with open(results_file, 'r') as f:
-                results_data = json.load(f)
+            results_data = self._read_manifest(cache_key, "_final")
+            if results_data is None:
+                return self._get_final_results_from_json(cache_key)
 
             required_keys = ['timestamp', 'total_stocks', 'matching_stocks', 'stocks_with_issues']
             if not all(key in results_data for key in required_keys):
-                os.remove(results_file)
+                self._remove_binary(cache_key, "_final")
                 return None
                 
             timestamp = datetime.fromisoformat(results_data['timestamp'])
             if (datetime.now(pytz.UTC) - timestamp) > timedelta(hours=12):
-                os.remove(results_file)
+                self._remove_binary(cache_key, "_final")
                 return None
                 
             try:
-                matching_stocks = [
-                    (
-                        stock['ticker'],
-                        stock['company_name'],
-                        pd.read_json(StringIO(stock['data']))
-                    )
-                    for stock in results_data['matching_stocks']
-                ]
-                
-                stocks_with_issues = [
-                    (
-                        stock['ticker'],
-                        stock['company_name'],
-                        pd.read_json(StringIO(stock['data']))
-                    )
-                    for stock in results_data['stocks_with_issues']
-                ]
-                
+                matching_stocks, stocks_with_issues = self._read_results(results_data)
                 return {
                     'matching_stocks': matching_stocks,
                     'stocks_with_issues': stocks_with_issues,
                     'total_stocks': results_data['total_stocks']
                 }
             except Exception:
-                os.remove(results_file)
+                self._remove_binary(cache_key, "_final")
                 return None
                 
         except Exception as e:
             print(f"Error reading final results: {e}")
             return None
 
+    def _get_final_results_from_json(self, cache_key):
+        """Legacy reader for final results written as JSON documents of to_json() frames"""
+        results_file = os.path.join(self.cache_dir, f"{cache_key}_final.json")
+        
+        if not os.path.exists(results_file):
+            return None
+            
+        with open(results_file, 'r') as f:
+            results_data = json.load(f)
+
+        required_keys = ['timestamp', 'total_stocks', 'matching_stocks', 'stocks_with_issues']
+        if not all(key in results_data for key in required_keys):
+            os.remove(results_file)
+            return None
+            
+        timestamp = datetime.fromisoformat(results_data['timestamp'])
+        if (datetime.now(pytz.UTC) - timestamp) > timedelta(hours=12):
+            os.remove(results_file)
+            return None
+            
+        try:
+            matching_stocks = [
+                (
+                    stock['ticker'],
+                    stock['company_name'],
+                    pd.read_json(StringIO(stock['data']))
+                )
+                for stock in results_data['matching_stocks']
+            ]
+            
+            stocks_with_issues = [
+                (
+                    stock['ticker'],
+                    stock['company_name'],
+                    pd.read_json(StringIO(stock['data']))
+                )
+                for stock in results_data['stocks_with_issues']
+            ]
+            
+            return {
+                'matching_stocks': matching_stocks,
+                'stocks_with_issues': stocks_with_issues,
+                'total_stocks': results_data['total_stocks']
+            }
+        except Exception:
+            os.remove(results_file)
+            return None
+
+    def peek_progress(self, pattern, interval, exchange):
+        """Read-only view of a progress journal that another process may still be appending to.
+
+        Unlike get_progress_from_cache it never clears or resets anything, so
+        it is safe to poll while a scan worker owns the journal.
+        """
+        cache_key = self.get_cache_key(pattern, interval, exchange)
+        try:
+            progress_data = self._replay_journal(cache_key) if os.path.exists(self._journal_path(cache_key)) else None
+        except Exception as e:
+            print(f"Error reading progress journal: {e}")
+            return None
+        if progress_data is None:
+            return None
+        processed_stocks = set(progress_data['processed_stocks'])
+        return {
+            'processed_stocks': processed_stocks,
+            'matching_stocks': progress_data['matching_stocks'],
+            'stocks_with_issues': progress_data['stocks_with_issues'],
+            'total_stocks': max(progress_data['total_stocks'], len(processed_stocks))
+        }
+
     def clear_progress_cache(self, pattern, interval, exchange):
         try:
             cache_key = self.get_cache_key(pattern, interval, exchange)
@@ -324,6 +671,8 @@ class CacheManager:
             
             if os.path.exists(progress_file):
                 os.remove(progress_file)
+            self._remove_binary(cache_key, "_progress")
+            self._reset_journal(cache_key)
                 
         except Exception as e:
             print(f"Error clearing progress cache: {e}")
\ No newline at end of file
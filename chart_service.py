@@ -0,0 +1,175 @@
+import os
+import time
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from scan_metrics import get_stage_metrics
+
+CHART_DIR = os.environ.get("SCANNER_CHART_DIR", os.path.join("data", "charts"))
+CHART_CACHE_MAX_MB = float(os.environ.get("SCANNER_CHART_CACHE_MAX_MB", "256"))
+CHART_WORKERS = int(os.environ.get("SCANNER_CHART_WORKERS", str(min(4, os.cpu_count() or 1))))
+CHART_STYLE = 'charles'
+CHART_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+def chart_key(ticker, interval, data, style=CHART_STYLE):
+    """Content address of a chart: ticker, interval, the last bar (timestamp and values) and style"""
+    if data is None or data.empty:
+        last_bar = "empty"
+    else:
+        last = data.iloc[-1]
+        values = ",".join(repr(float(last[column])) for column in CHART_COLUMNS if column in data.columns)
+        last_bar = f"{data.index[-1].isoformat()}|{len(data)}|{values}"
+    return hashlib.sha1(f"{ticker}|{interval}|{last_bar}|{style}".encode('utf-8')).hexdigest()
+
+def _render_chart(data, ticker, company_name, style, path):
+    # Runs in a pool process: render next to the target and publish atomically,
+    # so a reader never sees a half-written image. Returns the path and the
+    # render time, which the parent records under the 'chart' stage. A failed
+    # render raises instead of publishing its error image under the content
+    # key, where it would be served until evicted
+    from plot_chart import plot_candlestick
+    started = time.perf_counter()
+    temp_file = f"{path[:-4]}.{os.getpid()}.tmp.png"
+    try:
+        rendered = plot_candlestick(data, ticker, company_name, savefig=temp_file, style=style)
+        if not rendered:
+            raise RuntimeError(f"Could not plot the chart for {ticker}")
+        os.replace(temp_file, path)
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+    return path, time.perf_counter() - started
+
+class ChartService:
+    """Renders candlestick charts in a process pool into a size-bounded on-disk cache.
+
+    Each image is stored under its chart_key, so a chart is rendered once per
+    distinct last bar no matter how many reruns or sessions display it. The
+    least recently used images are evicted once the cache exceeds max_mb.
+    """
+
+    def __init__(self, chart_dir=CHART_DIR, max_mb=CHART_CACHE_MAX_MB, max_workers=CHART_WORKERS):
+        self.chart_dir = chart_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_workers = max(1, max_workers)
+        self._executor = None
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.chart_dir, f"{key}.png")
+
+    def _get_executor(self):
+        if self._executor is None:
+            if not os.path.exists(self.chart_dir):
+                os.makedirs(self.chart_dir, exist_ok=True)
+            # spawn: the scan runs worker threads, which forked children must not inherit
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    def cached_chart(self, ticker, interval, data, style=CHART_STYLE):
+        """Path of an already rendered chart, or None"""
+        path = self._path(chart_key(ticker, interval, data, style))
+        if not os.path.exists(path):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def submit(self, ticker, company_name, interval, data, style=CHART_STYLE):
+        """Queue a render unless the chart is cached or already queued; returns a future or None"""
+        key = chart_key(ticker, interval, data, style)
+        path = self._path(key)
+        if os.path.exists(path):
+            return None
+        frame = data[[column for column in CHART_COLUMNS if column in data.columns]]
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None:
+                return future
+            try:
+                future = self._get_executor().submit(_render_chart, frame, ticker, company_name, style, path)
+            except (BrokenProcessPool, RuntimeError):
+                self._executor = None
+                future = self._get_executor().submit(_render_chart, frame, ticker, company_name, style, path)
+            self._pending[key] = future
+        future.add_done_callback(lambda done, key=key: self._finished(key, done))
+        return future
+
+    def _finished(self, key, future):
+        with self._lock:
+            self._pending.pop(key, None)
+        if not future.cancelled():
+            if future.exception() is None:
+                get_stage_metrics().observe('chart', future.result()[1])
+            else:
+                get_stage_metrics().observe('chart', 0.0, error=True)
+        self.enforce_limit()
+
+    def get_chart(self, ticker, company_name, interval, data, style=CHART_STYLE, timeout=60):
+        """Path of the chart image, rendering it now (and waiting) if needed; None if rendering failed"""
+        path = self.cached_chart(ticker, interval, data, style)
+        if path:
+            return path
+        future = self.submit(ticker, company_name, interval, data, style)
+        try:
+            if future is not None:
+                future.result(timeout=timeout)
+        except Exception as e:
+            print(f"Error rendering chart for {ticker}: {e}")
+            return None
+        return self.cached_chart(ticker, interval, data, style)
+
+    def prewarm(self, charts, style=CHART_STYLE):
+        """Queue background renders for an iterable of (ticker, company_name, interval, data)"""
+        for ticker, company_name, interval, data in charts:
+            if data is not None and not data.empty:
+                self.submit(ticker, company_name, interval, data, style)
+
+    def enforce_limit(self):
+        """Delete least recently used images until the cache fits in max_bytes"""
+        try:
+            entries = [
+                entry for entry in os.scandir(self.chart_dir)
+                if entry.is_file() and entry.name.endswith(".png") and ".tmp." not in entry.name
+            ]
+        except OSError:
+            return
+        stats = [(entry.stat(), entry.path) for entry in entries]
+        total = sum(stat.st_size for stat, _ in stats)
+        if total <= self.max_bytes:
+            return
+        for stat, path in sorted(stats, key=lambda item: item[0].st_mtime):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= stat.st_size
+            if total <= self.max_bytes:
+                break
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            self._pending.clear()
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_chart_service():
+    """Process-wide ChartService shared by every UI session."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ChartService()
+        return _service
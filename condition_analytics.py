@@ -0,0 +1,232 @@
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+import pandas as pd
+
+ANALYTICS_ENABLED = os.environ.get("SCANNER_ANALYTICS", "1").lower() not in ("0", "false", "no")
+
+class ConditionAnalytics:
+    """Per-condition pass/fail history for every evaluated ticker, in a local SQLite file.
+
+    Rows are written from scan log records (see ScanLogger.add_listener), one
+    evaluation per (scan_id, ticker) and one outcome per condition: 1 met,
+    0 failed, NULL skipped. While analytics are on, scans evaluate every
+    condition, so a condition is only skipped when a gate (or too few bars)
+    rejected the data; skipped conditions are left out of hit rates.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.environ.get("SCANNER_ANALYTICS_STORE", os.path.join("data", "analytics.sqlite"))
+        self._local = threading.local()
+        self.ensure_schema()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def ensure_schema(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS scans (
+                    scan_id TEXT PRIMARY KEY,
+                    pattern TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    exchange TEXT NOT NULL,
+                    started_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS evaluations (
+                    scan_id TEXT NOT NULL,
+                    ticker TEXT NOT NULL,
+                    pattern TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    scan_date TEXT NOT NULL,
+                    evaluated_at TEXT NOT NULL,
+                    met_count INTEGER NOT NULL,
+                    condition_count INTEGER NOT NULL,
+                    matched INTEGER NOT NULL,
+                    PRIMARY KEY (scan_id, ticker)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS condition_results (
+                    scan_id TEXT NOT NULL,
+                    condition TEXT NOT NULL,
+                    ticker TEXT NOT NULL,
+                    pattern TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    scan_date TEXT NOT NULL,
+                    outcome INTEGER,
+                    PRIMARY KEY (scan_id, condition, ticker)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_scans_pattern ON scans (pattern, interval, started_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_evaluations_ticker ON evaluations (ticker, pattern, interval)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_evaluations_met ON evaluations (scan_id, met_count)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_evaluations_date ON evaluations (pattern, interval, scan_date)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_conditions_date ON condition_results (pattern, interval, scan_date, condition)")
+
+    def record_batch(self, records):
+        """Store a batch of scan log records (the dicts ScanLogger writes to pattern_scan.jsonl)"""
+        if not records:
+            return
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        scans = {}
+        evaluations = []
+        outcomes = []
+        for record in records:
+            pattern = record['pattern'].lower()
+            scan_date = record['timestamp'][:10]
+            scans.setdefault(record['scan_id'], (record['scan_id'], pattern, record['interval'], record['exchange'], record['timestamp'], now))
+            met, failed, skipped = record['met'], record.get('failed', []), record.get('skipped', [])
+            evaluations.append((
+                record['scan_id'], record['ticker'], pattern, record['interval'], scan_date, record['timestamp'],
+                len(met), len(met) + len(failed) + len(skipped), int(bool(record.get('matched')))
+            ))
+            for names, outcome in ((met, 1), (failed, 0), (skipped, None)):
+                outcomes.extend(
+                    (record['scan_id'], name, record['ticker'], pattern, record['interval'], scan_date, outcome)
+                    for name in names
+                )
+
+        conn = self._connect()
+        with conn:
+            conn.executemany("""
+                INSERT INTO scans (scan_id, pattern, interval, exchange, started_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (scan_id) DO UPDATE SET updated_at = excluded.updated_at
+            """, list(scans.values()))
+            conn.executemany("INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", evaluations)
+            conn.executemany("INSERT OR REPLACE INTO condition_results VALUES (?, ?, ?, ?, ?, ?, ?)", outcomes)
+
+    def import_records_file(self, records_file):
+        """Backfill from a pattern_scan.jsonl file; returns the number of records read"""
+        batch = []
+        count = 0
+        with open(records_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    batch.append(json.loads(line))
+                except ValueError:
+                    continue
+                if len(batch) >= 1000:
+                    self.record_batch(batch)
+                    count += len(batch)
+                    batch = []
+        self.record_batch(batch)
+        return count + len(batch)
+
+    def _query(self, sql, params):
+        return pd.read_sql_query(sql, self._connect(), params=params)
+
+    def list_scans(self, pattern=None, interval=None, limit=20):
+        """Most recent scans first, with how many tickers each evaluated"""
+        sql = "SELECT scan_id, pattern, interval, exchange, started_at, updated_at FROM scans"
+        where, params = [], []
+        if pattern:
+            where.append("pattern = ?")
+            params.append(pattern.lower())
+        if interval:
+            where.append("interval = ?")
+            params.append(interval)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY started_at DESC LIMIT ?"
+        scans = self._query(sql, params + [limit])
+        scans['tickers'] = [
+            self._connect().execute("SELECT COUNT(*) FROM evaluations WHERE scan_id = ?", (scan_id,)).fetchone()[0]
+            for scan_id in scans['scan_id']
+        ]
+        return scans
+
+    def latest_scan_id(self, pattern, interval=None):
+        scans = self.list_scans(pattern, interval, limit=1)
+        return scans['scan_id'].iloc[0] if not scans.empty else None
+
+    def condition_hit_rates(self, pattern, interval=None, scan_id=None):
+        """Per-condition met/failed counts and hit rate for one scan (the latest by default)"""
+        scan_id = scan_id or self.latest_scan_id(pattern, interval)
+        return self._query("""
+            SELECT condition,
+                   SUM(outcome = 1) AS met,
+                   SUM(outcome = 0) AS failed,
+                   SUM(outcome IS NULL) AS skipped,
+                   1.0 * SUM(outcome = 1) / NULLIF(COUNT(outcome), 0) AS hit_rate
+            FROM condition_results
+            WHERE scan_id = ?
+            GROUP BY condition
+            ORDER BY hit_rate
+        """, [scan_id])
+
+    def near_miss_tickers(self, pattern, interval=None, scan_id=None, min_met=2):
+        """Tickers that met at least min_met conditions without matching, closest first"""
+        scan_id = scan_id or self.latest_scan_id(pattern, interval)
+        near_misses = self._query("""
+            SELECT ticker, met_count, condition_count
+            FROM evaluations
+            WHERE scan_id = ? AND met_count >= ? AND matched = 0
+            ORDER BY met_count DESC, ticker
+        """, [scan_id, min_met])
+        failed = self._connect().execute(
+            "SELECT ticker, condition FROM condition_results WHERE scan_id = ? AND (outcome = 0 OR outcome IS NULL)",
+            (scan_id,)
+        ).fetchall()
+        tickers = set(near_misses['ticker'])
+        missing = {}
+        for ticker, condition in failed:
+            if ticker in tickers:
+                missing.setdefault(ticker, []).append(condition)
+        near_misses['missing'] = [", ".join(sorted(missing.get(ticker, []))) for ticker in near_misses['ticker']]
+        return near_misses
+
+    def condition_trends(self, pattern, interval=None, days=30):
+        """Daily hit rate per condition over the last days, one column per condition"""
+        since = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+        sql = """
+            SELECT scan_date, condition, 1.0 * SUM(outcome = 1) / NULLIF(COUNT(outcome), 0) AS hit_rate
+            FROM condition_results
+            WHERE pattern = ? AND scan_date >= ?
+        """
+        params = [pattern.lower(), since]
+        if interval:
+            sql += " AND interval = ?"
+            params.append(interval)
+        sql += " GROUP BY scan_date, condition ORDER BY scan_date"
+        trends = self._query(sql, params)
+        if trends.empty:
+            return trends
+        return trends.pivot(index='scan_date', columns='condition', values='hit_rate')
+
+    def ticker_history(self, ticker, pattern=None, limit=50):
+        """How many conditions a ticker met in each recent scan"""
+        sql = "SELECT scan_id, pattern, interval, evaluated_at, met_count, condition_count, matched FROM evaluations WHERE ticker = ?"
+        params = [ticker]
+        if pattern:
+            sql += " AND pattern = ?"
+            params.append(pattern.lower())
+        sql += " ORDER BY evaluated_at DESC LIMIT ?"
+        return self._query(sql, params + [limit])
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_analytics_store():
+    """Process-wide ConditionAnalytics fed by the scan loggers."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ConditionAnalytics()
+        return _store
@@ -0,0 +1,363 @@
+from functools import cached_property
+import numpy as np
+import pandas as pd
+
+from indicators import average_true_range, ema
+
+class Condition:
+    """A named, reusable check over the latest bars of one ticker.
+
+    cost is a relative evaluation cost and pass_rate the expected share of
+    tickers that pass; together they decide evaluation order. lookback is the
+    number of trailing bars the check reads. A gate condition is a hard
+    precondition: when it fails the pattern is rejected without logging.
+    incremental is the same check over an indicator_state.IndicatorState.
+    summary_check(summary, margin) screens a prefilter.SummaryIndex row:
+    False means the check is not expected to pass (see prefilter.py).
+    vectorized(bars) evaluates the check at every bar of a backtest.BarArrays.
+    """
+
+    def __init__(self, name, description, check, cost=1.0, pass_rate=0.5, lookback=120, gate=False, incremental=None,
+                 summary_check=None, vectorized=None):
+        self.name = name
+        self.description = description
+        self.check = check
+        self.incremental = incremental
+        self.summary_check = summary_check
+        self.vectorized = vectorized
+        self.cost = cost
+        self.pass_rate = pass_rate
+        self.lookback = lookback
+        self.gate = gate
+
+    @property
+    def rank(self):
+        # Cheapest-per-rejection first: the classic ordering for a conjunction of filters
+        return self.cost / max(1e-6, 1.0 - self.pass_rate)
+
+class Pattern:
+    """A pattern is the conjunction of its conditions, listed in report order"""
+
+    def __init__(self, name, conditions, min_bars=60, min_logged=2):
+        self.name = name
+        self.conditions = conditions
+        self.min_bars = min_bars
+        self.min_logged = min_logged
+
+    @property
+    def lookback(self):
+        return max(condition.lookback for condition in self.conditions)
+
+class ConditionContext:
+    """Per-evaluation view of a frame; shared intermediates are computed once"""
+
+    def __init__(self, data, ticker="Unknown", interval="1h"):
+        self.data = data
+        self.ticker = ticker
+        self.interval = interval
+
+    @cached_property
+    def last_120_candles(self):
+        return self.data.tail(120)
+
+    @cached_property
+    def ema20(self):
+        return ema(self.data, span=20, tail=120, ticker=self.ticker, interval=self.interval)
+
+    @cached_property
+    def atr_settings(self):
+        if self.data.index.freq == 'D' or len(self.data) >= 60:
+            return {'atr_window': 14, 'lookback_period': 10, 'atr_threshold': 0.15}
+        return {'atr_window': 14, 'lookback_period': 5, 'atr_threshold': 0.1}
+
+    @cached_property
+    def last_n_atr(self):
+        settings = self.atr_settings
+        atr = average_true_range(self.data, window=settings['atr_window'], ticker=self.ticker, interval=self.interval)
+        return pd.Series(atr[-settings['lookback_period']:])
+
+def _atr_decrease(ctx):
+    last_n_atr = ctx.last_n_atr
+    if not last_n_atr.is_monotonic_decreasing:
+        return False
+    first_atr = last_n_atr.iloc[0]
+    last_atr = last_n_atr.iloc[-1]
+    return not (pd.isna(first_atr) or pd.isna(last_atr) or first_atr == 0)
+
+def _atr_threshold(ctx):
+    last_n_atr = ctx.last_n_atr
+    first_atr = last_n_atr.iloc[0]
+    last_atr = last_n_atr.iloc[-1]
+    if pd.isna(first_atr) or pd.isna(last_atr) or first_atr == 0:
+        return False
+    atr_decrease = (first_atr - last_atr) / first_atr
+    return atr_decrease > ctx.atr_settings['atr_threshold']
+
+def _sample_size(ctx):
+    return len(ctx.last_120_candles) >= 120
+
+def _tight_consolidation(ctx):
+    first_45_candles = ctx.last_120_candles.head(45)
+    consolidation_range = (first_45_candles['High'].max() - first_45_candles['Low'].min()) / first_45_candles['Close'].mean()
+    return 0.05 <= consolidation_range <= 0.25
+
+def _volatility_impulse(ctx):
+    volatility_section = ctx.last_120_candles.iloc[60:100]
+    price_moves = volatility_section['Close'].pct_change().abs()
+    return any((move >= 0.03 and move <= 0.30) for move in price_moves)
+
+def _low_volume_consolidation(ctx):
+    last_120_candles = ctx.last_120_candles
+    last_20_candles = last_120_candles.tail(20)
+    avg_volume = last_120_candles['Volume'].mean()
+    recent_volume = last_20_candles['Volume'].mean()
+    recent_range = (last_20_candles['High'].max() - last_20_candles['Low'].min()) / last_20_candles['Close'].mean()
+    return (recent_volume >= (avg_volume * 0.10) and
+            recent_volume <= (avg_volume * 1.5) and
+            recent_range <= 0.15)
+
+def _ema_proximity(ctx):
+    last_15_candles = ctx.last_120_candles.tail(15)
+    for close, ema20_value in zip(last_15_candles['Close'], ctx.ema20[-15:]):
+        if abs(close - ema20_value) / close > 0.05:
+            return False
+    return True
+
+def _reversal_level(ctx):
+    first_100_candles = ctx.last_120_candles.head(100)
+    top_high = first_100_candles['High'].max()
+
+    reversal_percentage = 0.15
+    reversal_level = top_high * (1 - reversal_percentage)
+
+    last_30_candles = ctx.last_120_candles.tail(30)
+    return all(close > reversal_level for close in last_30_candles['Close'])
+
+# The same checks over streaming indicator state (see indicator_state.py); each
+# mirrors the arithmetic of its batch counterpart so the outcomes are identical
+
+def _atr_tail_state(state):
+    atr = list(state.atr_tail)
+    first_atr, last_atr = atr[0], atr[-1]
+    usable = not (pd.isna(first_atr) or pd.isna(last_atr) or first_atr == 0)
+    return atr, first_atr, last_atr, usable
+
+def _atr_decrease_state(state):
+    atr, _, _, usable = _atr_tail_state(state)
+    monotonic = all(a == a and b == b and a >= b for a, b in zip(atr, atr[1:]))
+    return monotonic and usable
+
+def _atr_threshold_state(state):
+    _, first_atr, last_atr, usable = _atr_tail_state(state)
+    if not usable:
+        return False
+    return (first_atr - last_atr) / first_atr > 0.15
+
+def _sample_size_state(state):
+    return state.bars >= 120
+
+def _tight_consolidation_state(state):
+    consolidation_range = (state.window_value('first45_high') - state.window_value('first45_low')) / state.close_mean(0, 45)
+    return 0.05 <= consolidation_range <= 0.25
+
+def _volatility_impulse_state(state):
+    return state.impulse_count > 0
+
+def _low_volume_consolidation_state(state):
+    avg_volume = state.volume_mean(120)
+    recent_volume = state.volume_mean(20)
+    recent_range = (state.window_value('last20_high') - state.window_value('last20_low')) / state.close_mean(100, 120)
+    return (recent_volume >= (avg_volume * 0.10) and
+            recent_volume <= (avg_volume * 1.5) and
+            recent_range <= 0.15)
+
+def _ema_proximity_state(state):
+    for close, ema20_value in zip(state.last_closes(15), state.ema_tail(15)):
+        if abs(close - ema20_value) / close > 0.05:
+            return False
+    return True
+
+def _reversal_level_state(state):
+    reversal_level = state.window_value('first100_high') * (1 - 0.15)
+    return not state.window_has_nan('last30_close') and state.window_value('last30_close') > reversal_level
+
+# Screens over a prefilter summary (see prefilter.py). summary['slack'] is how many
+# bars may have closed since it was taken. The bar count is a strict bound; the
+# range and EMA distance checks are heuristics with thresholds loosened by margin.
+# NaN figures never rule a ticker out
+
+def _sample_size_summary(summary, margin):
+    return summary['bars'] + summary['slack'] >= 120
+
+def _low_volume_consolidation_summary(summary, margin):
+    return not summary['recent_range'] > 0.15 * (1 + margin)
+
+def _ema_proximity_summary(summary, margin):
+    return not abs(summary['last_close'] - summary['ema20']) / summary['last_close'] > 0.05 * (1 + margin)
+
+# The same checks at every bar of a history at once (see backtest.py); element t
+# of each returned bool array is the outcome of the batch check on data[:t + 1]
+# wherever the pattern's bar minimum and gates let the check run
+
+def _atr_usable_bars(bars):
+    first_atr, last_atr = bars.shift(bars.atr, 9), bars.atr
+    return ~(np.isnan(first_atr) | np.isnan(last_atr) | (first_atr == 0))
+
+def _atr_decrease_bars(bars):
+    steps = np.zeros(bars.n, dtype=bool)
+    steps[1:] = bars.atr[1:] <= bars.atr[:-1]
+    return bars.rolling(steps, 9, 'all') & _atr_usable_bars(bars)
+
+def _atr_threshold_bars(bars):
+    first_atr, last_atr = bars.shift(bars.atr, 9), bars.atr
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return _atr_usable_bars(bars) & ((first_atr - last_atr) / first_atr > 0.15)
+
+def _sample_size_bars(bars):
+    return np.arange(bars.n) >= 119
+
+def _tight_consolidation_bars(bars):
+    consolidation_range = (bars.rolling(bars.high, 45, 'max', lag=75) - bars.rolling(bars.low, 45, 'min', lag=75)) / bars.rolling(bars.close, 45, 'mean', lag=75)
+    return (consolidation_range >= 0.05) & (consolidation_range <= 0.25)
+
+def _volatility_impulse_bars(bars):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        moves = np.abs(bars.close / bars.shift(bars.close, 1) - 1)
+    return bars.rolling((moves >= 0.03) & (moves <= 0.30), 39, 'any', lag=20)
+
+def _low_volume_consolidation_bars(bars):
+    avg_volume = bars.rolling(bars.volume, 120, 'mean')
+    recent_volume = bars.rolling(bars.volume, 20, 'mean')
+    recent_range = (bars.rolling(bars.high, 20, 'max') - bars.rolling(bars.low, 20, 'min')) / bars.rolling(bars.close, 20, 'mean')
+    return ((recent_volume >= (avg_volume * 0.10)) &
+            (recent_volume <= (avg_volume * 1.5)) &
+            (recent_range <= 0.15))
+
+def _ema_proximity_bars(bars):
+    closes = bars.trailing(bars.close, 15)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        far = np.abs(closes - bars.window_ema(20, 120, 15)) / closes > 0.05
+    return ~far.any(axis=1)
+
+def _reversal_level_bars(bars):
+    reversal_level = bars.rolling(bars.high, 100, 'max', lag=20) * (1 - 0.15)
+    return bars.rolling(bars.close, 30, 'strict_min') > reversal_level
+
+CONDITIONS = {
+    condition.name: condition for condition in [
+        Condition("atr_decrease", "ATR Decrease Over Period", _atr_decrease, cost=3.0, pass_rate=0.1, lookback=25,
+                  incremental=_atr_decrease_state,
+                  vectorized=_atr_decrease_bars),
+        Condition("atr_threshold", "ATR Threshold Check", _atr_threshold, cost=3.0, pass_rate=0.3, lookback=25,
+                  incremental=_atr_threshold_state,
+                  vectorized=_atr_threshold_bars),
+        Condition("sample_size", "Minimum 120 Candles Available", _sample_size, cost=0.1, pass_rate=0.9, gate=True,
+                  incremental=_sample_size_state,
+                  summary_check=_sample_size_summary,
+                  vectorized=_sample_size_bars),
+        Condition("tight_consolidation", "Price Range within 5-25% of Mean", _tight_consolidation, cost=1.0, pass_rate=0.5,
+                  incremental=_tight_consolidation_state,
+                  vectorized=_tight_consolidation_bars),
+        Condition("volatility_impulse", "Price Move between 3-30%", _volatility_impulse, cost=1.5, pass_rate=0.6,
+                  incremental=_volatility_impulse_state,
+                  vectorized=_volatility_impulse_bars),
+        Condition("low_volume_consolidation", "Volume 10-150% of Average & Range ≤15%", _low_volume_consolidation, cost=1.5, pass_rate=0.3,
+                  incremental=_low_volume_consolidation_state,
+                  summary_check=_low_volume_consolidation_summary,
+                  vectorized=_low_volume_consolidation_bars),
+        Condition("ema_proximity", "Price within 5% of EMA20", _ema_proximity, cost=2.0, pass_rate=0.3,
+                  incremental=_ema_proximity_state,
+                  summary_check=_ema_proximity_summary,
+                  vectorized=_ema_proximity_bars),
+        Condition("reversal_level", "Price Above 15% Reversal Level", _reversal_level, cost=1.0, pass_rate=0.6,
+                  incremental=_reversal_level_state,
+                  vectorized=_reversal_level_bars)
+    ]
+}
+
+_LOW_VOLUME_CONDITIONS = ["sample_size", "tight_consolidation", "volatility_impulse", "low_volume_consolidation", "ema_proximity"]
+
+PATTERNS = {
+    pattern.name.lower(): pattern for pattern in [
+        Pattern("Volatility Contraction", [CONDITIONS[name] for name in ["atr_decrease", "atr_threshold"]]),
+        Pattern("Low Volume Stock Selection", [CONDITIONS[name] for name in _LOW_VOLUME_CONDITIONS]),
+        Pattern("15% Reversal", [CONDITIONS[name] for name in _LOW_VOLUME_CONDITIONS + ["reversal_level"]])
+    ]
+}
+
+def get_pattern(pattern_type):
+    return PATTERNS.get(pattern_type.lower())
+
+def evaluate_pattern(data, pattern_type, ticker="Unknown", interval="1h", need_details=True, exhaustive=False):
+    """Evaluate a registered pattern's conditions in cost order, stopping once the outcome is decided.
+
+    Returns None for an unknown pattern, otherwise a dict with 'matched',
+    'met', 'failed' and 'skipped' condition names (in the pattern's report
+    order) and 'failed_gate' (the gate that rejected the data, if any).
+
+    With need_details the evaluation continues while the ticker can still
+    reach pattern.min_logged met conditions, so the near-miss log gets a
+    complete picture; without it evaluation stops at the first failure.
+    With exhaustive every condition is checked once the gates pass, so each
+    outcome is independent of the others (for condition analytics).
+    """
+    pattern = get_pattern(pattern_type)
+    if pattern is None:
+        return None
+    if data.empty:
+        return _run_conditions(pattern, 0, None, need_details, exhaustive)
+    ctx = ConditionContext(data, ticker=ticker, interval=interval)
+    return _run_conditions(pattern, len(data), lambda condition: condition.check(ctx), need_details, exhaustive)
+
+def evaluate_pattern_state(state, pattern_type, need_details=True, exhaustive=False):
+    """evaluate_pattern over an IndicatorState instead of a frame; the result is the same.
+
+    Falls back to None for an unknown pattern or one with a condition that has
+    no incremental check, so callers can evaluate the frame instead.
+    """
+    pattern = get_pattern(pattern_type)
+    if pattern is None or any(condition.incremental is None for condition in pattern.conditions):
+        return None
+    return _run_conditions(pattern, state.bars, lambda condition: condition.incremental(state), need_details, exhaustive)
+
+def _run_conditions(pattern, bars, check, need_details, exhaustive=False):
+    outcomes = {}
+    result = {'matched': False, 'met': [], 'failed': [], 'skipped': [], 'failed_gate': None}
+
+    def finish():
+        for condition in pattern.conditions:
+            if condition.name not in outcomes:
+                result['skipped'].append(condition.name)
+            elif outcomes[condition.name]:
+                result['met'].append(condition.name)
+            else:
+                result['failed'].append(condition.name)
+        result['matched'] = not result['failed'] and not result['skipped']
+        return result
+
+    if bars < pattern.min_bars:
+        result['failed_gate'] = "min_bars"
+        return finish()
+
+    gates = [condition for condition in pattern.conditions if condition.gate]
+    others = sorted((condition for condition in pattern.conditions if not condition.gate), key=lambda c: c.rank)
+
+    for condition in gates:
+        outcomes[condition.name] = bool(check(condition))
+        if not outcomes[condition.name]:
+            result['failed_gate'] = condition.name
+            return finish()
+
+    remaining = len(others)
+    met_count = len(gates)
+    for condition in others:
+        passed = bool(check(condition))
+        outcomes[condition.name] = passed
+        remaining -= 1
+        met_count += passed
+        if passed or exhaustive:
+            continue
+        if not need_details or met_count + remaining < pattern.min_logged:
+            break
+
+    return finish()
@@ -2,26 +2,51 @@ from bs4 import BeautifulSoup
 import yfinance as yf
 import pandas as pd
 import json
+import os
+import time
+import logging
 from datetime import datetime, timedelta
-import requests
+import pytz
+from bar_store import get_bar_store
+from fetch_fixtures import FETCH_MODE, STAND_IN_HISTORY_PATH, STAND_IN_URL, frame_from_payload, get_fixture_store
+from http_client import RateLimitedError, backoff_delay, get_http_client, is_rate_limit_error
+from symbol_metadata import lookup_company_name, remember_company_name, update_symbol_metadata
+
+OFFLINE_MODE = os.environ.get("SCANNER_OFFLINE", "").lower() in ("1", "true", "yes")
+# A ticker that returns nothing for every period is retried after this many hours,
+# doubling with each further failure up to the maximum (0 disables the negative cache)
+NEGATIVE_CACHE_HOURS = float(os.environ.get("SCANNER_NEGATIVE_CACHE_HOURS", "1"))
+NEGATIVE_CACHE_MAX_HOURS = float(os.environ.get("SCANNER_NEGATIVE_CACHE_MAX_HOURS", "168"))
+# A memoized fallback period older than this is ignored, so the preferred period gets tried again
+PERIOD_MEMO_REPROBE_HOURS = float(os.environ.get("SCANNER_PERIOD_MEMO_REPROBE_HOURS", "24"))
+YAHOO_HOST = "query2.finance.yahoo.com"
+
+def load_equity_list():
+    """Download NSE's EQUITY_L.csv, or None when no mirror answers"""
+    urls = [
+        "https://archives.nseindia.com/content/equities/EQUITY_L.csv",
+        "https://www1.nseindia.com/content/equities/EQUITY_L.csv"
+    ]
+    
+    for url in urls:
+        try:
+            df = get_http_client().read_csv(url)
+            if not df.empty:
+                return df
+        except Exception as e:
+            print(f"Error loading equity list from {url}: {e}")
+            continue
+    return None
 
 def get_all_nse_stocks():
     try:
-        urls = [
-            "https://archives.nseindia.com/content/equities/EQUITY_L.csv",
-            "https://www1.nseindia.com/content/equities/EQUITY_L.csv"
-        ]
-        
-        for url in urls:
-            try:
-                df = pd.read_csv(url)
-                if not df.empty:
-                    return [f"{symbol}.NS" for symbol in df['SYMBOL'].tolist()]
-            except:
-                continue
-                
-        return []
-    except:
+        df = load_equity_list()
+        if df is None:
+            return []
+        update_symbol_metadata(df)
+        return [f"{symbol}.NS" for symbol in df['SYMBOL'].tolist()]
+    except Exception as e:
+        print(f"Error reading NSE equity list: {e}")
         return []
 
 def get_nifty50_stocks():
@@ -33,13 +58,11 @@ def get_nifty50_stocks():
         
         for url in urls:
             try:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                }
-                df = pd.read_csv(url, headers=headers)
+                df = get_http_client().read_csv(url)
                 if not df.empty:
                     return [f"{symbol}.NS" for symbol in df['Symbol'].tolist()]
-            except:
+            except Exception as e:
+                print(f"Error loading NIFTY 50 list from {url}: {e}")
                 continue
         return [
             "ADANIENT.NS", "ADANIPORTS.NS", "APOLLOHOSP.NS", "ASIANPAINT.NS",
@@ -56,7 +79,8 @@ def get_nifty50_stocks():
             "TCS.NS", "TECHM.NS", "TITAN.NS", "TRENT.NS", "ULTRACEMCO.NS",
             "WIPRO.NS"
         ]
-    except:
+    except Exception as e:
+        print(f"Error loading NIFTY 50 list: {e}")
         return []
 
 def fetch_all_tickers(exchange_filter="NSE"):
@@ -73,11 +97,7 @@ def fetch_all_tickers(exchange_filter="NSE"):
             "count": 250
         }
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        
-        response = requests.get(url, params=params, headers=headers)
+        response = get_http_client().get(url, params=params)
         json_data = json.loads(response.text)
         
         stocks = []
@@ -132,61 +152,544 @@ def fetch_all_tickers(exchange_filter="NSE"):
             return get_nifty50_stocks()
         return []
 
-def fetch_stock_data(ticker, interval='1h'):
+INTERVAL_PERIODS = {
+    '15m': ['5d', '1d'],      
+    '30m': ['5d', '5d', '1d'],      
+    '1h': ['1mo', '5d', '1d'],
+    '1d': ['6mo', '3mo', '1mo', '5d', '1d', 'ytd', 'max'],
+    '5d': ['2y', '1y', '6mo', '3mo', '1mo', 'ytd', 'max']
+}
+
+HISTORY_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+
+def get_periods_to_try(interval):
+    return INTERVAL_PERIODS.get(interval, ['1mo', '5d', '1d'])
+
+def _recheck_delay(failures):
+    """Seconds before a ticker with failures consecutive empty fetches is tried again"""
+    return min(NEGATIVE_CACHE_MAX_HOURS, NEGATIVE_CACHE_HOURS * 2 ** (failures - 1)) * 3600
+
+def _awaiting_recheck(memo, now=None):
+    """True while a ticker that returned nothing is in the negative cache"""
+    if not NEGATIVE_CACHE_HOURS or memo is None or memo['retry_at'] is None:
+        return False
+    return (now or datetime.now(pytz.UTC)) < memo['retry_at']
+
+def _reprobe_due(memo, periods_to_try, now=None):
+    """True when memo holds a fallback period that was last confirmed PERIOD_MEMO_REPROBE_HOURS ago"""
+    if memo is None or not memo['period'] or memo['period'] == periods_to_try[0] or memo['updated_at'] is None:
+        return False
+    return (now or datetime.now(pytz.UTC)) - memo['updated_at'] >= timedelta(hours=PERIOD_MEMO_REPROBE_HOURS)
+
+def _memo_periods(periods_to_try, memo):
+    """periods_to_try with the ticker's last working period moved to the front"""
+    if memo is None or memo['period'] not in periods_to_try:
+        return list(periods_to_try)
+    return [memo['period']] + [period for period in periods_to_try if period != memo['period']]
+
+def _remember_fetch(store, ticker, interval, data, period, has_period_issues):
+    """Feed one fetch outcome into the period memo or the negative cache.
+
+    Only call this with a conclusive result: an empty data must mean Yahoo
+    answered every period with no bars, not that a request failed.
+    """
     try:
-        stock = yf.Ticker(ticker)
-        
-        interval_config = {
-            '15m': ['5d', '1d'],      
-            '30m': ['5d', '5d', '1d'],      
-            '1h': ['1mo', '5d', '1d'],
-            '1d': ['6mo', '3mo', '1mo', '5d', '1d', 'ytd', 'max'],
-            '5d': ['2y', '1y', '6mo', '3mo', '1mo', 'ytd', 'max']
-        }
+        if data.empty:
+            if NEGATIVE_CACHE_HOURS:
+                store.record_fetch_failure(ticker, interval, _recheck_delay, error="no data for any period")
+        elif period:
+            store.remember_period(ticker, interval, period, has_period_issues)
+    except Exception as e:
+        print(f"Error updating fetch memo for {ticker}: {e}")
+
+def _stand_in_history(tickers, interval, period=None, start=None):
+    """{ticker: frame} from the stand-in server, rate limited as the Yahoo host"""
+    params = {'tickers': ",".join(tickers), 'interval': interval}
+    if period is not None:
+        params['period'] = period
+    if start is not None:
+        params['start'] = pd.Timestamp(start).isoformat()
+    response = get_http_client().get(f"https://{YAHOO_HOST}{STAND_IN_HISTORY_PATH}", params=params)
+    response.raise_for_status()
+    frames = {ticker: frame_from_payload(payload) for ticker, payload in response.json().items()}
+    return {ticker: frame for ticker, frame in frames.items() if not frame.empty}
+
+def _is_missing_data_error(error):
+    """True when Yahoo answered but had no bars (unknown or delisted symbol, empty range)"""
+    text = str(error).lower()
+    if 'status_code' in text:
+        # Yahoo served an error page, which says nothing about the symbol
+        return False
+    return type(error).__name__ in ('YFTickerMissingError', 'YFTzMissingError', 'YFPricesMissingError') or any(
+        phrase in text for phrase in ('delisted', 'no data found', 'no price data found', 'no timezone found')
+    )
+
+def _history(stock, interval, **kwargs):
+    """stock.history(interval=..., period=... or start=...), replayed or served by the stand-in when configured.
+
+    An empty frame means Yahoo answered with no bars; a failed request raises.
+    """
+    if FETCH_MODE == 'replay':
+        return get_fixture_store().history(stock.ticker, interval, **kwargs)
+    if STAND_IN_URL:
+        return _stand_in_history([stock.ticker], interval, **kwargs).get(stock.ticker, pd.DataFrame())
+    with get_http_client().slot(YAHOO_HOST):
+        try:
+            # Without raise_errors, history() hides network failures behind an empty frame
+            data = stock.history(interval=interval, raise_errors=True, **kwargs)
+        except Exception as e:
+            if not _is_missing_data_error(e):
+                raise
+            data = pd.DataFrame()
+    if FETCH_MODE == 'record':
+        get_fixture_store().save_history(stock.ticker, interval, data)
+    return data
+
+def _fetch_history_with_fallback(stock, interval, periods_to_try, first_period):
+    """(data, has_period_issues, used_period) from the first period that returns bars.
+
+    When no period returns bars and at least one request failed for a reason
+    other than an invalid period, the last such error is raised, so a
+    transient failure is never mistaken for a symbol without data.
+    """
+    data = pd.DataFrame()
+    period_errors = []
+    has_period_issues = False
+    used_period = None
+    request_error = None
+    
+    for period in periods_to_try:
+        try:
+            temp_data = _history(stock, interval, period=period)
+            if not temp_data.empty:
+                data = temp_data
+                used_period = period
+                if period != first_period:
+                    has_period_issues = True
+                break
+        except Exception as e:
+            if is_rate_limit_error(e):
+                # Throttling says nothing about the period; let the caller report it
+                raise
+            error_str = str(e)
+            period_errors.append(f"Period '{period}': {error_str}")
+            if "Period" in error_str and "is invalid" in error_str:
+                has_period_issues = True
+            else:
+                request_error = e
+            continue
+    
+    if data.empty and request_error is not None:
+        raise request_error
+    
+    if period_errors:
+        has_period_issues = True
+    
+    return data, has_period_issues, used_period
+
+def _period_span(period):
+    """Rough calendar span of a yfinance period string, None for unbounded periods"""
+    if period in ('max', 'ytd') or not period:
+        return None
+    if period.endswith('mo'):
+        return timedelta(days=31 * int(period[:-2]))
+    if period.endswith('y'):
+        return timedelta(days=366 * int(period[:-1]))
+    if period.endswith('d'):
+        # trading days: leave room for weekends and holidays
+        return timedelta(days=int(period[:-1]) * 7 // 5 + 4)
+    return None
+
+def trim_to_period(data, period):
+    """Keep the bars a history(period=...) call made at the last bar would have returned"""
+    if data.empty or not period or period == 'max':
+        return data
+    last = data.index[-1]
+    if period == 'ytd':
+        return data[data.index >= last.normalize().replace(month=1, day=1)]
+    if period.endswith('mo'):
+        return data[data.index > last - pd.DateOffset(months=int(period[:-2]))]
+    if period.endswith('y'):
+        return data[data.index > last - pd.DateOffset(years=int(period[:-1]))]
+    if period.endswith('d'):
+        dates = data.index.normalize()
+        keep = dates.unique()[-int(period[:-1]):]
+        return data[dates.isin(keep)]
+    return data
+
+def _can_append(info, now=None):
+    """True when the stored series is recent enough to be extended instead of re-downloaded"""
+    if info is None or not info['period']:
+        return False
+    span = _period_span(info['period'])
+    if span is None:
+        return True
+    now = now or pd.Timestamp.now(tz='UTC')
+    return now - info['last_timestamp'] < span
+
+def _has_new_corporate_action(store, ticker, interval, new_bars):
+    """True when new_bars carry a split or dividend the stored bars have not seen.
+
+    Downloads are auto-adjusted, so such a bar means every stored bar before
+    it is on the old price scale and the series must be downloaded again.
+    """
+    actions = [column for column in ('Dividends', 'Stock Splits') if column in new_bars.columns]
+    if new_bars.empty or not actions:
+        return False
+    flagged = pd.DatetimeIndex(new_bars.index[(new_bars[actions].fillna(0) != 0).any(axis=1)])
+    if flagged.empty:
+        return False
+    stored = store.get_bars(ticker, interval, since=flagged.min())
+    if stored.empty:
+        return True
+    seen = stored.index[(stored[actions] != 0).any(axis=1)]
+    return not flagged.isin(seen).all()
+
+def _load_stored(store, ticker, interval, info):
+    if info is None:
+        return pd.DataFrame(), False
+    span = _period_span(info['period'])
+    since = info['last_timestamp'] - span * 2 if span is not None else None
+    data = trim_to_period(store.get_bars(ticker, interval, since=since), info['period'])
+    return data, info['has_period_issues']
+
+def _store_bars(store, ticker, interval, data, period=None, has_period_issues=False):
+    try:
+        store.append_bars(ticker, interval, data, period=period, has_period_issues=has_period_issues)
+    except Exception as e:
+        print(f"Error storing bars for {ticker}: {e}")
+
+def fetch_stock_data(ticker, interval='1h', offline=None):
+    """(data, has_period_issues) for one ticker, extending its stored bars when possible.
+
+    A full download starts from the ticker's last working period, unless that
+    was a fallback period last confirmed PERIOD_MEMO_REPROBE_HOURS ago: then
+    the stored bars are re-downloaded from the preferred period down. New
+    bars carrying a split or dividend also trigger a full re-download, since
+    the stored bars were adjusted before it. A ticker in the negative cache
+    returns an empty frame without a request.
+    """
+    if offline is None:
+        offline = OFFLINE_MODE
+    try:
+        store = get_bar_store()
+        info = store.get_series_info(ticker, interval)
+        if offline:
+            return _load_stored(store, ticker, interval, info)
         
-        periods_to_try = interval_config.get(interval, ['1mo', '5d', '1d'])
+        memo = store.get_fetch_memo(ticker, interval)
+        if _awaiting_recheck(memo):
+            return pd.DataFrame(), True
         
-        data = pd.DataFrame()
-        period_errors = []
-        has_period_issues = False
+        stock = yf.Ticker(ticker)
+        periods_to_try = get_periods_to_try(interval)
+        reprobe = _reprobe_due(memo, periods_to_try)
+        if reprobe:
+            memo = None
         
-        for period in periods_to_try:
+        if not reprobe and _can_append(info):
             try:
-                temp_data = stock.history(period=period, interval=interval)
-                if not temp_data.empty:
-                    data = temp_data
-                    if period != periods_to_try[0]:
-                        has_period_issues = True
-                    break
+                new_bars = _history(stock, interval, start=info['last_timestamp'])
+                if not _has_new_corporate_action(store, ticker, interval, new_bars):
+                    _store_bars(store, ticker, interval, new_bars)
+                    return _load_stored(store, ticker, interval, store.get_series_info(ticker, interval))
+                store.delete_series(ticker, interval)
+                memo = None
             except Exception as e:
-                error_str = str(e)
-                period_errors.append(f"Period '{period}': {error_str}")
-                if "Period" in error_str and "is invalid" in error_str:
-                    has_period_issues = True
-                continue
+                print(f"Error updating stored bars for {ticker}: {e}")
         
-        if period_errors:
-            has_period_issues = True
+        data, has_period_issues, used_period = _fetch_history_with_fallback(stock, interval, _memo_periods(periods_to_try, memo), periods_to_try[0])
+        _remember_fetch(store, ticker, interval, data, used_period, has_period_issues)
         
         if data.empty:
             return pd.DataFrame(), has_period_issues
-            
+        
+        _store_bars(store, ticker, interval, data, period=used_period, has_period_issues=has_period_issues)
         return data, has_period_issues
 
     except Exception as e:
         print(f"Error fetching data for {ticker}: {e}")
         return pd.DataFrame(), False
 
+def _split_batch_frame(batch_data, tickers):
+    """Split a grouped yf.download frame into one history()-shaped frame per ticker"""
+    frames = {}
+    if batch_data is None or batch_data.empty:
+        return frames
+    
+    if isinstance(batch_data.columns, pd.MultiIndex):
+        available = set(batch_data.columns.get_level_values(0))
+        groups = [(ticker, batch_data[ticker]) for ticker in tickers if ticker in available]
+    elif len(tickers) == 1:
+        groups = [(tickers[0], batch_data)]
+    else:
+        return frames
+    
+    for ticker, frame in groups:
+        price_columns = [c for c in ['Open', 'High', 'Low', 'Close'] if c in frame.columns]
+        frame = frame.dropna(how='all', subset=price_columns)
+        if frame.empty:
+            continue
+        frame = frame[[c for c in HISTORY_COLUMNS if c in frame.columns]].copy()
+        for column in ['Dividends', 'Stock Splits']:
+            if column in frame.columns:
+                frame[column] = frame[column].fillna(0.0)
+        if 'Volume' in frame.columns and not frame['Volume'].isna().any():
+            frame['Volume'] = frame['Volume'].astype('int64')
+        frame.columns.name = None
+        frames[ticker] = frame
+    return frames
+
+class BatchRateLimitedError(RateLimitedError):
+    """A batch download still throttled after every retry.
+
+    frames holds the tickers that did download and throttled the ones that
+    did not, so callers can keep the former without re-requesting the latter.
+    """
+
+    def __init__(self, message, frames, throttled):
+        super().__init__(message)
+        self.frames = frames
+        self.throttled = list(throttled)
+
+class _DownloadErrors(logging.Handler):
+    """Collects the per-ticker errors yf.download logs instead of raising, for the tickers of one batch"""
+
+    def __init__(self, tickers):
+        super().__init__(logging.ERROR)
+        self.tickers = [ticker.upper() for ticker in tickers]
+        self.messages = []
+
+    def emit(self, record):
+        message = record.getMessage()
+        # yf.download logs "['A.NS', 'B.NS']: <error>"; other threads' batches name other tickers
+        if any(f"'{ticker}'" in message for ticker in self.tickers):
+            self.messages.append(message)
+
+    def rate_limited(self, ticker):
+        ticker = f"'{ticker.upper()}'"
+        return any(ticker in message and is_rate_limit_error(Exception(message)) for message in self.messages)
+
+    def __enter__(self):
+        logging.getLogger('yfinance').addHandler(self)
+        return self
+
+    def __exit__(self, *exc):
+        logging.getLogger('yfinance').removeHandler(self)
+
+def _yf_download(tickers, interval, **kwargs):
+    """{ticker: frame} from yf.download, retrying the throttled tickers with backoff.
+
+    yf.download reports a 429 only in its log, so each attempt records the
+    throttle on the Yahoo limiter itself; raises BatchRateLimitedError when
+    tickers are still throttled after the last retry.
+    """
+    client = get_http_client()
+    frames = {}
+    pending = list(tickers)
+    for attempt in range(client.max_retries + 1):
+        if attempt:
+            client.limiter(YAHOO_HOST).record_retry()
+            time.sleep(backoff_delay(attempt - 1))
+        try:
+            with client.slot(YAHOO_HOST), _DownloadErrors(pending) as errors:
+                batch_data = yf.download(
+                    pending,
+                    interval=interval,
+                    group_by='ticker',
+                    auto_adjust=True,
+                    actions=True,
+                    threads=False,
+                    progress=False,
+                    **kwargs
+                )
+                downloaded = _split_batch_frame(batch_data, pending)
+                if FETCH_MODE == 'record':
+                    for ticker, frame in downloaded.items():
+                        get_fixture_store().save_history(ticker, interval, frame)
+                frames.update(downloaded)
+                pending = [ticker for ticker in pending if ticker not in frames and errors.rate_limited(ticker)]
+                if pending:
+                    raise RateLimitedError(f"Yahoo rate limited {len(pending)} of {len(tickers)} tickers")
+            return frames
+        except Exception as e:
+            if not is_rate_limit_error(e):
+                raise
+            if attempt == client.max_retries:
+                raise BatchRateLimitedError(f"{e} after {attempt + 1} attempts", frames, pending or tickers) from e
+    return frames
+
+def _download_batch(tickers, interval, **kwargs):
+    """{ticker: frame} for one yf.download request (period=... or start=...); replayed or stand-in served when configured.
+
+    Errors other than throttling are reported and return {}; throttling
+    raises BatchRateLimitedError instead, so callers do not fan the batch out
+    into per-ticker requests against a host that is already refusing them.
+    """
+    try:
+        if FETCH_MODE == 'replay':
+            frames = {ticker: get_fixture_store().history(ticker, interval, **kwargs) for ticker in tickers}
+            return {ticker: frame for ticker, frame in frames.items() if not frame.empty}
+        if STAND_IN_URL:
+            return _stand_in_history(tickers, interval, **kwargs)
+        return _yf_download(tickers, interval, **kwargs)
+    except BatchRateLimitedError:
+        raise
+    except Exception as e:
+        if is_rate_limit_error(e):
+            raise BatchRateLimitedError(str(e), {}, tickers) from e
+        print(f"Error batch fetching {len(tickers)} tickers: {e}")
+        return {}
+
+def _download_batch_throttled(tickers, interval, **kwargs):
+    """(frames, throttled tickers) of _download_batch, reporting a batch that stayed rate limited"""
+    try:
+        return _download_batch(tickers, interval, **kwargs), set()
+    except BatchRateLimitedError as e:
+        print(f"Rate limited batch fetching {len(tickers)} tickers: {e}")
+        return e.frames, set(e.throttled)
+
+def fetch_stock_data_batch(tickers, interval='1h', chunk_size=50, offline=None):
+    """Fetch OHLCV for many tickers with one yf.download request per chunk.
+
+    Returns {ticker: (data, has_period_issues)} with the same contract as
+    fetch_stock_data. Stored tickers download only the bars after their last
+    stored one, and are re-downloaded in full when those bars carry a new
+    split or dividend. The rest are downloaded in one batch per starting
+    period: the memoized working period, or the first period when there is
+    none or a fallback memo is due for a re-probe. A ticker missing from its
+    batch walks the periods with history(); negatively cached tickers are
+    skipped. Once Yahoo keeps throttling a batch, no per-ticker walks follow:
+    those tickers return their stored bars, or nothing. With offline set,
+    everything is served from the store.
+    """
+    if offline is None:
+        offline = OFFLINE_MODE
+    tickers = list(dict.fromkeys(tickers))
+    periods_to_try = get_periods_to_try(interval)
+    store = get_bar_store()
+    results = {}
+    
+    for start in range(0, len(tickers), max(1, chunk_size)):
+        chunk = tickers[start:start + chunk_size]
+        infos = {}
+        for ticker in chunk:
+            try:
+                infos[ticker] = store.get_series_info(ticker, interval)
+            except Exception as e:
+                print(f"Error reading stored bars for {ticker}: {e}")
+                infos[ticker] = None
+        
+        if offline:
+            for ticker in chunk:
+                results[ticker] = _load_stored(store, ticker, interval, infos[ticker])
+            continue
+        
+        try:
+            memos = store.get_fetch_memos(chunk, interval)
+        except Exception as e:
+            print(f"Error reading fetch memos: {e}")
+            memos = {}
+        reprobe = set()
+        for ticker in chunk:
+            if _awaiting_recheck(memos.get(ticker)):
+                results[ticker] = (pd.DataFrame(), True)
+            elif _reprobe_due(memos.get(ticker), periods_to_try):
+                reprobe.add(ticker)
+                memos.pop(ticker)
+        
+        stored = [ticker for ticker in chunk if ticker not in results and ticker not in reprobe and _can_append(infos[ticker])]
+        if stored:
+            since = min(infos[ticker]['last_timestamp'] for ticker in stored)
+            # Throttled tickers keep serving the bars already stored
+            frames, _ = _download_batch_throttled(stored, interval, start=since)
+            for ticker in stored:
+                if ticker in frames:
+                    if _has_new_corporate_action(store, ticker, interval, frames[ticker]):
+                        # Re-downloaded in full with the tickers below
+                        store.delete_series(ticker, interval)
+                        memos.pop(ticker, None)
+                        continue
+                    _store_bars(store, ticker, interval, frames[ticker])
+                    infos[ticker] = store.get_series_info(ticker, interval)
+                results[ticker] = _load_stored(store, ticker, interval, infos[ticker])
+        
+        missing = [ticker for ticker in chunk if ticker not in results]
+        if not missing:
+            continue
+        
+        by_period = {}
+        for ticker in missing:
+            by_period.setdefault(_memo_periods(periods_to_try, memos.get(ticker))[0], []).append(ticker)
+        rate_limited = False
+        for period, group in by_period.items():
+            if rate_limited:
+                frames, throttled = {}, set(group)
+            else:
+                frames, throttled = _download_batch_throttled(group, interval, period=period)
+                rate_limited = bool(throttled)
+            for ticker in group:
+                memo = memos.get(ticker)
+                if ticker in throttled or (rate_limited and ticker not in frames):
+                    # Yahoo is throttling us; walking the periods ticker by ticker would only add load
+                    results[ticker] = (pd.DataFrame(), False)
+                    continue
+                if ticker in frames:
+                    has_period_issues = period != periods_to_try[0]
+                    _store_bars(store, ticker, interval, frames[ticker], period=period, has_period_issues=has_period_issues)
+                    _remember_fetch(store, ticker, interval, frames[ticker], period, has_period_issues)
+                    results[ticker] = (frames[ticker], has_period_issues)
+                    continue
+                try:
+                    # The batch does not say why a ticker is missing, so the walk asks again for
+                    # every period and only a clean "no bars" for all of them negative-caches it
+                    data, has_period_issues, used_period = _fetch_history_with_fallback(yf.Ticker(ticker), interval, _memo_periods(periods_to_try, memo), periods_to_try[0])
+                    _remember_fetch(store, ticker, interval, data, used_period, has_period_issues)
+                    _store_bars(store, ticker, interval, data, period=used_period, has_period_issues=has_period_issues)
+                    results[ticker] = (data, has_period_issues)
+                except Exception as e:
+                    print(f"Error fetching data for {ticker}: {e}")
+                    results[ticker] = (pd.DataFrame(), False)
+                    rate_limited = rate_limited or is_rate_limit_error(e)
+    
+    return results
+
+def fetch_history_batch(tickers, interval, period, chunk_size=50):
+    """Download period of history for many tickers into the bar store (e.g. years of bars for a backtest).
+
+    The series' scan period is left as it was, so scans keep reading only
+    their usual window of the now longer stored history. Stops after a chunk
+    Yahoo keeps throttling. Returns the number of tickers that got bars.
+    """
+    store = get_bar_store()
+    fetched = 0
+    tickers = list(dict.fromkeys(tickers))
+    for start in range(0, len(tickers), max(1, chunk_size)):
+        frames, throttled = _download_batch_throttled(tickers[start:start + chunk_size], interval, period=period)
+        for ticker, frame in frames.items():
+            _store_bars(store, ticker, interval, frame)
+            fetched += 1
+        if throttled:
+            print(f"Stopping history download: Yahoo is still rate limiting after {fetched} tickers")
+            break
+    return fetched
+
 def get_company_name(ticker):
+    company_name = lookup_company_name(ticker, loader=load_equity_list)
+    if company_name:
+        return company_name
+    
     try:
         symbol = ticker.replace('.NS', '')
         url = f"https://www1.nseindia.com/live_market/dynaContent/live_watch/get_quote/GetQuote.jsp?symbol={symbol}"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers)
+        response = get_http_client().get(url)
         soup = BeautifulSoup(response.content, 'html.parser')
         company_name = soup.find('h2').text.strip()
-        return company_name
-    except:
-        return ticker.replace('.NS', '')
\ No newline at end of file
+    except RateLimitedError as e:
+        # Don't remember a placeholder name just because NSE throttled us
+        print(f"Rate limited looking up company name for {ticker}: {e}")
+        return ticker.replace('.NS', '')
+    except Exception:
+        company_name = ticker.replace('.NS', '')
+    remember_company_name(ticker, company_name)
+    return company_name
@@ -0,0 +1,181 @@
+import os
+import json
+import hashlib
+import threading
+import pandas as pd
+
+# live: talk to Yahoo/NSE; record: talk to them and save every response as a fixture;
+# replay: answer every request from the fixtures without touching the network
+FETCH_MODE = os.environ.get("SCANNER_FETCH_MODE", "live").lower()
+FIXTURE_DIR = os.environ.get("SCANNER_FIXTURE_DIR", os.path.join("data", "fixtures"))
+# Base URL of a stand_in_server.py instance; when set, every outbound request goes there instead
+STAND_IN_URL = os.environ.get("SCANNER_STAND_IN_URL", "").rstrip("/")
+# Virtual path on the Yahoo host the stand-in answers history requests on (yfinance has no HTTP hook)
+STAND_IN_HISTORY_PATH = "/_stand_in/history"
+
+def canonical_url(method, url, params=None):
+    """The exact URL requests would send, used as the fixture key"""
+    import requests
+    return requests.Request(method.upper(), url, params=params).prepare().url
+
+def frame_to_payload(data):
+    """JSON-safe form of a history() frame that round-trips index timezone and dtypes"""
+    index = data.index
+    tz = str(index.tz) if getattr(index, 'tz', None) is not None else None
+    return {
+        'index_name': index.name,
+        'tz': tz,
+        # epoch nanoseconds (UTC for tz-aware indexes)
+        'index': index.as_unit('ns').asi8.tolist(),
+        'columns': list(data.columns),
+        'dtypes': {column: str(dtype) for column, dtype in data.dtypes.items()},
+        'data': data.astype(object).where(data.notna(), None).values.tolist()
+    }
+
+def frame_from_payload(payload):
+    if not payload or not payload['index']:
+        return pd.DataFrame()
+    index = pd.to_datetime(payload['index'], unit='ns', utc=bool(payload['tz']))
+    if payload['tz']:
+        index = index.tz_convert(payload['tz'])
+    index.name = payload['index_name']
+    data = pd.DataFrame(payload['data'], index=index, columns=payload['columns'])
+    return data.astype(payload['dtypes'])
+
+def slice_history(data, period=None, start=None):
+    """The part of a recorded frame a history(period=...) or history(start=...) call would return"""
+    if data.empty:
+        return data
+    if start is not None:
+        start = pd.Timestamp(start)
+        if start.tzinfo is None and data.index.tz is not None:
+            start = start.tz_localize(data.index.tz)
+        return data[data.index >= start]
+    from fetch_data import trim_to_period
+    return trim_to_period(data, period)
+
+def _safe_name(name):
+    return "".join(c if c.isalnum() or c in "-_.&" else "_" for c in name)
+
+def _write_json(path, payload):
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+    temp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    os.replace(temp_file, path)
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+class FixtureStore:
+    """Recorded Yahoo/NSE responses on disk.
+
+    Plain HTTP responses (screener JSON, EQUITY_L.csv, quote pages) are keyed by
+    method and full URL under http/. Price history is kept as one merged frame
+    per (ticker, interval) under history/, so replay can answer any period or
+    start= request regardless of how the recording run batched its downloads.
+    """
+
+    def __init__(self, root=FIXTURE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _http_path(self, method, url):
+        key = hashlib.sha1(f"{method.upper()} {url}".encode('utf-8')).hexdigest()
+        return os.path.join(self.root, "http", f"{key}.json")
+
+    def _history_path(self, ticker, interval):
+        return os.path.join(self.root, "history", _safe_name(interval), f"{_safe_name(ticker)}.json")
+
+    def save_response(self, method, url, status, headers, content):
+        """Record one response; url is the canonical_url of the request"""
+        body_path = self._http_path(method, url)[:-5] + ".body"
+        directory = os.path.dirname(body_path)
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        with open(body_path, 'wb') as f:
+            f.write(content)
+        _write_json(self._http_path(method, url), {
+            'method': method.upper(),
+            'url': url,
+            'status': status,
+            'content_type': headers.get('Content-Type'),
+            'body_file': os.path.basename(body_path)
+        })
+
+    def load_response(self, method, url):
+        """(status, content_type, content) of a recorded response, or None"""
+        meta = _read_json(self._http_path(method, url))
+        if meta is None:
+            return None
+        try:
+            with open(os.path.join(os.path.dirname(self._http_path(method, url)), meta['body_file']), 'rb') as f:
+                return meta['status'], meta['content_type'], f.read()
+        except OSError:
+            return None
+
+    def save_history(self, ticker, interval, data):
+        """Merge a downloaded frame into the recorded history of (ticker, interval)"""
+        if data is None or data.empty:
+            return
+        path = self._history_path(ticker, interval)
+        with self._lock:
+            stored = frame_from_payload(_read_json(path))
+            if not stored.empty:
+                data = pd.concat([stored, data.tz_convert(stored.index.tz) if stored.index.tz is not None else data])
+                data = data[~data.index.duplicated(keep='last')].sort_index()
+            _write_json(path, frame_to_payload(data))
+
+    def load_history(self, ticker, interval):
+        return frame_from_payload(_read_json(self._history_path(ticker, interval)))
+
+    def history(self, ticker, interval, period=None, start=None, **kwargs):
+        """Replayed answer to history()/download() for one ticker; empty when nothing was recorded"""
+        return slice_history(self.load_history(ticker, interval), period=period, start=start)
+
+    def history_tickers(self, interval):
+        try:
+            return sorted(name[:-5] for name in os.listdir(os.path.join(self.root, "history", _safe_name(interval))) if name.endswith(".json"))
+        except OSError:
+            return []
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_fixture_store():
+    """Process-wide FixtureStore for the record and replay modes."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FixtureStore()
+        return _store
+
+def replayed_response(method, url):
+    """A requests.Response built from the fixture for url, or a 404 when none was recorded"""
+    import requests
+    response = requests.Response()
+    response.url = url
+    recorded = get_fixture_store().load_response(method, url)
+    if recorded is None:
+        response.status_code = 404
+        response._content = b""
+        response.reason = "No fixture recorded"
+        return response
+    status, content_type, content = recorded
+    response.status_code = status
+    response._content = content
+    if content_type:
+        response.headers['Content-Type'] = content_type
+    return response
+
+def stand_in_url(url):
+    """Rewrite https://host/path?query to the stand-in server as STAND_IN_URL/host/path?query"""
+    from urllib.parse import urlsplit
+    parts = urlsplit(url)
+    return f"{STAND_IN_URL}/{parts.hostname}{parts.path}" + (f"?{parts.query}" if parts.query else "")
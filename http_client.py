@@ -0,0 +1,303 @@
+import io
+import os
+import json
+import time
+import random
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from datetime import datetime
+import pytz
+
+from fetch_fixtures import FETCH_MODE, STAND_IN_URL, canonical_url, get_fixture_store, replayed_response, stand_in_url
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+DEFAULT_TIMEOUT = (5, 30)
+MAX_RETRIES = int(os.environ.get("SCANNER_HTTP_RETRIES", "3"))
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_CAP_SECONDS = 30.0
+# Throttles landing within this window of the last cut are treated as the same congestion event
+DECREASE_COOLDOWN_SECONDS = 1.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Snapshot of the per-host metrics, written by the scan worker so the UI process can show them
+METRICS_FILE = os.environ.get("SCANNER_HTTP_METRICS_FILE", os.path.join("data", "http_metrics.json"))
+
+# requests per second, burst and the concurrency range each host is allowed;
+# NSE blocks aggressive clients quickly, Yahoo tolerates more
+DEFAULT_HOST_LIMITS = {'rate': float(os.environ.get("SCANNER_HTTP_RATE", "5")), 'burst': 10, 'min_concurrency': 1, 'max_concurrency': 8}
+HOST_LIMITS = {
+    'archives.nseindia.com': {'rate': 2.0, 'burst': 4, 'max_concurrency': 2},
+    'www1.nseindia.com': {'rate': 2.0, 'burst': 4, 'max_concurrency': 2},
+    'www.nseindia.com': {'rate': 2.0, 'burst': 4, 'max_concurrency': 2},
+    'query1.finance.yahoo.com': {'rate': 10.0, 'burst': 20, 'max_concurrency': 16},
+    'query2.finance.yahoo.com': {'rate': 10.0, 'burst': 20, 'max_concurrency': 16},
+}
+
+class RateLimitedError(requests.HTTPError):
+    """A host kept answering 429 after every retry"""
+
+def is_rate_limit_error(error):
+    """True for HTTP 429s and the rate-limit exceptions raised by yfinance"""
+    if isinstance(error, RateLimitedError):
+        return True
+    response = getattr(error, 'response', None)
+    if response is not None and getattr(response, 'status_code', None) == 429:
+        return True
+    text = f"{type(error).__name__} {error}".lower()
+    return 'ratelimit' in text or 'rate limit' in text or 'too many requests' in text
+
+def backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff, never shorter than a server-supplied Retry-After"""
+    delay = random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+class HostLimiter:
+    """Token bucket plus an adaptive concurrency limit for one host.
+
+    Concurrency follows AIMD: a throttled (429) or failed request halves the
+    limit and the token rate (at most once per DECREASE_COOLDOWN_SECONDS, so a
+    burst of concurrent 429s counts once), and each run of successes at the
+    current limit raises it by one again, up to the configured maximum.
+    """
+
+    def __init__(self, host, rate, burst, min_concurrency=1, max_concurrency=8):
+        self.host = host
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.concurrency = max_concurrency
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.in_flight = 0
+        self.successes_since_change = 0
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.metrics = {
+            'requests': 0, 'successes': 0, 'errors': 0, 'throttled': 0, 'retries': 0,
+            'bytes': 0, 'latency_seconds': 0.0, 'wait_seconds': 0.0
+        }
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        started = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = max(0.0, self.blocked_until - now)
+                if not wait and self.in_flight < self.concurrency:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        self.in_flight += 1
+                        self.metrics['wait_seconds'] += now - started
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                self._cond.wait(timeout=wait or 0.05)
+
+    def release(self, outcome, latency=0.0, size=0, retry_after=None):
+        """outcome is 'success', 'throttled' or 'error'"""
+        with self._cond:
+            self.in_flight -= 1
+            self.metrics['requests'] += 1
+            self.metrics['latency_seconds'] += latency
+            self.metrics['bytes'] += size
+            if outcome == 'success':
+                self.metrics['successes'] += 1
+                self.successes_since_change += 1
+                if self.successes_since_change >= self.concurrency * 2:
+                    self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+                    self.rate = min(self.max_rate, self.rate * 1.25)
+                    self.successes_since_change = 0
+            else:
+                self.metrics['throttled' if outcome == 'throttled' else 'errors'] += 1
+                now = time.monotonic()
+                if now - self.last_decrease >= DECREASE_COOLDOWN_SECONDS:
+                    self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+                    self.rate = max(self.max_rate / 16, self.rate / 2)
+                    self.last_decrease = now
+                self.successes_since_change = 0
+                if retry_after:
+                    self.blocked_until = max(self.blocked_until, now + retry_after)
+            self._cond.notify_all()
+
+    def record_retry(self):
+        with self._cond:
+            self.metrics['retries'] += 1
+
+    def snapshot(self):
+        with self._cond:
+            metrics = dict(self.metrics)
+            requests_done = metrics['requests']
+            metrics.update(
+                host=self.host,
+                in_flight=self.in_flight,
+                concurrency=self.concurrency,
+                rate=round(self.rate, 3),
+                avg_latency_seconds=metrics['latency_seconds'] / requests_done if requests_done else 0.0,
+                throttle_rate=metrics['throttled'] / requests_done if requests_done else 0.0,
+                error_rate=metrics['errors'] / requests_done if requests_done else 0.0
+            )
+            return metrics
+
+def _retry_after(response):
+    value = response.headers.get('Retry-After') if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+class HttpClient:
+    """Pooled keep-alive session shared by every outbound HTTP call, rate limited per host"""
+
+    def __init__(self, pool_size=32, max_retries=MAX_RETRIES, host_limits=None):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = USER_AGENT
+        self.max_retries = max_retries
+        self.host_limits = dict(HOST_LIMITS, **(host_limits or {}))
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, host):
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limits = dict(DEFAULT_HOST_LIMITS, **self.host_limits.get(host, {}))
+                limiter = HostLimiter(host, **limits)
+                self._limiters[host] = limiter
+            return limiter
+
+    @contextmanager
+    def slot(self, host):
+        """Hold a rate-limited slot for a request made outside this client (e.g. by yfinance).
+
+        An exception leaving the block is recorded as throttled or as an error
+        and re-raised; otherwise the request counts as a success.
+        """
+        limiter = self.limiter(host)
+        limiter.acquire()
+        started = time.monotonic()
+        try:
+            yield limiter
+        except Exception as e:
+            limiter.release('throttled' if is_rate_limit_error(e) else 'error', time.monotonic() - started)
+            raise
+        limiter.release('success', time.monotonic() - started)
+
+    def request(self, method, url, timeout=DEFAULT_TIMEOUT, **kwargs):
+        """Send a request with retries on 429/5xx and connection errors.
+
+        Returns the final response (which may still be a 4xx); raises
+        RateLimitedError when the host is still throttling after the last
+        retry, and the last requests exception on persistent network errors.
+        In replay mode the response comes from the recorded fixtures; with a
+        stand-in server configured the request goes there, still limited as
+        the original host.
+        """
+        if FETCH_MODE == 'replay':
+            return replayed_response(method, canonical_url(method, url, kwargs.get('params')))
+        recorded_url = canonical_url(method, url, kwargs.get('params')) if FETCH_MODE == 'record' else None
+        limiter = self.limiter(urlsplit(url).hostname or '')
+        if STAND_IN_URL:
+            url = stand_in_url(canonical_url(method, url, kwargs.pop('params', None)))
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                limiter.record_retry()
+            limiter.acquire()
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                limiter.release('error', time.monotonic() - started)
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(backoff_delay(attempt))
+                continue
+
+            latency = time.monotonic() - started
+            if response.status_code not in RETRY_STATUSES:
+                limiter.release('success', latency, len(response.content))
+                if recorded_url:
+                    get_fixture_store().save_response(method, recorded_url, response.status_code, response.headers, response.content)
+                return response
+
+            retry_after = _retry_after(response)
+            limiter.release('throttled' if response.status_code == 429 else 'error', latency, len(response.content), retry_after)
+            if attempt == self.max_retries:
+                if response.status_code == 429:
+                    raise RateLimitedError(f"{url} still rate limited after {attempt + 1} attempts", response=response)
+                return response
+            time.sleep(backoff_delay(attempt, retry_after))
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def read_csv(self, url, **kwargs):
+        """pd.read_csv over the pooled session; raises on HTTP errors instead of parsing an error page"""
+        import pandas as pd
+        response = self.get(url)
+        response.raise_for_status()
+        return pd.read_csv(io.BytesIO(response.content), **kwargs)
+
+    def metrics(self):
+        """Per-host request, throttle, error, latency and current limit figures"""
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {limiter.host: limiter.snapshot() for limiter in limiters}
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_http_client():
+    """Process-wide HttpClient shared by the fetch layer."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+def save_metrics(path=METRICS_FILE):
+    """Write this process's per-host metrics to path for other processes to read"""
+    payload = {
+        'pid': os.getpid(),
+        'updated_at': datetime.now(pytz.UTC).isoformat(),
+        'hosts': get_http_client().metrics()
+    }
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    os.replace(temp_file, path)
+
+def load_metrics(path=METRICS_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+def format_metrics(metrics):
+    """Plain-text per-host table of a metrics() dict"""
+    columns = ['requests', 'successes', 'throttled', 'errors', 'retries', 'concurrency', 'rate', 'avg_latency_seconds']
+    header = f"{'host':<28}" + "".join(f"{column[:11]:>12}" for column in columns)
+    lines = [header, "-" * len(header)]
+    for host, values in sorted(metrics.items()):
+        lines.append(f"{host:<28}" + "".join(
+            f"{values[column]:>12.3f}" if isinstance(values[column], float) else f"{values[column]:>12}"
+            for column in columns
+        ))
+    return "\n".join(lines)
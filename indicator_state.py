@@ -0,0 +1,464 @@
+import os
+import json
+import math
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytz
+
+INCREMENTAL_ENABLED = os.environ.get("SCANNER_INCREMENTAL_INDICATORS", "1").lower() not in ("0", "false", "no")
+INCREMENTAL_INTERVALS = ('15m', '30m', '1h')
+STATE_VERSION = 1
+
+ATR_WINDOW = 14
+ATR_LOOKBACK = 10
+EMA_SPAN = 20
+WINDOW = 120
+NAN = float('nan')
+
+def _nan_maximum(a, b):
+    # np.maximum semantics: NaN if either side is NaN
+    if a != a or b != b:
+        return NAN
+    return a if a >= b else b
+
+class RollingMean:
+    """pandas' rolling(window).mean() computed one value at a time.
+
+    Mirrors pandas' fixed-window kernel (Kahan-compensated running sum, removal
+    before addition, the same sign and repeated-value corrections), so every
+    output is bit-for-bit what the batch rolling mean returns.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.sum = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.nobs = 0
+        self.negative = 0
+        self.same = 0
+        self.previous = None
+
+    def push(self, value):
+        if self.previous is None:
+            self.previous = value
+        if len(self.values) == self.window:
+            old = self.values.popleft()
+            if old == old:
+                self.nobs -= 1
+                y = -old - self.compensation_remove
+                t = self.sum + y
+                self.compensation_remove = t - self.sum - y
+                self.sum = t
+                if math.copysign(1.0, old) < 0:
+                    self.negative -= 1
+        if value == value:
+            self.nobs += 1
+            y = value - self.compensation_add
+            t = self.sum + y
+            self.compensation_add = t - self.sum - y
+            self.sum = t
+            if math.copysign(1.0, value) < 0:
+                self.negative += 1
+            self.same = self.same + 1 if value == self.previous else 1
+            self.previous = value
+        self.values.append(value)
+        if self.nobs < self.window or self.nobs == 0:
+            return NAN
+        result = self.sum / self.nobs
+        if self.same >= self.nobs:
+            return self.previous
+        if self.negative == 0 and result < 0:
+            return 0.0
+        if self.negative == self.nobs and result > 0:
+            return 0.0
+        return result
+
+    def to_dict(self):
+        return {
+            'values': list(self.values), 'sum': self.sum, 'compensation_add': self.compensation_add,
+            'compensation_remove': self.compensation_remove, 'nobs': self.nobs, 'negative': self.negative,
+            'same': self.same, 'previous': self.previous
+        }
+
+    @classmethod
+    def from_dict(cls, window, payload):
+        rolling = cls(window)
+        rolling.values = deque(payload['values'])
+        for key in ('sum', 'compensation_add', 'compensation_remove', 'nobs', 'negative', 'same', 'previous'):
+            setattr(rolling, key, payload[key])
+        return rolling
+
+class WindowExtreme:
+    """Max (or min) of the bars lag..lag+size-1 back from the newest, skipping NaN like pandas.
+
+    A monotonic deque of (bar number, value): each bar is pushed and popped at
+    most once, so an update is O(1) amortised. NaN bars are counted separately.
+    """
+
+    def __init__(self, lag, size, kind='max'):
+        self.lag = lag
+        self.size = size
+        self.kind = kind
+        self.entries = deque()
+        self.nans = deque()
+
+    def push(self, number, value):
+        """Add bar number (which is lag bars behind the newest) and drop bars that left the window"""
+        if value != value:
+            self.nans.append(number)
+        else:
+            if self.kind == 'max':
+                while self.entries and self.entries[-1][1] <= value:
+                    self.entries.pop()
+            else:
+                while self.entries and self.entries[-1][1] >= value:
+                    self.entries.pop()
+            self.entries.append((number, value))
+        oldest = number - self.size + 1
+        while self.entries and self.entries[0][0] < oldest:
+            self.entries.popleft()
+        while self.nans and self.nans[0] < oldest:
+            self.nans.popleft()
+
+    @property
+    def value(self):
+        return self.entries[0][1] if self.entries else NAN
+
+    @property
+    def has_nan(self):
+        return bool(self.nans)
+
+    def copy(self):
+        extreme = WindowExtreme(self.lag, self.size, self.kind)
+        extreme.entries = deque(self.entries)
+        extreme.nans = deque(self.nans)
+        return extreme
+
+    def to_dict(self):
+        return {'entries': [list(entry) for entry in self.entries], 'nans': list(self.nans)}
+
+    def load(self, payload):
+        self.entries = deque((number, value) for number, value in payload['entries'])
+        self.nans = deque(payload['nans'])
+        return self
+
+def _window_extremes():
+    # Windows over the last 120 bars the conditions read, as (lag, size) back from the newest bar
+    return {
+        'first45_high': WindowExtreme(75, 45, 'max'),
+        'first45_low': WindowExtreme(75, 45, 'min'),
+        'first100_high': WindowExtreme(20, 100, 'max'),
+        'last20_high': WindowExtreme(0, 20, 'max'),
+        'last20_low': WindowExtreme(0, 20, 'min'),
+        'last30_close': WindowExtreme(0, 30, 'min')
+    }
+
+class IndicatorState:
+    """Streaming indicator state of one (ticker, interval), updated one bar at a time.
+
+    Holds what the registered conditions read: the ATR(14) recurrence and its
+    last ten values, rolling window highs/lows, 120- and 20-bar volume sums, a
+    count of 3-30% impulse moves in the 60:100 section and a ring of the last
+    121 bars. Each push is O(1) (amortised for the monotonic deques); the EMA20
+    the proximity check uses is seeded at the first of the last 120 bars, so it
+    is re-run over the ring, a fixed 120 steps. The condition outcomes equal
+    evaluating the same bars in batch.
+    """
+
+    def __init__(self):
+        self.bar_count = 0
+        self.last_ts = None
+        self.last_bar = None
+        self.visible_bars = None
+        self.high = deque(maxlen=WINDOW + 1)
+        self.low = deque(maxlen=WINDOW + 1)
+        self.close = deque(maxlen=WINDOW + 1)
+        self.volume = deque(maxlen=WINDOW + 1)
+        self.atr = RollingMean(ATR_WINDOW)
+        self.atr_tail = deque(maxlen=ATR_LOOKBACK)
+        self.extremes = _window_extremes()
+        self.volume_120 = [0.0, 0]
+        self.volume_20 = [0.0, 0]
+        self.impulse_flags = deque(maxlen=39)
+        self.impulse_count = 0
+
+    @property
+    def bars(self):
+        """Bars the conditions may use: all pushed bars, or fewer when the batch frame is shorter"""
+        return self.bar_count if self.visible_bars is None else min(self.bar_count, self.visible_bars)
+
+    def _window_sum(self, totals, ring, size, value):
+        if len(ring) > size:
+            old = ring[-size - 1]
+            if old == old:
+                totals[0] -= old
+                totals[1] -= 1
+        if value == value:
+            totals[0] += value
+            totals[1] += 1
+
+    def push(self, ts, open_, high, low, close, volume):
+        """Append one bar; ts is its UTC timestamp in nanoseconds"""
+        previous_close = self.close[-1] if self.close else NAN
+        number = self.bar_count
+        self.high.append(high)
+        self.low.append(low)
+        self.close.append(close)
+        self.volume.append(volume)
+        self.bar_count += 1
+
+        true_range = _nan_maximum(high - low, _nan_maximum(abs(high - previous_close), abs(low - previous_close)))
+        self.atr_tail.append(self.atr.push(true_range))
+
+        for name, extreme in self.extremes.items():
+            lagged = number - extreme.lag
+            if lagged < 0:
+                continue
+            ring = self.high if name.endswith('high') else self.low if name.endswith('low') else self.close
+            extreme.push(lagged, ring[-1 - extreme.lag])
+
+        self._window_sum(self.volume_120, self.volume, WINDOW, volume)
+        self._window_sum(self.volume_20, self.volume, 20, volume)
+
+        # Close-to-close move of bar number-20 against the bar before it; the 60:100
+        # section of the last 120 bars covers moves of bars 20..58 back
+        if number >= 21:
+            move = abs(self.close[-21] / self.close[-22] - 1)
+            flag = bool(move >= 0.03 and move <= 0.30)
+            if len(self.impulse_flags) == self.impulse_flags.maxlen:
+                self.impulse_count -= self.impulse_flags[0]
+            self.impulse_flags.append(flag)
+            self.impulse_count += flag
+
+        self.last_ts = ts
+        self.last_bar = [open_, high, low, close, volume]
+
+    def push_frame(self, data):
+        """Push every bar of a history()-shaped frame in order"""
+        timestamps = data.index.tz_convert('UTC').as_unit('ns').asi8 if data.index.tz is not None else data.index.as_unit('ns').asi8
+        values = data[['Open', 'High', 'Low', 'Close', 'Volume']].to_numpy(dtype=np.float64)
+        for ts, row in zip(timestamps.tolist(), values.tolist()):
+            self.push(ts, *row)
+
+    def copy(self):
+        state = IndicatorState.__new__(IndicatorState)
+        state.__dict__.update(self.__dict__)
+        for name in ('high', 'low', 'close', 'volume', 'atr_tail', 'impulse_flags'):
+            setattr(state, name, deque(getattr(self, name), maxlen=getattr(self, name).maxlen))
+        state.atr = RollingMean.from_dict(ATR_WINDOW, self.atr.to_dict())
+        state.extremes = {name: extreme.copy() for name, extreme in self.extremes.items()}
+        state.volume_120 = list(self.volume_120)
+        state.volume_20 = list(self.volume_20)
+        state.last_bar = list(self.last_bar) if self.last_bar else None
+        return state
+
+    # Aggregates read by the incremental condition checks
+
+    def window_value(self, name):
+        return self.extremes[name].value
+
+    def window_has_nan(self, name):
+        return self.extremes[name].has_nan
+
+    def volume_mean(self, size):
+        total, count = self.volume_120 if size == WINDOW else self.volume_20
+        return total / count if count else NAN
+
+    def close_mean(self, start, stop):
+        """Mean Close of bars start..stop-1 of the last 120 (pandas' skip-NaN mean)"""
+        closes = list(self.close)[-WINDOW:]
+        values = np.array(closes[start:stop], dtype=np.float64)
+        mask = np.isnan(values)
+        count = len(values) - int(mask.sum())
+        if not count:
+            return NAN
+        return np.where(mask, 0.0, values).sum() / count if mask.any() else values.sum() / count
+
+    def last_closes(self, n):
+        return list(self.close)[-n:]
+
+    def ema_tail(self, n, span=EMA_SPAN):
+        """Last n values of EMA(span, adjust=False) of Close seeded at the first of the last 120 bars"""
+        closes = list(self.close)[-WINDOW:]
+        if any(value != value for value in closes):
+            return pd.Series(closes).ewm(span=span, adjust=False).mean().to_numpy()[-n:].tolist()
+        # pandas' adjust=False recurrence, operation for operation
+        alpha = 1.0 / (1.0 + (span - 1) / 2.0)
+        old_weight_factor = 1.0 - alpha
+        weighted = closes[0]
+        values = [weighted]
+        for value in closes[1:]:
+            old_weight = old_weight_factor
+            if weighted != value:
+                weighted = old_weight * weighted + alpha * value
+                weighted /= (old_weight + alpha)
+            values.append(weighted)
+        return values[-n:]
+
+    def to_dict(self):
+        return {
+            'version': STATE_VERSION,
+            'bar_count': self.bar_count,
+            'last_ts': self.last_ts,
+            'last_bar': self.last_bar,
+            'high': list(self.high), 'low': list(self.low), 'close': list(self.close), 'volume': list(self.volume),
+            'atr': self.atr.to_dict(),
+            'atr_tail': list(self.atr_tail),
+            'extremes': {name: extreme.to_dict() for name, extreme in self.extremes.items()},
+            'volume_120': self.volume_120,
+            'volume_20': self.volume_20,
+            'impulse_flags': list(self.impulse_flags),
+            'impulse_count': self.impulse_count
+        }
+
+    @classmethod
+    def from_dict(cls, payload):
+        if payload.get('version') != STATE_VERSION:
+            return None
+        state = cls()
+        state.bar_count = payload['bar_count']
+        state.last_ts = payload['last_ts']
+        state.last_bar = payload['last_bar']
+        for name in ('high', 'low', 'close', 'volume'):
+            getattr(state, name).extend(payload[name])
+        state.atr = RollingMean.from_dict(ATR_WINDOW, payload['atr'])
+        state.atr_tail.extend(payload['atr_tail'])
+        for name, extreme in state.extremes.items():
+            extreme.load(payload['extremes'][name])
+        state.volume_120 = payload['volume_120']
+        state.volume_20 = payload['volume_20']
+        state.impulse_flags.extend(payload['impulse_flags'])
+        state.impulse_count = payload['impulse_count']
+        return state
+
+def _frame_timestamps(data):
+    index = data.index.tz_convert('UTC') if data.index.tz is not None else data.index
+    return index.as_unit('ns').asi8
+
+class IndicatorStateStore:
+    """Persisted IndicatorState per (ticker, interval) in a local SQLite file"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.environ.get("SCANNER_INDICATOR_STATE", os.path.join("data", "indicator_state.sqlite"))
+        self._local = threading.local()
+        self.ensure_schema()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def ensure_schema(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS indicator_state (
+                    ticker TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    last_ts INTEGER NOT NULL,
+                    bar_count INTEGER NOT NULL,
+                    payload TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (ticker, interval)
+                )
+            """)
+
+    def load(self, ticker, interval):
+        row = self._connect().execute(
+            "SELECT payload FROM indicator_state WHERE ticker = ? AND interval = ?", (ticker, interval)
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            return IndicatorState.from_dict(json.loads(row[0]))
+        except Exception as e:
+            print(f"Error reading indicator state for {ticker}: {e}")
+            return None
+
+    def save(self, ticker, interval, state):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO indicator_state (ticker, interval, last_ts, bar_count, payload, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (ticker, interval, state.last_ts, state.bar_count, json.dumps(state.to_dict()), datetime.now(pytz.UTC).isoformat())
+            )
+
+    def delete(self, ticker, interval):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM indicator_state WHERE ticker = ? AND interval = ?", (ticker, interval))
+
+    def advance(self, ticker, interval, data):
+        """Bring the stored state up to date with data and return a state for evaluating it.
+
+        All bars but the newest are committed and persisted; the newest, which
+        may still be forming, is applied to a copy only, so a revised candle is
+        picked up on the next run. The state is rebuilt from data when its last
+        committed bar is missing from data or has changed.
+        """
+        if data is None or data.empty:
+            return None
+        timestamps = _frame_timestamps(data)
+        values = data[['Open', 'High', 'Low', 'Close', 'Volume']].to_numpy(dtype=np.float64)
+
+        state = self.load(ticker, interval)
+        start = 0
+        if state is not None and state.last_ts is not None:
+            position = int(np.searchsorted(timestamps, state.last_ts))
+            if (position < len(timestamps) and timestamps[position] == state.last_ts
+                    and values[position].tolist() == state.last_bar):
+                start = position + 1
+            else:
+                state = None
+        if state is None:
+            state = IndicatorState()
+            start = 0
+
+        committed = len(timestamps) - 1
+        if start < committed:
+            for ts, row in zip(timestamps[start:committed].tolist(), values[start:committed].tolist()):
+                state.push(ts, *row)
+            try:
+                self.save(ticker, interval, state)
+            except Exception as e:
+                print(f"Error saving indicator state for {ticker}: {e}")
+
+        evaluation = state.copy()
+        if start <= committed:
+            evaluation.push(int(timestamps[committed]), *values[committed].tolist())
+        evaluation.visible_bars = len(data)
+        return evaluation
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_indicator_state_store():
+    """Process-wide IndicatorStateStore shared by the scan workers."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = IndicatorStateStore()
+        return _store
+
+def indicator_state_for(ticker, interval, data):
+    """Up-to-date evaluation state for an intraday ticker, or None when incremental indicators do not apply"""
+    if not INCREMENTAL_ENABLED or interval not in INCREMENTAL_INTERVALS or not ticker or ticker == "Unknown":
+        return None
+    try:
+        return get_indicator_state_store().advance(ticker, interval, data)
+    except Exception as e:
+        print(f"Error updating indicator state for {ticker}: {e}")
+        return None
@@ -0,0 +1,74 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+INDICATOR_CACHE_SIZE = int(os.environ.get("SCANNER_INDICATOR_CACHE_SIZE", "4096"))
+
+LAST_BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+def _read_only(values):
+    values = np.asarray(values, dtype=np.float64)
+    values.setflags(write=False)
+    return values
+
+def _memoized(data, ticker, interval, name, params, compute):
+    """Return compute() memoized per (ticker, interval, last bar, bar count, indicator).
+
+    The last bar is keyed by its timestamp and OHLCV values, so a still-forming
+    candle that moves is recomputed. Without a ticker there is no stable
+    identity for the frame, so nothing is cached.
+    """
+    if not ticker or ticker == "Unknown" or data.empty:
+        return _read_only(compute())
+    last = data.iloc[-1]
+    last_bar = tuple(float(last[column]) for column in LAST_BAR_COLUMNS if column in data.columns)
+    key = (ticker, interval, data.index[-1], len(data), last_bar, name, params)
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    values = _read_only(compute())
+    with _lock:
+        _cache[key] = values
+        _cache.move_to_end(key)
+        while len(_cache) > INDICATOR_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return values
+
+def true_range(data, ticker=None, interval=None):
+    """True Range per bar; the first bar has no previous close and is NaN"""
+    def compute():
+        high = data['High'].to_numpy(dtype=np.float64)
+        low = data['Low'].to_numpy(dtype=np.float64)
+        prev_close = data['Close'].shift(1).to_numpy(dtype=np.float64)
+        return np.maximum(
+            high - low,
+            np.maximum(
+                abs(high - prev_close),
+                abs(low - prev_close)
+            )
+        )
+    return _memoized(data, ticker, interval, 'tr', (), compute)
+
+def average_true_range(data, window=14, ticker=None, interval=None):
+    """Simple rolling mean of True Range over window bars"""
+    def compute():
+        tr = true_range(data, ticker=ticker, interval=interval)
+        return pd.Series(tr).rolling(window=window).mean().to_numpy()
+    return _memoized(data, ticker, interval, 'atr', (window,), compute)
+
+def ema(data, span=20, tail=None, ticker=None, interval=None):
+    """EMA of Close (adjust=False), seeded at the first of the last tail bars when tail is given"""
+    def compute():
+        close = data['Close'] if tail is None else data['Close'].tail(tail)
+        return close.ewm(span=span, adjust=False).mean().to_numpy()
+    return _memoized(data, ticker, interval, 'ema', (span, tail), compute)
+
+def clear_indicator_cache():
+    with _lock:
+        _cache.clear()
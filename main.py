@@ -1,9 +1,16 @@
+import time
+import pandas as pd
 import streamlit as st
-from fetch_data import fetch_stock_data, get_company_name, fetch_all_tickers
-from plot_chart import plot_candlestick
-from pattern_detection import detect_pattern, generate_summary_report
+from fetch_data import OFFLINE_MODE
+from chart_service import get_chart_service
 from datetime import datetime
 from cache_manager import CacheManager
+from scanner import DEFAULT_MAX_WORKERS
+from scan_service import FINISHED_STATUSES, ScanJobs, submit_scan
+from universe_cache import get_universe_info
+from condition_analytics import get_analytics_store
+from http_client import load_metrics
+from scan_metrics import get_stage_metrics, load_stage_metrics, merge_snapshots, stage_rows
 
 st.set_page_config(
     page_title="Indian Stock Market Screener",
@@ -17,15 +24,114 @@ def load_css():
     with open('static/style.css') as f:
         st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
 
+POLL_SECONDS = 1.0
+
 def get_tradingview_url(ticker):
     symbol = ticker.replace('.NS', '')
     return f"https://www.tradingview.com/chart?symbol=NSE:{symbol}"
 
+def show_chart(ticker, company_name, data, interval, key=None):
+    """Show the cached chart; with a key, offer to render it now if it is not ready yet"""
+    chart_service = get_chart_service()
+    path = chart_service.cached_chart(ticker, interval, data)
+    if path is None and key is None:
+        chart_service.submit(ticker, company_name, interval, data)
+        st.caption("Chart is rendering in the background.")
+        return
+    if path is None and st.checkbox("Show chart", key=key):
+        with st.spinner("Rendering chart..."):
+            path = chart_service.get_chart(ticker, company_name, interval, data)
+        if path is None:
+            st.warning("Chart could not be rendered.")
+    if path:
+        st.image(path)
+
+def render_condition_analytics():
+    st.header("Condition Analytics")
+    pattern = st.selectbox(
+        "Pattern",
+        ["Volatility Contraction", "Low Volume Stock Selection", "15% Reversal"],
+        key="analytics_pattern"
+    )
+    interval = st.selectbox("Interval", ["1h", "15m", "30m", "1d", "5d"], key="analytics_interval")
+    store = get_analytics_store()
+    scans = store.list_scans(pattern, interval)
+    if scans.empty:
+        st.caption("No recorded scans yet for this pattern and interval.")
+        return
+
+    labels = {
+        row.scan_id: f"{row.started_at} · {row.exchange} · {row.tickers} tickers"
+        for row in scans.itertuples()
+    }
+    scan_id = st.selectbox("Scan", list(labels), format_func=labels.get, key="analytics_scan")
+
+    st.subheader("Hit rate per condition")
+    hit_rates = store.condition_hit_rates(pattern, interval, scan_id=scan_id)
+    st.dataframe(hit_rates.set_index('condition'), use_container_width=True)
+
+    st.subheader("Near misses")
+    near_misses = store.near_miss_tickers(pattern, interval, scan_id=scan_id)
+    if near_misses.empty:
+        st.caption("No tickers met two or more conditions without matching.")
+    else:
+        near_misses['met'] = near_misses['met_count'].astype(str) + " of " + near_misses['condition_count'].astype(str)
+        st.dataframe(near_misses[['ticker', 'met', 'missing']].set_index('ticker'), use_container_width=True)
+
+    st.subheader("Daily hit rate trend")
+    trends = store.condition_trends(pattern, interval)
+    if len(trends) > 1:
+        st.line_chart(trends)
+    else:
+        st.caption("Trends appear once scans span more than one day.")
+
+def render_http_metrics():
+    snapshot = load_metrics()
+    if not snapshot or not snapshot.get('hosts'):
+        return
+    with st.expander("Network (per host)"):
+        st.caption(f"Scan worker, updated {snapshot['updated_at'][:19].replace('T', ' ')} UTC")
+        st.dataframe(
+            pd.DataFrame(snapshot['hosts'].values()).set_index('host')[
+                ['requests', 'successes', 'throttled', 'errors', 'retries', 'concurrency', 'rate', 'avg_latency_seconds']
+            ],
+            use_container_width=True
+        )
+
+def stage_metrics_rows():
+    # The scan stages run in the worker process; chart renders are recorded in this one
+    return stage_rows(merge_snapshots(load_stage_metrics(), get_stage_metrics().snapshot()))
+
+def render_stage_metrics():
+    rows = stage_metrics_rows()
+    if not rows:
+        return
+    with st.expander("Scan stages"):
+        table = pd.DataFrame(rows).set_index('stage')
+        for column in ['mean_seconds', 'p50_seconds', 'p95_seconds', 'max_seconds']:
+            table[column.replace('_seconds', ' ms')] = (table[column] * 1000).round(1)
+        st.dataframe(
+            table[['count', 'errors', 'total_seconds', 'mean ms', 'p50 ms', 'p95 ms', 'max ms']],
+            use_container_width=True
+        )
+        st.caption("Latencies are estimated from histogram buckets. fetch is timed per download batch.")
+
 def main():
     load_css()
     cache_manager = CacheManager()
 
+    with st.sidebar:
+        render_condition_analytics()
+        render_http_metrics()
+        render_stage_metrics()
+
     def display_results():
+        interval = st.session_state.form_data['interval']
+        get_chart_service().prewarm(
+            (ticker, company_name, interval, data)
+            for ticker, company_name, data in st.session_state.matching_stocks + st.session_state.stocks_with_issues
+        )
+
         if len(st.session_state.stocks_with_issues) > 0:
             st.header("All Rest Matched Stocks Old Chart Data Not Available")
             st.info(f"Found {len(st.session_state.stocks_with_issues)} stocks with data availability issues")
@@ -41,8 +147,7 @@ def main():
                             '📊 TradingView</a>',
                             unsafe_allow_html=True
                         )
-                    plot_candlestick(data, ticker, company_name)
-                    st.image('chart.png')
+                    show_chart(ticker, company_name, data, interval, key=f"chart_issue_{ticker}")
         
         if st.session_state.matching_stocks:
             st.header("Stocks Matching Pattern")
@@ -57,8 +162,7 @@ def main():
                             '📊 TradingView</a>',
                             unsafe_allow_html=True
                         )
-                    plot_candlestick(data, ticker, company_name)
-                    st.image('chart.png')
+                    show_chart(ticker, company_name, data, interval, key=f"chart_match_{ticker}")
             col1, col2, col3 = st.columns([1, 2, 1])
             with col2:
                 st.button("🔄 New Search", key="new_search_button", 
@@ -77,12 +181,15 @@ def main():
         st.session_state.stocks_with_issues = []
         st.session_state.stop_scan = False
         st.session_state.scanning = False
+        st.session_state.scan_job_id = None
         st.session_state.total_stocks = 0
         st.session_state.should_reset = False
         st.session_state.form_data = {
             'pattern': 'Volatility Contraction',
             'interval': '1h',
-            'exchange': 'NSE'
+            'exchange': 'NSE',
+            'workers': DEFAULT_MAX_WORKERS,
+            'offline': OFFLINE_MODE
         }
     
     if 'matching_stocks' not in st.session_state:
@@ -93,16 +200,21 @@ def main():
         st.session_state.stop_scan = False
     if 'scanning' not in st.session_state:
         st.session_state.scanning = False
+    if 'scan_job_id' not in st.session_state:
+        st.session_state.scan_job_id = None
     if 'form_data' not in st.session_state:
         st.session_state.form_data = {
             'pattern': 'Volatility Contraction',
             'interval': '1h',
-            'exchange': 'NSE'
+            'exchange': 'NSE',
+            'workers': DEFAULT_MAX_WORKERS,
+            'offline': OFFLINE_MODE
         }
 
     def stop_scan():
+        if st.session_state.scan_job_id is not None:
+            ScanJobs().request_stop(st.session_state.scan_job_id)
         st.session_state.stop_scan = True
-        st.session_state.scanning = False
 
     def trigger_reset():
         st.session_state.should_reset = True
@@ -130,14 +242,35 @@ def main():
                     index=0
                 )
             
+            workers = st.number_input(
+                "Parallel workers:",
+                min_value=1,
+                max_value=64,
+                value=DEFAULT_MAX_WORKERS,
+                help="Number of tickers fetched and analysed concurrently"
+            )
+            offline = st.checkbox(
+                "Offline mode (use locally stored bars only)",
+                value=OFFLINE_MODE
+            )
+            all_patterns = st.checkbox(
+                "Evaluate every pattern in the same pass",
+                value=False,
+                help="One download per ticker fills the results of all patterns, so switching pattern afterwards is instant"
+            )
+            
             submitted = st.form_submit_button("Scan for Patterns")
             if submitted:
                 st.session_state.form_data = {
                     'pattern': pattern,
                     'interval': interval,
-                    'exchange': exchange
+                    'exchange': exchange,
+                    'workers': int(workers),
+                    'offline': offline,
+                    'all_patterns': all_patterns
                 }
                 st.session_state.scanning = True
+                st.session_state.stop_scan = False
                 st.rerun()
 
     if st.session_state.scanning:
@@ -145,21 +278,30 @@ def main():
         interval = st.session_state.form_data['interval']
         exchange = st.session_state.form_data['exchange']
 
-        tickers = fetch_all_tickers(exchange)
-        if not tickers:
-            st.error("Unable to fetch stock list. Please try again later.")
-            return
+        if st.session_state.scan_job_id is None:
+            final_results = cache_manager.get_final_results(pattern, interval, exchange)
+            if final_results:
+                st.session_state.matching_stocks = final_results['matching_stocks']
+                st.session_state.stocks_with_issues = final_results['stocks_with_issues']
+                st.session_state.total_stocks = final_results['total_stocks']
+                st.session_state.scanning = False
+                display_results()
+                return
+
+            job = submit_scan(
+                pattern,
+                interval,
+                exchange,
+                workers=st.session_state.form_data.get('workers', DEFAULT_MAX_WORKERS),
+                offline=st.session_state.form_data.get('offline', OFFLINE_MODE),
+                all_patterns=st.session_state.form_data.get('all_patterns', False)
+            )
+            st.session_state.scan_job_id = job['job_id']
+
+        jobs = ScanJobs()
+        job_id = st.session_state.scan_job_id
+        universe_info = get_universe_info(exchange)
 
-        progress_data = cache_manager.get_progress_from_cache(pattern, interval, exchange)
-        
-        if progress_data and not st.session_state.should_reset:
-            processed_stocks = progress_data['processed_stocks']
-            st.session_state.matching_stocks = progress_data['matching_stocks']
-            st.session_state.stocks_with_issues = progress_data['stocks_with_issues']
-            total_stocks = progress_data['total_stocks']
-            stocks_processed = len(processed_stocks)
-            initial_progress = stocks_processed / total_stocks
-            
         scan_container = st.container()
         with scan_container:
             st.markdown("""
@@ -184,17 +326,23 @@ def main():
                 </div>
             ''', unsafe_allow_html=True)
             
+            if universe_info and universe_info['refreshed_at']:
+                st.caption(
+                    f"Universe: {universe_info['count']} symbols, refreshed "
+                    f"{universe_info['refreshed_at'].strftime('%Y-%m-%d %H:%M')} UTC ({universe_info['source']})"
+                )
+            
             with st.container():
                 st.button("🔄 New Search", key="new_search_status", 
                          help="Start a new stock scan", on_click=trigger_reset)
             
             progress_container = st.empty()
             stats_container = st.empty()
+            stages_container = st.empty()
             stop_button_container = st.empty()
-            resume_info = st.empty()
-            results_container = st.container()
+            status_info = st.empty()
             results_header = st.empty()
-            fetched_header = st.empty()
+            results_container = st.container()
             
             stop_button_container.button(
                 "🛑 Stop Scan",
@@ -202,139 +350,77 @@ def main():
                 on_click=stop_scan,
                 type="primary"
             )
-
-            if progress_data and not st.session_state.should_reset:
-                resume_info.info(f"Resuming scan from {stocks_processed} previously processed stocks ({initial_progress:.1%})")
-                if st.session_state.matching_stocks:
-                    with results_container:
-                        st.success(f"Found {len(st.session_state.matching_stocks)} stocks matching the {pattern} pattern")
-                        for ticker, company_name, data in st.session_state.matching_stocks:
-                            with st.expander(f"{company_name} ({ticker}) - Pattern Match", expanded=False):
-                                col1, col2 = st.columns([4, 1])
-                                with col1:
-                                    st.write(data.tail())
-                                with col2:
-                                    st.markdown(
-                                        f'<a href="{get_tradingview_url(ticker)}" target="_blank" class="tradingview-button">'
-                                        '📊 TradingView</a>',
-                                        unsafe_allow_html=True
-                                    )
-                                plot_candlestick(data, ticker, company_name)
-                                st.image('chart.png')
             
             st.markdown('</div>', unsafe_allow_html=True)
 
-        if 'total_processed' not in st.session_state:
-            st.session_state.total_processed = 0
-
-        if 'resume_start_time' not in st.session_state:
-            st.session_state.resume_start_time = datetime.now()
-            st.session_state.initial_processed = 0
-
-        if not progress_data or st.session_state.should_reset:
-            st.session_state.total_processed = 0
-            processed_stocks = set()
-            total_stocks = len(tickers)
-            st.session_state.total_stocks = total_stocks
-            stocks_processed = 0
-            initial_progress = 0
-            st.session_state.resume_start_time = datetime.now()
-            st.session_state.initial_processed = 0
-        else:
-            processed_stocks = progress_data['processed_stocks']
-            st.session_state.total_processed = len(processed_stocks)
-            st.session_state.total_stocks = progress_data['total_stocks']
-            stocks_processed = st.session_state.total_processed
-            initial_progress = stocks_processed / st.session_state.total_stocks
-            if 'initial_processed' not in st.session_state:
-                st.session_state.initial_processed = stocks_processed
-
-        if progress_data and not st.session_state.should_reset:
-            tickers = [t for t in tickers if t not in processed_stocks]
-
-        start_time = datetime.now()
-        
-        final_results = None if st.session_state.should_reset else cache_manager.get_final_results(pattern, interval, exchange)
-        if final_results:
-            st.session_state.matching_stocks = final_results['matching_stocks']
-            st.session_state.stocks_with_issues = final_results['stocks_with_issues']
-            st.session_state.total_stocks = final_results['total_stocks']
-            st.session_state.scanning = False
-            display_results()
-            return
+        # The scan runs in the background worker; this loop only polls the job
+        # and the progress journal, so a rerun or reconnect simply re-attaches.
+        shown_matches = 0
+        while True:
+            job = jobs.get(job_id)
+            if job is None:
+                break
+
+            if job['status'] == 'queued':
+                status_info.info("Waiting for the scan worker to pick up this scan...")
+            elif job['stop_requested']:
+                status_info.warning("Stopping scan...")
+            elif job['processed'] and shown_matches == 0 and job['started_at']:
+                status_info.empty()
+
+            total_stocks = max(1, job['total_stocks'])
+            progress = min(job['processed'] / total_stocks, 1.0)
+            started_at = datetime.fromisoformat(job['started_at']) if job['started_at'] else None
+            elapsed_time = max(1, int((datetime.now(started_at.tzinfo) - started_at).total_seconds())) if started_at else 0
+            if job['processed'] > 0 and elapsed_time > 0:
+                stocks_per_second = job['processed'] / elapsed_time
+                eta = int((job['total_stocks'] - job['processed']) / stocks_per_second)
+            else:
+                eta = 0
 
-        try:
-            for i, ticker in enumerate(tickers):
-                if st.session_state.stop_scan:
-                    st.warning(f"Scan stopped by user after processing {st.session_state.total_processed} stocks")
-                    break
-
-                processed_stocks.add(ticker)
-                st.session_state.total_processed = len(processed_stocks)
-                progress = min(st.session_state.total_processed / st.session_state.total_stocks, 1.0)
-                
-                if i % 10 == 0 or st.session_state.stop_scan:
-                    cache_manager.save_progress_to_cache(
-                        pattern,
-                        interval,
-                        exchange,
-                        processed_stocks,
-                        st.session_state.matching_stocks,
-                        st.session_state.stocks_with_issues,
-                        st.session_state.total_stocks
-                    )
-
-                elapsed_time = max(1, (datetime.now() - st.session_state.resume_start_time).seconds)
-                processed_since_resume = st.session_state.total_processed - st.session_state.initial_processed
-                
-                if processed_since_resume > 0 and elapsed_time > 0:
-                    stocks_per_second = processed_since_resume / elapsed_time
-                    remaining_stocks = st.session_state.total_stocks - st.session_state.total_processed
-                    eta = int(remaining_stocks / stocks_per_second) if stocks_per_second > 0 else 0
-                else:
-                    eta = 0
-                
-                progress_container.markdown(f"""
-                    <div class="scan-progress">
-                        <div style="width: {progress*100}%"></div>
+            progress_container.markdown(f"""
+                <div class="scan-progress">
+                    <div style="width: {progress*100}%"></div>
+                </div>
+            """, unsafe_allow_html=True)
+            
+            stats_container.markdown(f"""
+                <div class="stats-grid">
+                    <div class="stat-card">
+                        <div class="stat-label">Progress</div>
+                        <div class="stat-value">{min(progress*100, 100):.1f}%</div>
                     </div>
-                """, unsafe_allow_html=True)
-                
-                stats_container.markdown(f"""
-                    <div class="stats-grid">
-                        <div class="stat-card">
-                            <div class="stat-label">Progress</div>
-                            <div class="stat-value">{min(progress*100, 100):.1f}%</div>
-                        </div>
-                        <div class="stat-card">
-                            <div class="stat-label">Stocks Scanned</div>
-                            <div class="stat-value">{st.session_state.total_processed}/{st.session_state.total_stocks}</div>
-                        </div>
-                        <div class="stat-card">
-                            <div class="stat-label">Time Elapsed</div>
-                            <div class="stat-value">{elapsed_time}s</div>
-                        </div>
-                        <div class="stat-card">
-                            <div class="stat-label">ETA</div>
-                            <div class="stat-value">{max(0, eta)}s</div>
-                        </div>
+                    <div class="stat-card">
+                        <div class="stat-label">Stocks Scanned</div>
+                        <div class="stat-value">{job['processed']}/{job['total_stocks']}</div>
+                    </div>
+                    <div class="stat-card">
+                        <div class="stat-label">Time Elapsed</div>
+                        <div class="stat-value">{elapsed_time}s</div>
                     </div>
-                """, unsafe_allow_html=True)
-                
-                data, has_period_issues = fetch_stock_data(ticker, interval)
-                if not data.empty:
-                    company_name = get_company_name(ticker)
-                    fetched_header.info(f"Processing {ticker}...")
-                    
-                    if has_period_issues:
-                        st.session_state.stocks_with_issues.append((ticker, company_name, data))
-                    
-                    if detect_pattern(data, pattern_type=pattern, ticker=ticker, interval=interval, exchange=exchange):
-                        st.session_state.matching_stocks.append((ticker, company_name, data))
-                        results_header.success(f"Found {len(st.session_state.matching_stocks)} stocks matching the {pattern} pattern")
-                        
-                        with results_container:
-                            with st.expander(f"{company_name} ({ticker}) - Pattern Match", expanded=True):
+                    <div class="stat-card">
+                        <div class="stat-label">ETA</div>
+                        <div class="stat-value">{max(0, eta)}s</div>
+                    </div>
+                </div>
+            """, unsafe_allow_html=True)
+
+            stage_summary = [
+                f"{row['stage']} {row['mean_seconds'] * 1000:.0f} ms × {row['count']}"
+                for row in stage_metrics_rows() if row['stage'] in ('fetch', 'name', 'detect', 'cache_write')
+            ]
+            if stage_summary:
+                stages_container.caption("Mean time per call: " + " · ".join(stage_summary))
+
+            if job['matches'] > shown_matches:
+                progress_data = cache_manager.peek_progress(pattern, interval, exchange)
+                if progress_data:
+                    new_matches = progress_data['matching_stocks'][shown_matches:]
+                    shown_matches += len(new_matches)
+                    results_header.success(f"Found {shown_matches} stocks matching the {pattern} pattern")
+                    with results_container:
+                        for ticker, company_name, data in new_matches:
+                            with st.expander(f"{company_name} ({ticker}) - Pattern Match", expanded=False):
                                 col1, col2 = st.columns([4, 1])
                                 with col1:
                                     st.write(data.tail())
@@ -344,46 +430,38 @@ def main():
                                         '📊 TradingView</a>',
                                         unsafe_allow_html=True
                                     )
-                                plot_candlestick(data, ticker, company_name)
-                                st.image('chart.png')
-                
-                stocks_processed += 1
-            
-            if not st.session_state.stop_scan and st.session_state.total_processed >= st.session_state.total_stocks:
-                cache_manager.save_final_results(
-                    pattern,
-                    interval,
-                    exchange,
-                    st.session_state.matching_stocks,
-                    st.session_state.stocks_with_issues,
-                    st.session_state.total_stocks
-                )
-                cache_manager.clear_progress_cache(pattern, interval, exchange)
-                st.session_state.scanning = False
-                
-        finally:
-            if st.session_state.stop_scan:
-                cache_manager.save_progress_to_cache(
-                    pattern,
-                    interval,
-                    exchange,
-                    processed_stocks,
-                    st.session_state.matching_stocks,
-                    st.session_state.stocks_with_issues,
-                    st.session_state.total_stocks
-                )
+                                show_chart(ticker, company_name, data, interval)
 
-            progress_container.empty()
-            stats_container.empty()
-            stop_button_container.empty()
-            fetched_header.empty()
-            scan_container.empty()
-            
-            total_time = (datetime.now() - start_time).seconds
-            if st.session_state.stop_scan:
-                st.info(f"Scan stopped after {total_time} seconds. Showing all results...")
-            else:
-                st.success(f"Scan completed in {total_time} seconds!")
+            if job['status'] in FINISHED_STATUSES:
+                break
+            time.sleep(POLL_SECONDS)
+
+        scan_container.empty()
+        st.session_state.scanning = False
+        st.session_state.scan_job_id = None
+
+        if job is None or job['status'] == 'failed':
+            st.error(f"Scan failed: {job['error'] if job else 'job not found'}")
+            return
+
+        if job['status'] == 'done':
+            results = cache_manager.get_final_results(pattern, interval, exchange)
+        else:
+            results = cache_manager.peek_progress(pattern, interval, exchange)
+            st.session_state.stop_scan = True
+        if results:
+            st.session_state.matching_stocks = results['matching_stocks']
+            st.session_state.stocks_with_issues = results['stocks_with_issues']
+            st.session_state.total_stocks = results['total_stocks']
+
+        finished_at = datetime.fromisoformat(job['finished_at']) if job['finished_at'] else None
+        started_at = datetime.fromisoformat(job['started_at']) if job['started_at'] else None
+        total_time = int((finished_at - started_at).total_seconds()) if finished_at and started_at else 0
+        if job['status'] == 'stopped':
+            st.info(f"Scan stopped after {total_time} seconds at {job['processed']}/{job['total_stocks']} stocks. Run it again to resume. Showing all results...")
+        else:
+            st.success(f"Scan completed in {total_time} seconds!")
+        display_results()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+import pytz
+
+MARKET_TZ = pytz.timezone('Asia/Kolkata')
+SESSION_OPEN = (9, 15)
+SESSION_CLOSE = (15, 30)
+BAR_MINUTES = {'15m': 15, '30m': 30, '1h': 60}
+
+def session_bounds(day):
+    """(open, close) of the NSE session on a date, as Asia/Kolkata datetimes"""
+    start = MARKET_TZ.localize(datetime(day.year, day.month, day.day, *SESSION_OPEN))
+    end = MARKET_TZ.localize(datetime(day.year, day.month, day.day, *SESSION_CLOSE))
+    return start, end
+
+def bar_closes(interval, day):
+    """Close times of the interval's bars on a weekday; the last bar is cut short at the session close"""
+    start, end = session_bounds(day)
+    step = timedelta(minutes=BAR_MINUTES[interval])
+    closes = []
+    close = start + step
+    while close < end:
+        closes.append(close)
+        close += step
+    closes.append(end)
+    return closes
+
+def in_session(now=None):
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    start, end = session_bounds(now.date())
+    return now.weekday() < 5 and start <= now <= end
+
+def next_bar_close(interval, now=None):
+    """The first bar close after now, skipping weekends (exchange holidays just produce a cycle without new bars)"""
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    for offset in range(8):
+        day = (now + timedelta(days=offset)).date()
+        if day.weekday() >= 5:
+            continue
+        for close in bar_closes(interval, day):
+            if close > now:
+                return close
+    raise ValueError(f"No bar close found after {now}")
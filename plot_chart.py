@@ -10,22 +10,25 @@ except ImportError as e:
     print("2. Run: pip install mplfinance")
     raise
 
-def plot_candlestick(data, ticker, company_name):
+def plot_candlestick(data, ticker, company_name, savefig='chart.png', style='charles'):
+    """Save a candlestick chart to savefig; on failure save an error image instead and return False"""
     try:
         plt.close('all')
         
         mpf.plot(data, 
                 type='candle', 
-                style='charles',
+                style=style,
                 title=f"{company_name} ({ticker})",
                 volume=True,
-                savefig='chart.png',
+                savefig=savefig,
                 figsize=(12, 8))
+        return True
                 
     except Exception as e:
         print(f"Error plotting chart for {ticker}: {str(e)}")
         plt.figure(figsize=(12, 8))
         plt.text(0.5, 0.5, f"Error plotting chart: {str(e)}", 
                 ha='center', va='center')
-        plt.savefig('chart.png')
-        plt.close()
\ No newline at end of file
+        plt.savefig(savefig)
+        plt.close()
+        return False
\ No newline at end of file
@@ -0,0 +1,181 @@
+import os
+import math
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import pytz
+
+from indicators import average_true_range, ema
+from market_hours import BAR_MINUTES, MARKET_TZ, session_bounds
+
+# Off by default: apart from the bar count, the summary checks are heuristics that
+# can drop a ticker whose figures move back into range within a few bars
+PREFILTER_ENABLED = os.environ.get("SCANNER_PREFILTER", "").lower() in ("1", "true", "yes")
+# Summary check thresholds are loosened by this fraction, so only tickers far outside them are dropped
+PREFILTER_MARGIN = float(os.environ.get("SCANNER_PREFILTER_MARGIN", "0.5"))
+# A summary more than this many bars behind only prunes on facts new bars cannot change in time (bar count)
+PREFILTER_MAX_AGE_BARS = int(os.environ.get("SCANNER_PREFILTER_MAX_AGE_BARS", "3"))
+SUMMARY_FIELDS = ['bars', 'last_ts', 'last_close', 'recent_range', 'atr', 'avg_volume', 'ema20']
+
+def summarize(data, ticker=None, interval=None):
+    """Summary row of a history() frame; the figures are the ones the pattern conditions read"""
+    last_120 = data.tail(120)
+    last_20 = last_120.tail(20)
+    return {
+        'bars': len(data),
+        'last_ts': int(pd.DatetimeIndex(data.index[-1:]).as_unit('ns').asi8[0]),
+        'last_close': float(data['Close'].iloc[-1]),
+        'recent_range': float((last_20['High'].max() - last_20['Low'].min()) / last_20['Close'].mean()),
+        'atr': float(average_true_range(data, ticker=ticker, interval=interval)[-1]),
+        'avg_volume': float(last_120['Volume'].mean()),
+        'ema20': float(ema(data, span=20, tail=120, ticker=ticker, interval=interval)[-1])
+    }
+
+def bars_since(last_ts, interval, now=None):
+    """Upper bound on the bars of interval that can have started since the bar at last_ts (epoch ns)"""
+    now = (now or datetime.now(pytz.UTC)).astimezone(MARKET_TZ)
+    last = pd.Timestamp(last_ts, unit='ns', tz='UTC').tz_convert(MARKET_TZ).to_pydatetime()
+    if now <= last:
+        return 0
+    days = [last.date() + timedelta(days=offset) for offset in range((now.date() - last.date()).days + 1)]
+    weekdays = [day for day in days if day.weekday() < 5]
+    if interval in BAR_MINUTES:
+        bars = 0
+        for day in weekdays:
+            start, end = session_bounds(day)
+            minutes = (min(end, now) - max(start, last)).total_seconds() / 60
+            if minutes > 0:
+                bars += math.ceil(minutes / BAR_MINUTES[interval])
+        return bars
+    if interval == '1d':
+        return len([day for day in weekdays if day > last.date()])
+    if interval == '5d':
+        return math.ceil(len([day for day in weekdays if day > last.date()]) / 5)
+    return None
+
+class SummaryIndex:
+    """Per-(ticker, interval) summary of the last fetched bars in a local SQLite file.
+
+    Rows are refreshed whenever a scan evaluates a ticker, and read before the
+    next scan to drop tickers that cannot satisfy any requested pattern.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.environ.get("SCANNER_SUMMARY_INDEX", os.path.join("data", "summary_index.sqlite"))
+        self._local = threading.local()
+        self.ensure_schema()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def ensure_schema(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ticker_summary (
+                    ticker TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    bars INTEGER NOT NULL,
+                    last_ts INTEGER NOT NULL,
+                    last_close REAL, recent_range REAL, atr REAL, avg_volume REAL, ema20 REAL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (ticker, interval)
+                ) WITHOUT ROWID
+            """)
+
+    def update(self, ticker, interval, data):
+        if data is None or data.empty:
+            return
+        summary = summarize(data, ticker=ticker, interval=interval)
+        # SQLite has no NaN; store it as NULL
+        values = [None if isinstance(value, float) and value != value else value for value in (summary[field] for field in SUMMARY_FIELDS)]
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO ticker_summary (ticker, interval, {', '.join(SUMMARY_FIELDS)}, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (ticker, interval, *values, datetime.now(pytz.UTC).isoformat())
+            )
+
+    def get_summaries(self, tickers, interval):
+        """{ticker: summary} for the tickers that have one"""
+        summaries = {}
+        tickers = list(tickers)
+        conn = self._connect()
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(tickers), 500):
+            chunk = tickers[start:start + 500]
+            rows = conn.execute(
+                f"SELECT ticker, {', '.join(SUMMARY_FIELDS)} FROM ticker_summary WHERE interval = ? AND ticker IN ({', '.join('?' * len(chunk))})",
+                [interval, *chunk]
+            ).fetchall()
+            for row in rows:
+                summaries[row[0]] = {field: (np.nan if value is None else value) for field, value in zip(SUMMARY_FIELDS, row[1:])}
+        return summaries
+
+    def delete(self, ticker, interval):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM ticker_summary WHERE ticker = ? AND interval = ?", (ticker, interval))
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_summary_index():
+    """Process-wide SummaryIndex shared by the scanner and the prefilter."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SummaryIndex()
+        return _index
+
+def could_match(pattern, summary, margin=PREFILTER_MARGIN):
+    """False when summary rules out pattern's bar minimum or one of its conditions that has a summary check"""
+    if summary['bars'] + summary['slack'] < pattern.min_bars:
+        return False
+    return all(condition.summary_check(summary, margin) for condition in pattern.conditions if condition.summary_check is not None)
+
+def prune_universe(tickers, patterns, interval, now=None):
+    """Split tickers into (candidates, pruned) for a scan of patterns.
+
+    A ticker is pruned only when its summary rules out every pattern. Tickers
+    without a summary are always candidates, and a summary that is more than
+    PREFILTER_MAX_AGE_BARS bars behind is only checked against the bar count,
+    so pruned tickers get fetched (and re-summarized) again once their data
+    could have changed. Only the bar count is a strict bound; the other
+    summary checks are margin-loosened heuristics, which is why callers only
+    prune when asked to (PREFILTER_ENABLED, --prefilter).
+    """
+    from conditions import get_pattern
+    tickers = list(tickers)
+    patterns = [pattern for pattern in (get_pattern(name) for name in patterns) if pattern is not None]
+    try:
+        summaries = get_summary_index().get_summaries(tickers, interval)
+    except Exception as e:
+        print(f"Error reading summary index: {e}")
+        return tickers, []
+    now = now or datetime.now(pytz.UTC)
+    candidates, pruned = [], []
+    for ticker in tickers:
+        summary = summaries.get(ticker)
+        if summary is None or not patterns:
+            candidates.append(ticker)
+            continue
+        slack = bars_since(summary['last_ts'], interval, now)
+        if slack is None:
+            candidates.append(ticker)
+            continue
+        summary = dict(summary, slack=slack)
+        margin = PREFILTER_MARGIN if slack <= PREFILTER_MAX_AGE_BARS else math.inf
+        (candidates if any(could_match(pattern, summary, margin) for pattern in patterns) else pruned).append(ticker)
+    return candidates, pruned
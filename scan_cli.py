@@ -0,0 +1,247 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from itertools import product
+from contextlib import ExitStack
+from datetime import datetime
+import pytz
+
+from cache_manager import CacheManager
+from conditions import PATTERNS, get_pattern
+from fetch_data import OFFLINE_MODE
+from http_client import format_metrics, get_http_client
+from prefilter import PREFILTER_ENABLED, prune_universe
+from scan_logger import begin_scan_log, finish_scan_log
+from scan_metrics import format_stage_metrics, get_stage_metrics, profile_scan, stage_rows
+from scan_service import ScanJobs
+from scanner import scan_tickers, DEFAULT_MAX_WORKERS, DEFAULT_BATCH_SIZE
+from universe_cache import get_universe
+
+INTERVALS = ["1h", "15m", "30m", "1d", "5d"]
+EXCHANGES = ["NSE", "NIFTY50", "ALL"]
+TIMING_STAGES = ['universe', 'fetch', 'name', 'detect', 'save', 'wall']
+
+def _stock_rows(stocks):
+    rows = []
+    for ticker, company_name, data in stocks:
+        row = {'ticker': ticker, 'company_name': company_name, 'bars': len(data), 'last_bar': None, 'last_close': None}
+        if not data.empty:
+            row['last_bar'] = data.index[-1].isoformat()
+            row['last_close'] = float(data['Close'].iloc[-1])
+        rows.append(row)
+    return rows
+
+def _cached_summary(pattern, interval, exchange, cached):
+    return {
+        'pattern': pattern, 'interval': interval, 'exchange': exchange, 'source': 'cache',
+        'timings': dict.fromkeys(TIMING_STAGES, 0.0),
+        'total_stocks': cached['total_stocks'],
+        'matches': _stock_rows(cached['matching_stocks']),
+        'stocks_with_issues': _stock_rows(cached['stocks_with_issues'])
+    }
+
+def run_scan_pass(patterns, interval, exchange, cache_manager, max_workers=DEFAULT_MAX_WORKERS, batch_size=DEFAULT_BATCH_SIZE,
+                  offline=False, limit=None, force=False, prefilter=False, log=print):
+    """Scan several patterns for one (interval, exchange) in a single fetch pass and cache each pattern's final results.
+
+    Every ticker is downloaded once and evaluated against all patterns that do
+    not already have fresh cached results (all of them with force). Returns one
+    summary dict per pattern with matches, stocks with period issues and a
+    timing breakdown in seconds; patterns scanned together share the pass
+    timings, and fetch/name/detect are summed over worker threads.
+
+    A limited run scans the first limit tickers and neither reads nor writes
+    the cache, since it is not the full scan for its key. A full run refuses a pattern that has a
+    queued or running service job, whose progress journal it would reset.
+    With prefilter, tickers the summary index rules out are counted but not
+    fetched; those checks are heuristics, so this can miss matches.
+    """
+    summaries = {}
+    for pattern in patterns:
+        cached = None if force or limit else cache_manager.get_final_results(pattern, interval, exchange)
+        if cached:
+            summaries[pattern] = _cached_summary(pattern, interval, exchange, cached)
+    to_scan = [pattern for pattern in patterns if pattern not in summaries]
+    if not to_scan:
+        return [summaries[pattern] for pattern in patterns]
+    if not limit:
+        jobs = ScanJobs()
+        for pattern in to_scan:
+            job = jobs.active_job(pattern, interval, exchange)
+            if job is not None:
+                raise RuntimeError(f"Scan job {job['job_id']} for {pattern} / {interval} / {exchange} is {job['status']}")
+
+    timings = dict.fromkeys(TIMING_STAGES, 0.0)
+    started = time.perf_counter()
+    tickers = get_universe(exchange, offline=offline)
+    if limit:
+        tickers = tickers[:limit]
+    if not tickers:
+        raise RuntimeError(f"No tickers available for {exchange}")
+    total_stocks = len(tickers)
+    if prefilter:
+        tickers, pruned = prune_universe(tickers, to_scan, interval)
+        if pruned:
+            log(f"  Prefilter skipped {len(pruned)} of {total_stocks} tickers")
+    timings['universe'] = time.perf_counter() - started
+
+    matching_stocks = {pattern: [] for pattern in to_scan}
+    stocks_with_issues = []
+    scan_ids = {pattern: begin_scan_log(pattern, interval, exchange).scan_id for pattern in to_scan}
+    try:
+        for i, result in enumerate(scan_tickers(tickers, to_scan, interval, exchange, max_workers=max_workers,
+                                                batch_size=batch_size, offline=offline, scan_ids=scan_ids), 1):
+            timings['fetch'] += result['fetch_seconds']
+            timings['name'] += result['name_seconds']
+            timings['detect'] += result['detect_seconds']
+            data = result['data']
+            if not data.empty:
+                entry = (result['ticker'], result['company_name'], data)
+                if result['has_period_issues']:
+                    stocks_with_issues.append(entry)
+                for pattern, matched in result['pattern_matches'].items():
+                    if matched:
+                        matching_stocks[pattern].append(entry)
+            if i % 100 == 0:
+                log(f"  {i}/{len(tickers)} scanned, " + ", ".join(f"{pattern}: {len(matching_stocks[pattern])}" for pattern in to_scan))
+    finally:
+        for pattern, scan_id in scan_ids.items():
+            finish_scan_log(pattern, interval, exchange, scan_id=scan_id)
+
+    saving = time.perf_counter()
+    if not limit:
+        for pattern in to_scan:
+            cache_manager.save_final_results(pattern, interval, exchange, matching_stocks[pattern], stocks_with_issues, total_stocks)
+    timings['save'] = time.perf_counter() - saving
+    timings['wall'] = time.perf_counter() - started
+
+    for pattern in to_scan:
+        summaries[pattern] = {
+            'pattern': pattern, 'interval': interval, 'exchange': exchange, 'source': 'scan',
+            'timings': timings,
+            'total_stocks': total_stocks,
+            'matches': _stock_rows(matching_stocks[pattern]),
+            'stocks_with_issues': _stock_rows(stocks_with_issues)
+        }
+    return [summaries[pattern] for pattern in patterns]
+
+def run_scan(pattern, interval, exchange, cache_manager, **kwargs):
+    """Scan one (pattern, interval, exchange) combination the way the UI does; see run_scan_pass"""
+    return run_scan_pass([pattern], interval, exchange, cache_manager, **kwargs)[0]
+
+def write_json(path, runs):
+    payload = {
+        'generated_at': datetime.now(pytz.UTC).isoformat(),
+        'runs': runs,
+        'stage_metrics': stage_rows(get_stage_metrics().snapshot())
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2)
+
+def write_csv(path, runs):
+    columns = ['pattern', 'interval', 'exchange', 'ticker', 'company_name', 'matched', 'has_period_issues', 'bars', 'last_bar', 'last_close']
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for run in runs:
+            rows = {}
+            for row in run.get('matches', []):
+                rows[row['ticker']] = dict(row, matched=True, has_period_issues=False)
+            for row in run.get('stocks_with_issues', []):
+                rows.setdefault(row['ticker'], dict(row, matched=False))['has_period_issues'] = True
+            for row in rows.values():
+                writer.writerow(dict(row, pattern=run['pattern'], interval=run['interval'], exchange=run['exchange']))
+
+def format_timings(runs):
+    header = f"{'pattern':<28}{'interval':<9}{'exchange':<9}{'source':<7}{'tickers':>8}{'matches':>8}" + "".join(f"{stage:>10}" for stage in TIMING_STAGES)
+    lines = [header, "-" * len(header)]
+    for run in runs:
+        lines.append(
+            f"{run['pattern']:<28}{run['interval']:<9}{run['exchange']:<9}{run['source']:<7}"
+            f"{run.get('total_stocks', 0):>8}{len(run.get('matches', [])):>8}"
+            + "".join(f"{run['timings'][stage]:>10.2f}" for stage in TIMING_STAGES)
+        )
+    return "\n".join(lines)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run pattern scans without the Streamlit UI and cache their results.")
+    parser.add_argument("-p", "--pattern", action="append", help="Pattern name (repeatable, default: every pattern)")
+    parser.add_argument("-i", "--interval", action="append", choices=INTERVALS, help="Interval (repeatable, default: 1h)")
+    parser.add_argument("-e", "--exchange", action="append", choices=EXCHANGES, help="Exchange (repeatable, default: NSE)")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_MAX_WORKERS, help="Concurrent fetch/evaluate workers")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Tickers per download batch")
+    parser.add_argument("--offline", action="store_true", default=OFFLINE_MODE, help="Use locally stored bars only")
+    parser.add_argument("--limit", type=int, help="Scan only the first N tickers of each universe (results are not cached)")
+    parser.add_argument("--force", action="store_true", help="Rescan even when fresh cached results exist")
+    parser.add_argument("--prefilter", action=argparse.BooleanOptionalAction, default=PREFILTER_ENABLED,
+                        help="Skip tickers the summary index rules out (heuristic: can miss matches)")
+    parser.add_argument("--separate-passes", action="store_true",
+                        help="Download data once per pattern instead of evaluating every pattern in one pass")
+    parser.add_argument("-o", "--output-dir", default="scan_results", help="Directory for the JSON/CSV results")
+    parser.add_argument("-f", "--format", choices=["json", "csv", "both", "none"], default="json", help="Result file format")
+    parser.add_argument("--profile", choices=["cprofile", "pyinstrument"],
+                        help="Profile the scan and write the profile to the output directory")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    patterns = []
+    for name in args.pattern or [pattern.name for pattern in PATTERNS.values()]:
+        pattern = get_pattern(name)
+        if pattern is None:
+            print(f"Unknown pattern: {name}. Choose from: {', '.join(p.name for p in PATTERNS.values())}")
+            return 2
+        patterns.append(pattern.name)
+
+    cache_manager = CacheManager()
+    runs = []
+    failed = False
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    passes = [[pattern] for pattern in patterns] if args.separate_passes else [patterns]
+    with ExitStack() as stack:
+        if args.profile:
+            try:
+                stack.enter_context(profile_scan(os.path.join(args.output_dir, f"profile_{stamp}"), args.profile))
+            except ImportError:
+                print(f"Cannot profile with {args.profile}: it is not installed")
+                return 2
+        for pass_patterns, interval, exchange in product(passes, args.interval or ["1h"], args.exchange or ["NSE"]):
+            label = f"{', '.join(pass_patterns)} / {interval} / {exchange}"
+            print(f"Scanning {label}...")
+            try:
+                runs.extend(run_scan_pass(
+                    pass_patterns, interval, exchange, cache_manager,
+                    max_workers=args.workers, batch_size=args.batch_size,
+                    offline=args.offline, limit=args.limit, force=args.force, prefilter=args.prefilter
+                ))
+            except Exception as e:
+                print(f"Error scanning {label}: {e}")
+                failed = True
+
+    if runs and args.format != "none":
+        if not os.path.exists(args.output_dir):
+            os.makedirs(args.output_dir, exist_ok=True)
+        if args.format in ("json", "both"):
+            path = os.path.join(args.output_dir, f"scan_{stamp}.json")
+            write_json(path, runs)
+            print(f"Wrote {path}")
+        if args.format in ("csv", "both"):
+            path = os.path.join(args.output_dir, f"scan_{stamp}.csv")
+            write_csv(path, runs)
+            print(f"Wrote {path}")
+
+    print()
+    print(format_timings(runs))
+    print()
+    print(format_stage_metrics(get_stage_metrics().snapshot()))
+    http_metrics = get_http_client().metrics()
+    if http_metrics:
+        print()
+        print(format_metrics(http_metrics))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+import os
+import json
+import threading
+import time
+from datetime import datetime
+
+LOG_DIR = "pattern_logs"
+FLUSH_EVERY = int(os.environ.get("SCANNER_LOG_FLUSH_EVERY", "50"))
+FLUSH_INTERVAL_SECONDS = 5.0
+
+def get_scan_folder_name(pattern_type, interval, exchange):
+    """Generate a unique folder name for each scan variation"""
+    sanitized_pattern = pattern_type.lower().replace(" ", "_")
+    folder_name = f"{sanitized_pattern}_{interval}_{exchange}"
+    return folder_name
+
+class ScanLogger:
+    """Collects per-ticker condition outcomes for one scan.
+
+    Outcomes are aggregated in memory and appended in batches to
+    pattern_scan.jsonl (every evaluated ticker) and pattern_scan.log (tickers
+    meeting two or more conditions, in the original text format).
+    pattern_summary.txt is rendered once, by render_summary(), at scan end.
+    Safe to call from scan worker threads.
+    """
+
+    def __init__(self, pattern_type, interval, exchange, scan_id=None, log_dir=LOG_DIR, flush_every=FLUSH_EVERY):
+        self.pattern_type = pattern_type
+        self.interval = interval
+        self.exchange = exchange
+        self.scan_id = scan_id or datetime.now().strftime("%Y%m%d%H%M%S%f")
+        self.scan_dir = os.path.join(log_dir, get_scan_folder_name(pattern_type, interval, exchange))
+        self.records_file = os.path.join(self.scan_dir, "pattern_scan.jsonl")
+        self.log_file = os.path.join(self.scan_dir, "pattern_scan.log")
+        self.summary_file = os.path.join(self.scan_dir, "pattern_summary.txt")
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._listeners = []
+        self.condition_stats = {}
+        self.met_counts = {}
+
+    def add_listener(self, listener):
+        """listener(records) is called with each flushed batch of records"""
+        self._listeners.append(listener)
+
+    def _aggregate(self, record):
+        for condition in record['met']:
+            self.condition_stats.setdefault(condition, {'success': 0, 'failed': 0})['success'] += 1
+        for condition in record['failed']:
+            self.condition_stats.setdefault(condition, {'success': 0, 'failed': 0})['failed'] += 1
+        self.met_counts[record['ticker']] = len(record['met'])
+
+    def record(self, ticker, met_conditions, failed_conditions=(), skipped_conditions=(), matched=False):
+        record = {
+            'scan_id': self.scan_id,
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'ticker': ticker,
+            'pattern': self.pattern_type,
+            'interval': self.interval,
+            'exchange': self.exchange,
+            'met': list(met_conditions),
+            'failed': list(failed_conditions or []),
+            'skipped': list(skipped_conditions or []),
+            'matched': bool(matched)
+        }
+        with self._lock:
+            self._aggregate(record)
+            self._buffer.append(record)
+            if len(self._buffer) >= self.flush_every or time.monotonic() - self._last_flush > FLUSH_INTERVAL_SECONDS:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        records, self._buffer = self._buffer, []
+        self._last_flush = time.monotonic()
+        if not records:
+            return
+        try:
+            if not os.path.exists(self.scan_dir):
+                os.makedirs(self.scan_dir, exist_ok=True)
+            with open(self.records_file, "a", encoding='utf-8') as f:
+                f.write("".join(json.dumps(record) + "\n" for record in records))
+            with open(self.log_file, "a", encoding='utf-8') as f:
+                for record in records:
+                    if len(record['met']) >= 2:
+                        f.write(self._format_log_entry(record))
+        except Exception as e:
+            print(f"Error writing pattern log: {e}")
+        for listener in self._listeners:
+            try:
+                listener(records)
+            except Exception as e:
+                print(f"Error in scan log listener: {e}")
+
+    def _format_log_entry(self, record):
+        lines = [
+            f"\n{'='*50}\n",
+            f"Ticker: {record['ticker']}\n",
+            f"Timestamp: {record['timestamp']}\n",
+            f"Conditions Met: {len(record['met'])} of 6\n",
+            "\nSuccessful Conditions:\n"
+        ]
+        lines.extend(f"✓ {cond.replace('_', ' ').title()}\n" for cond in record['met'])
+        if record['failed']:
+            lines.append("\nFailed Conditions:\n")
+            lines.extend(f"✗ {cond.replace('_', ' ').title()}\n" for cond in record['failed'])
+        return "".join(lines)
+
+    def load_existing_records(self):
+        """Seed the aggregates from records this scan_id already wrote (resuming a scan)"""
+        if not os.path.exists(self.records_file):
+            return
+        with self._lock:
+            with open(self.records_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get('scan_id') == self.scan_id:
+                        self._aggregate(record)
+
+    @property
+    def total_scanned(self):
+        with self._lock:
+            return len(self.met_counts)
+
+    def render_summary(self):
+        """Flush pending records and write pattern_summary.txt from the in-memory aggregates"""
+        from conditions import get_pattern
+
+        self.flush()
+        with self._lock:
+            condition_stats = {name: dict(stats) for name, stats in self.condition_stats.items()}
+            met_counts = dict(self.met_counts)
+
+        summary_data = {count: [] for count in range(2, 7)}
+        for ticker, count in met_counts.items():
+            if count >= 2:
+                summary_data.setdefault(count, []).append(ticker)
+
+        try:
+            if not os.path.exists(self.scan_dir):
+                os.makedirs(self.scan_dir, exist_ok=True)
+            with open(self.summary_file, 'w', encoding='utf-8') as f:
+                f.write(f"Pattern Scan Summary Report - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+                f.write("="*50 + "\n\n")
+
+                f.write(f"Pattern Type: {self.pattern_type.title()}\n")
+                f.write("-"*30 + "\n\n")
+
+                f.write("Detailed Condition Analysis:\n")
+                f.write("-"*30 + "\n")
+
+                pattern = get_pattern(self.pattern_type)
+                conditions = pattern.conditions if pattern else []
+                for idx, condition in enumerate(conditions, 1):
+                    stats = condition_stats.get(condition.name, {'success': 0, 'failed': 0})
+                    total = stats['success'] + stats['failed']
+                    if total > 0:
+                        success_pct = (stats['success'] / total) * 100
+                        failure_pct = (stats['failed'] / total) * 100
+
+                        f.write(f"Condition {idx}: {condition.description}\n")
+                        f.write(f"✓ Success Rate: {success_pct:.1f}% ({stats['success']} stocks)\n")
+                        f.write(f"✗ Failed: {stats['failed']} stocks ({failure_pct:.1f}%)\n")
+                        f.write("-"*30 + "\n")
+
+                f.write(f"\nTotal Stocks Scanned: {len(met_counts)}\n")
+                f.write(f"Stocks Meeting 2+ Conditions: {sum(len(stocks) for stocks in summary_data.values())}\n\n")
+
+                for count in sorted(summary_data, reverse=True):
+                    stocks = sorted(summary_data[count])
+                    if stocks:
+                        f.write(f"\n{count} Conditions Met ({len(stocks)} stocks):\n")
+                        f.write("-" * 30 + "\n")
+                        for stock in stocks:
+                            f.write(f"- {stock}\n")
+        except Exception as e:
+            print(f"Error writing pattern summary: {e}")
+
+def _last_record(records_file, exclude=()):
+    """Last complete record in a JSONL file, read from its tail, skipping the scan_ids in exclude"""
+    try:
+        with open(records_file, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 8192))
+            lines = f.read().decode('utf-8', errors='ignore').splitlines()
+        for line in reversed(lines):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if 'scan_id' in record and record['scan_id'] not in exclude:
+                return record
+    except OSError:
+        pass
+    return None
+
+def _last_scan_id(records_file, exclude=()):
+    record = _last_record(records_file, exclude)
+    return record['scan_id'] if record else None
+
+def render_scan_summary(scan_dir):
+    """Re-render pattern_summary.txt in scan_dir for the last scan recorded in its pattern_scan.jsonl"""
+    record = _last_record(os.path.join(scan_dir, "pattern_scan.jsonl"))
+    if record is None:
+        return None
+    logger = ScanLogger(
+        record['pattern'], record['interval'], record['exchange'],
+        scan_id=record['scan_id'], log_dir=os.path.dirname(scan_dir) or "."
+    )
+    logger.load_existing_records()
+    logger.render_summary()
+    return logger
+
+# Live loggers by scan_id, and the most recently begun one per scan folder for
+# callers that do not pass a scan_id
+_loggers = {}
+_current = {}
+_loggers_lock = threading.Lock()
+
+def _new_logger(pattern_type, interval, exchange, scan_id=None):
+    if scan_id is None:
+        # Scans begun in the same microsecond still need distinct ids
+        base = scan_id = datetime.now().strftime("%Y%m%d%H%M%S%f")
+        suffix = 1
+        while scan_id in _loggers:
+            scan_id = f"{base}-{suffix}"
+            suffix += 1
+    logger = ScanLogger(pattern_type, interval, exchange, scan_id=scan_id)
+    from condition_analytics import ANALYTICS_ENABLED, get_analytics_store
+    if ANALYTICS_ENABLED:
+        logger.add_listener(get_analytics_store().record_batch)
+    return logger
+
+def begin_scan_log(pattern_type, interval, exchange, resume=False):
+    """Start (or, with resume, continue the last) scan log for a pattern/interval/exchange.
+
+    Returns the logger; pass its scan_id to get_scan_logger and finish_scan_log
+    so scans of the same pattern running side by side keep separate logs.
+    """
+    key = get_scan_folder_name(pattern_type, interval, exchange)
+    with _loggers_lock:
+        scan_id = None
+        if resume:
+            # A scan still running in this process is not the one being resumed
+            scan_id = _last_scan_id(os.path.join(LOG_DIR, key, "pattern_scan.jsonl"), exclude=set(_loggers))
+        logger = _new_logger(pattern_type, interval, exchange, scan_id=scan_id)
+        if scan_id:
+            logger.load_existing_records()
+        _loggers[logger.scan_id] = logger
+        _current[key] = logger
+        return logger
+
+def get_scan_logger(pattern_type, interval, exchange, scan_id=None):
+    """Logger of scan_id, or of the current scan, creating one if no scan was begun explicitly"""
+    key = get_scan_folder_name(pattern_type, interval, exchange)
+    with _loggers_lock:
+        logger = _loggers.get(scan_id) if scan_id else None
+        if logger is None:
+            logger = _current.get(key)
+        if logger is None:
+            logger = _new_logger(pattern_type, interval, exchange)
+            _loggers[logger.scan_id] = logger
+            _current[key] = logger
+        return logger
+
+def finish_scan_log(pattern_type, interval, exchange, scan_id=None):
+    """Flush a scan's records and render its summary report; a scan finished by scan_id is released"""
+    logger = get_scan_logger(pattern_type, interval, exchange, scan_id=scan_id)
+    logger.render_summary()
+    if scan_id:
+        key = get_scan_folder_name(pattern_type, interval, exchange)
+        with _loggers_lock:
+            _loggers.pop(scan_id, None)
+            if _current.get(key) is logger:
+                del _current[key]
+    return logger
@@ -0,0 +1,381 @@
+import os
+import sys
+import json
+import time
+import bisect
+import threading
+from functools import wraps
+from contextlib import contextmanager
+from datetime import datetime
+import pytz
+
+# Hot-path stages of a scan; fetch is observed once per download batch, the rest once per call
+STAGES = ('fetch', 'name', 'detect', 'chart', 'cache_write', 'cache_read')
+# Upper bounds (seconds) of the latency histogram buckets, Prometheus style
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Snapshot written by the scan worker so the UI and the exporter can read it
+METRICS_FILE = os.environ.get("SCANNER_STAGE_METRICS_FILE", os.path.join("data", "scan_metrics.json"))
+EXPORTER_PORT = int(os.environ.get("SCANNER_METRICS_PORT", "9464"))
+
+class StageMetrics:
+    """Thread-safe call counters and latency histograms per scan stage"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}
+
+    def _stage(self, stage):
+        entry = self._stages.get(stage)
+        if entry is None:
+            entry = {'count': 0, 'errors': 0, 'sum': 0.0, 'max': 0.0, 'buckets': [0] * (len(self.buckets) + 1)}
+            self._stages[stage] = entry
+        return entry
+
+    def observe(self, stage, seconds, error=False):
+        with self._lock:
+            entry = self._stage(stage)
+            entry['count'] += 1
+            entry['sum'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+            entry['buckets'][bisect.bisect_left(self.buckets, seconds)] += 1
+            if error:
+                entry['errors'] += 1
+
+    @contextmanager
+    def time(self, stage):
+        """Observe the duration of the enclosed block; an exception counts as an error"""
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.observe(stage, time.perf_counter() - started, error=True)
+            raise
+        self.observe(stage, time.perf_counter() - started)
+
+    def snapshot(self):
+        """{stage: {count, errors, sum, max, buckets}} with non-cumulative bucket counts; the last bucket is +Inf"""
+        with self._lock:
+            return {
+                'buckets': list(self.buckets),
+                'stages': {stage: dict(entry, buckets=list(entry['buckets'])) for stage, entry in self._stages.items()}
+            }
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+def get_stage_metrics():
+    """Process-wide StageMetrics shared by the scan hot path."""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = StageMetrics()
+        return _metrics
+
+def timed(stage):
+    """Decorator observing every call of the wrapped function under stage"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with get_stage_metrics().time(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def merge_snapshots(*snapshots):
+    """Sum several snapshot() dicts taken with the same buckets (e.g. the worker's and this process's)"""
+    merged = {'buckets': list(LATENCY_BUCKETS), 'stages': {}}
+    for snapshot in snapshots:
+        if not snapshot:
+            continue
+        merged['buckets'] = snapshot['buckets']
+        for stage, entry in snapshot['stages'].items():
+            target = merged['stages'].get(stage)
+            if target is None:
+                merged['stages'][stage] = dict(entry, buckets=list(entry['buckets']))
+                continue
+            target['count'] += entry['count']
+            target['errors'] += entry['errors']
+            target['sum'] += entry['sum']
+            target['max'] = max(target['max'], entry['max'])
+            target['buckets'] = [a + b for a, b in zip(target['buckets'], entry['buckets'])]
+    return merged
+
+def quantile(buckets, counts, q):
+    """Estimate the q-quantile from histogram counts, interpolating linearly inside the bucket"""
+    total = sum(counts)
+    if not total:
+        return 0.0
+    rank = q * total
+    seen = 0
+    for i, count in enumerate(counts):
+        if count and seen + count >= rank:
+            lower = buckets[i - 1] if i else 0.0
+            upper = buckets[i] if i < len(buckets) else buckets[-1]
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+    return buckets[-1]
+
+def stage_rows(snapshot):
+    """One summary row per stage in STAGES order (then any others), with mean and estimated p50/p95"""
+    rows = []
+    stages = snapshot['stages'] if snapshot else {}
+    for stage in list(STAGES) + sorted(set(stages) - set(STAGES)):
+        entry = stages.get(stage)
+        if not entry or not entry['count']:
+            continue
+        rows.append({
+            'stage': stage,
+            'count': entry['count'],
+            'errors': entry['errors'],
+            'total_seconds': entry['sum'],
+            'mean_seconds': entry['sum'] / entry['count'],
+            'p50_seconds': min(entry['max'], quantile(snapshot['buckets'], entry['buckets'], 0.5)),
+            'p95_seconds': min(entry['max'], quantile(snapshot['buckets'], entry['buckets'], 0.95)),
+            'max_seconds': entry['max']
+        })
+    return rows
+
+def format_stage_metrics(snapshot):
+    """Plain-text per-stage table of a snapshot() dict"""
+    columns = ['count', 'errors', 'total_seconds', 'mean_seconds', 'p50_seconds', 'p95_seconds', 'max_seconds']
+    header = f"{'stage':<14}" + "".join(f"{column.replace('_seconds', ''):>12}" for column in columns)
+    lines = [header, "-" * len(header)]
+    for row in stage_rows(snapshot):
+        lines.append(f"{row['stage']:<14}" + "".join(
+            f"{row[column]:>12.4f}" if isinstance(row[column], float) else f"{row[column]:>12}"
+            for column in columns
+        ))
+    return "\n".join(lines)
+
+def _write_json(path, payload):
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    os.replace(temp_file, path)
+
+def save_stage_metrics(path=METRICS_FILE):
+    """Write this process's stage metrics to path for other processes to read"""
+    payload = get_stage_metrics().snapshot()
+    payload.update(pid=os.getpid(), updated_at=datetime.now(pytz.UTC).isoformat())
+    _write_json(path, payload)
+
+def load_stage_metrics(path=METRICS_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def to_prometheus(snapshot, http_metrics=None):
+    """Prometheus text exposition of a stage snapshot and, optionally, per-host HTTP metrics"""
+    lines = [
+        "# HELP scanner_stage_duration_seconds Time spent in each scan stage.",
+        "# TYPE scanner_stage_duration_seconds histogram"
+    ]
+    stages = snapshot['stages'] if snapshot else {}
+    for stage, entry in sorted(stages.items()):
+        cumulative = 0
+        for bound, count in zip(snapshot['buckets'], entry['buckets']):
+            cumulative += count
+            lines.append(f'scanner_stage_duration_seconds_bucket{{stage="{_label(stage)}",le="{bound}"}} {cumulative}')
+        lines.append(f'scanner_stage_duration_seconds_bucket{{stage="{_label(stage)}",le="+Inf"}} {entry["count"]}')
+        lines.append(f'scanner_stage_duration_seconds_sum{{stage="{_label(stage)}"}} {entry["sum"]}')
+        lines.append(f'scanner_stage_duration_seconds_count{{stage="{_label(stage)}"}} {entry["count"]}')
+    lines += [
+        "# HELP scanner_stage_errors_total Scan stage calls that raised.",
+        "# TYPE scanner_stage_errors_total counter"
+    ]
+    for stage, entry in sorted(stages.items()):
+        lines.append(f'scanner_stage_errors_total{{stage="{_label(stage)}"}} {entry["errors"]}')
+
+    if http_metrics:
+        counters = [
+            ('requests', 'HTTP requests sent'), ('successes', 'HTTP requests that succeeded'),
+            ('throttled', 'HTTP requests answered with 429'), ('errors', 'HTTP requests that failed'),
+            ('retries', 'HTTP retries'), ('bytes', 'HTTP response bytes received'),
+            ('latency_seconds', 'Total HTTP request latency'), ('wait_seconds', 'Total time spent waiting for a rate-limit slot')
+        ]
+        gauges = [
+            ('in_flight', 'HTTP requests currently in flight'), ('concurrency', 'Current adaptive concurrency limit'),
+            ('rate', 'Current token bucket rate in requests per second')
+        ]
+        for key, help_text in counters:
+            lines += [f"# HELP scanner_http_{key}_total {help_text}.", f"# TYPE scanner_http_{key}_total counter"]
+            lines += [f'scanner_http_{key}_total{{host="{_label(host)}"}} {values.get(key, 0)}' for host, values in sorted(http_metrics.items())]
+        for key, help_text in gauges:
+            lines += [f"# HELP scanner_http_{key} {help_text}.", f"# TYPE scanner_http_{key} gauge"]
+            lines += [f'scanner_http_{key}{{host="{_label(host)}"}} {values.get(key, 0)}' for host, values in sorted(http_metrics.items())]
+    return "\n".join(lines) + "\n"
+
+def exported_metrics():
+    """The scan worker's stage and HTTP snapshots merged with this process's own"""
+    from http_client import get_http_client, load_metrics
+    stage_file = load_stage_metrics() or {}
+    http_file = load_metrics() or {}
+    # Skip files this process wrote itself, which would count everything twice
+    if stage_file.get('pid') == os.getpid():
+        stage_file = {}
+    if http_file.get('pid') == os.getpid():
+        http_file = {}
+    stage_snapshot = merge_snapshots(stage_file, get_stage_metrics().snapshot())
+    hosts = dict(http_file.get('hosts') or {})
+    hosts.update(get_http_client().metrics())
+    return stage_snapshot, hosts
+
+def serve(port=EXPORTER_PORT, host="0.0.0.0"):
+    """Serve /metrics (Prometheus text) and /metrics.json for a scrape job until interrupted"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            stage_snapshot, hosts = exported_metrics()
+            if self.path.split('?')[0] == '/metrics':
+                body = to_prometheus(stage_snapshot, hosts).encode('utf-8')
+                content_type = 'text/plain; version=0.0.4; charset=utf-8'
+            elif self.path.split('?')[0] == '/metrics.json':
+                body = json.dumps({'stages': stage_rows(stage_snapshot), 'histograms': stage_snapshot, 'http': hosts}).encode('utf-8')
+                content_type = 'application/json'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"Serving scan metrics on http://{host}:{port}/metrics")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+class ScanProfile:
+    """Collects a cProfile or pyinstrument profile across the scan's worker threads.
+
+    Both profilers only see the thread they were started in, so each thread
+    that runs scan work profiles its own block (see profile_thread) and the
+    results are merged when the profile is written.
+    """
+
+    def __init__(self, kind='cprofile'):
+        if kind not in ('cprofile', 'pyinstrument'):
+            raise ValueError(f"Unknown profiler {kind!r}")
+        if kind == 'pyinstrument':
+            import pyinstrument  # noqa: F401 - fail early when it is not installed
+        self.kind = kind
+        self._stats = None
+        self._sessions = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def thread(self):
+        """Profile the enclosed block in the current thread"""
+        if self.kind == 'cprofile':
+            import cProfile
+            import pstats
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                with self._lock:
+                    if self._stats is None:
+                        self._stats = pstats.Stats(profiler)
+                    else:
+                        self._stats.add(profiler)
+        else:
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                session = profiler.stop()
+                with self._lock:
+                    self._sessions.append(session)
+
+    def write(self, path):
+        """Write the merged profile; returns the files written"""
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        base = os.path.splitext(path)[0]
+        if self.kind == 'cprofile':
+            if self._stats is None:
+                return []
+            self._stats.dump_stats(f"{base}.prof")
+            with open(f"{base}.txt", 'w', encoding='utf-8') as f:
+                self._stats.stream = f
+                self._stats.sort_stats('cumulative').print_stats(60)
+                self._stats.stream = sys.stdout
+            return [f"{base}.prof", f"{base}.txt"]
+
+        from pyinstrument.renderers import HTMLRenderer
+        from pyinstrument.session import Session
+        if not self._sessions:
+            return []
+        session = self._sessions[0]
+        for other in self._sessions[1:]:
+            session = Session.combine(session, other)
+        with open(f"{base}.html", 'w', encoding='utf-8') as f:
+            f.write(HTMLRenderer().render(session))
+        return [f"{base}.html"]
+
+_active_profile = None
+
+@contextmanager
+def profile_scan(path, kind='cprofile'):
+    """Profile one scan: the calling thread and every profile_thread block until the scan ends"""
+    global _active_profile
+    if _active_profile is not None:
+        raise RuntimeError("A scan is already being profiled")
+    profile = ScanProfile(kind)
+    _active_profile = profile
+    try:
+        with profile.thread():
+            yield profile
+    finally:
+        _active_profile = None
+        for written in profile.write(path):
+            print(f"Wrote {written}")
+
+@contextmanager
+def profile_thread():
+    """Include the enclosed block in the active scan profile, if there is one"""
+    profile = _active_profile
+    if profile is None:
+        yield
+        return
+    with profile.thread():
+        yield
+
+if __name__ == "__main__":
+    # python scan_metrics.py serve [port]  -> Prometheus /metrics and /metrics.json exporter
+    # python scan_metrics.py [prometheus]  -> print the current snapshot once
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        serve(int(sys.argv[2]) if len(sys.argv) > 2 else EXPORTER_PORT)
+    else:
+        stage_snapshot, hosts = exported_metrics()
+        if len(sys.argv) > 1 and sys.argv[1] == "prometheus":
+            print(to_prometheus(stage_snapshot, hosts), end="")
+        else:
+            print(format_stage_metrics(stage_snapshot))
@@ -0,0 +1,429 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import subprocess
+import threading
+from datetime import datetime, timedelta
+import pytz
+
+from http_client import save_metrics
+from scan_metrics import save_stage_metrics
+
+JOBS_DB = os.environ.get("SCANNER_JOBS_DB", os.path.join("data", "scan_jobs.sqlite"))
+SERVICE_CONCURRENT_JOBS = int(os.environ.get("SCANNER_SERVICE_JOBS", "2"))
+WORKER_IDLE_EXIT_SECONDS = float(os.environ.get("SCANNER_WORKER_IDLE_EXIT", "600"))
+HEARTBEAT_SECONDS = 5
+# A running job or worker whose heartbeat is older than this is considered dead
+HEARTBEAT_TIMEOUT_SECONDS = 30
+CHECKPOINT_EVERY = 10
+
+ACTIVE_STATUSES = ('queued', 'running')
+FINISHED_STATUSES = ('done', 'stopped', 'failed')
+
+def _now():
+    return datetime.now(pytz.UTC)
+
+class ScanJobs:
+    """Job table shared by the UI sessions and the scan worker process.
+
+    At most one queued or running job exists per (pattern, interval, exchange):
+    submitting the same request returns the job already in progress, after
+    adding all_patterns to its options if the new request asks for it.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or JOBS_DB
+        self._local = threading.local()
+        self.ensure_schema()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def ensure_schema(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    pattern TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    exchange TEXT NOT NULL,
+                    options TEXT NOT NULL DEFAULT '{}',
+                    status TEXT NOT NULL,
+                    stop_requested INTEGER NOT NULL DEFAULT 0,
+                    total_stocks INTEGER NOT NULL DEFAULT 0,
+                    processed INTEGER NOT NULL DEFAULT 0,
+                    matches INTEGER NOT NULL DEFAULT 0,
+                    issues INTEGER NOT NULL DEFAULT 0,
+                    worker_pid INTEGER,
+                    error TEXT,
+                    requested_at TEXT NOT NULL,
+                    started_at TEXT,
+                    heartbeat_at TEXT,
+                    finished_at TEXT
+                )
+            """)
+            conn.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active ON jobs (pattern, interval, exchange)
+                WHERE status IN ('queued', 'running')
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, requested_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS workers (
+                    pid INTEGER PRIMARY KEY,
+                    started_at TEXT NOT NULL,
+                    heartbeat_at TEXT NOT NULL
+                )
+            """)
+
+    def _row(self, row):
+        if row is None:
+            return None
+        job = dict(row)
+        job['options'] = json.loads(job['options'] or '{}')
+        job['stop_requested'] = bool(job['stop_requested'])
+        return job
+
+    def get(self, job_id):
+        return self._row(self._connect().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone())
+
+    def active_job(self, pattern, interval, exchange):
+        return self._row(self._connect().execute(
+            "SELECT * FROM jobs WHERE pattern = ? AND interval = ? AND exchange = ? AND status IN ('queued', 'running')",
+            (pattern, interval, exchange)
+        ).fetchone())
+
+    def list_jobs(self, limit=20):
+        rows = self._connect().execute("SELECT * FROM jobs ORDER BY job_id DESC LIMIT ?", (limit,)).fetchall()
+        return [self._row(row) for row in rows]
+
+    def submit(self, pattern, interval, exchange, **options):
+        """Queue a scan, or return (and if needed upgrade to all_patterns) the scan already queued or running"""
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO jobs (pattern, interval, exchange, options, status, requested_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+                    (pattern, interval, exchange, json.dumps(options), _now().isoformat())
+                )
+            return self.get(cursor.lastrowid)
+        except sqlite3.IntegrityError:
+            job = self.active_job(pattern, interval, exchange)
+            if job is None:
+                # The active job finished between the insert and the lookup
+                return self.submit(pattern, interval, exchange, **options)
+            if job['stop_requested'] and job['status'] == 'queued':
+                self.clear_stop(job['job_id'])
+                job['stop_requested'] = False
+            if options.get('all_patterns') and not job['options'].get('all_patterns'):
+                # A queued job picks this up when claimed; a running one queues a follow-up when done (see run_job)
+                job['options'] = dict(job['options'], all_patterns=True)
+                with conn:
+                    conn.execute("UPDATE jobs SET options = ? WHERE job_id = ?", (json.dumps(job['options']), job['job_id']))
+            return job
+
+    def request_stop(self, job_id):
+        conn = self._connect()
+        with conn:
+            conn.execute("UPDATE jobs SET stop_requested = 1 WHERE job_id = ? AND status IN ('queued', 'running')", (job_id,))
+
+    def clear_stop(self, job_id):
+        conn = self._connect()
+        with conn:
+            conn.execute("UPDATE jobs SET stop_requested = 0 WHERE job_id = ?", (job_id,))
+
+    def stop_requested(self, job_id):
+        row = self._connect().execute("SELECT stop_requested FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def requeue_stale(self):
+        """Put running jobs whose worker stopped heartbeating back in the queue"""
+        cutoff = (_now() - timedelta(seconds=HEARTBEAT_TIMEOUT_SECONDS)).isoformat()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', worker_pid = NULL WHERE status = 'running' AND heartbeat_at < ?",
+                (cutoff,)
+            )
+
+    def claim_next(self, pid):
+        """Atomically move the oldest queued job to running for this worker; None if the queue is empty"""
+        self.requeue_stale()
+        conn = self._connect()
+        while True:
+            row = conn.execute("SELECT job_id, stop_requested FROM jobs WHERE status = 'queued' ORDER BY requested_at LIMIT 1").fetchone()
+            if row is None:
+                return None
+            now = _now().isoformat()
+            with conn:
+                if row['stop_requested']:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'stopped', finished_at = ? WHERE job_id = ? AND status = 'queued'",
+                        (now, row['job_id'])
+                    )
+                    continue
+                claimed = conn.execute(
+                    "UPDATE jobs SET status = 'running', worker_pid = ?, started_at = COALESCE(started_at, ?), heartbeat_at = ? "
+                    "WHERE job_id = ? AND status = 'queued'",
+                    (pid, now, now, row['job_id'])
+                ).rowcount
+            if claimed:
+                return self.get(row['job_id'])
+
+    def update_progress(self, job_id, total_stocks, processed, matches, issues):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET total_stocks = ?, processed = ?, matches = ?, issues = ?, heartbeat_at = ? WHERE job_id = ?",
+                (total_stocks, processed, matches, issues, _now().isoformat(), job_id)
+            )
+
+    def finish(self, job_id, status, error=None):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE job_id = ?",
+                (status, error, _now().isoformat(), job_id)
+            )
+
+    def heartbeat(self, pid, started_at):
+        now = _now().isoformat()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO workers (pid, started_at, heartbeat_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (pid) DO UPDATE SET heartbeat_at = excluded.heartbeat_at",
+                (pid, started_at, now)
+            )
+            conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE worker_pid = ? AND status = 'running'", (now, pid))
+
+    def remove_worker(self, pid):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM workers WHERE pid = ?", (pid,))
+
+    def live_worker(self):
+        cutoff = (_now() - timedelta(seconds=HEARTBEAT_TIMEOUT_SECONDS)).isoformat()
+        row = self._connect().execute("SELECT pid FROM workers WHERE heartbeat_at >= ? LIMIT 1", (cutoff,)).fetchone()
+        return row['pid'] if row else None
+
+def run_job(job, jobs, cache_manager):
+    """Run (or resume from the progress journal) one claimed job to completion or stop.
+
+    With the all_patterns option every registered pattern is evaluated on the
+    same downloads and each one's final results are cached. Progress is
+    journaled for the job's own pattern only, so a stopped job resumes just
+    that pattern. If all_patterns was added to the job after it was claimed,
+    a follow-up all_patterns job is queued once this one is done.
+    """
+    from conditions import PATTERNS
+    from fetch_data import OFFLINE_MODE
+    from prefilter import PREFILTER_ENABLED, prune_universe
+    from scan_logger import begin_scan_log, finish_scan_log
+    from scanner import scan_tickers, DEFAULT_MAX_WORKERS
+    from universe_cache import get_universe
+
+    pattern, interval, exchange = job['pattern'], job['interval'], job['exchange']
+    options = job['options']
+    offline = options.get('offline', OFFLINE_MODE)
+    other_patterns = []
+    if options.get('all_patterns'):
+        other_patterns = [p.name for p in PATTERNS.values() if p.name.lower() != pattern.lower()]
+
+    progress_data = None
+    processed_stocks = set()
+    matching_stocks = []
+    stocks_with_issues = []
+    total_stocks = 0
+    # Scan log per pattern, by scan_id, so a concurrent job on the same pattern logs separately
+    scan_ids = {}
+    # Tickers processed since the last saved checkpoint, so a checkpoint costs O(new tickers)
+    unsaved = []
+
+    def checkpoint(sync=False):
+        if cache_manager.save_progress_to_cache(
+            pattern, interval, exchange, processed_stocks,
+            matching_stocks, stocks_with_issues, total_stocks, sync=sync, newly_processed=unsaved
+        ):
+            unsaved.clear()
+        jobs.update_progress(job['job_id'], total_stocks, len(processed_stocks), len(matching_stocks), len(stocks_with_issues))
+
+    try:
+        tickers = get_universe(exchange, offline=offline)
+        if not tickers:
+            jobs.finish(job['job_id'], 'failed', error=f"No tickers available for {exchange}")
+            return
+
+        progress_data = cache_manager.get_progress_from_cache(pattern, interval, exchange)
+        if progress_data:
+            processed_stocks = progress_data['processed_stocks']
+            matching_stocks = progress_data['matching_stocks']
+            stocks_with_issues = progress_data['stocks_with_issues']
+            total_stocks = progress_data['total_stocks']
+            tickers = [t for t in tickers if t not in processed_stocks]
+        else:
+            total_stocks = len(tickers)
+        if other_patterns and progress_data:
+            # The other patterns were not journaled; they need every ticker again
+            other_patterns = []
+        other_matches = {name: [] for name in other_patterns}
+        if options.get('prefilter', PREFILTER_ENABLED):
+            # Pruned tickers count as processed, so progress and resume treat them as scanned
+            tickers, pruned = prune_universe(tickers, [pattern] + other_patterns, interval)
+            processed_stocks.update(pruned)
+            unsaved.extend(pruned)
+
+        checkpoint()
+        scan_ids[pattern] = begin_scan_log(pattern, interval, exchange, resume=bool(progress_data)).scan_id
+        for name in other_patterns:
+            scan_ids[name] = begin_scan_log(name, interval, exchange).scan_id
+
+        scan_results = scan_tickers(
+            tickers, [pattern] + other_patterns, interval, exchange,
+            max_workers=options.get('workers', DEFAULT_MAX_WORKERS),
+            should_stop=lambda: jobs.stop_requested(job['job_id']),
+            offline=offline, scan_ids=scan_ids
+        )
+        try:
+            for i, result in enumerate(scan_results, 1):
+                processed_stocks.add(result['ticker'])
+                unsaved.append(result['ticker'])
+                data = result['data']
+                if not data.empty:
+                    entry = (result['ticker'], result['company_name'], data)
+                    if result['has_period_issues']:
+                        stocks_with_issues.append(entry)
+                    if result['pattern_matches'][pattern]:
+                        matching_stocks.append(entry)
+                    for name in other_patterns:
+                        if result['pattern_matches'][name]:
+                            other_matches[name].append(entry)
+                if i % CHECKPOINT_EVERY == 0:
+                    checkpoint()
+        finally:
+            scan_results.close()
+
+        stopped = jobs.stop_requested(job['job_id']) and len(processed_stocks) < total_stocks
+        if stopped:
+            checkpoint(sync=True)
+            jobs.finish(job['job_id'], 'stopped')
+        else:
+            cache_manager.save_final_results(
+                pattern, interval, exchange, matching_stocks, stocks_with_issues, total_stocks
+            )
+            for name in other_patterns:
+                cache_manager.save_final_results(
+                    name, interval, exchange, other_matches[name], stocks_with_issues, total_stocks
+                )
+            jobs.update_progress(job['job_id'], total_stocks, len(processed_stocks), len(matching_stocks), len(stocks_with_issues))
+            jobs.finish(job['job_id'], 'done')
+            requested = jobs.get(job['job_id'])['options']
+            if requested.get('all_patterns') and not options.get('all_patterns'):
+                jobs.submit(pattern, interval, exchange, **requested)
+    except Exception as e:
+        print(f"Error running scan job {job['job_id']}: {e}")
+        try:
+            # Nothing worth journaling before the universe and progress were loaded
+            if total_stocks:
+                checkpoint(sync=True)
+        except Exception as checkpoint_error:
+            print(f"Error saving progress for scan job {job['job_id']}: {checkpoint_error}")
+        finally:
+            jobs.finish(job['job_id'], 'failed', error=str(e))
+    finally:
+        for name, scan_id in scan_ids.items():
+            finish_scan_log(name, interval, exchange, scan_id=scan_id)
+
+def run_worker(concurrent_jobs=SERVICE_CONCURRENT_JOBS, idle_exit=WORKER_IDLE_EXIT_SECONDS):
+    """Claim and run queued jobs until the queue has been empty for idle_exit seconds"""
+    from cache_manager import CacheManager
+
+    jobs = ScanJobs()
+    pid = os.getpid()
+    started_at = _now().isoformat()
+    running = {}
+    stopping = threading.Event()
+
+    def beat():
+        beat_jobs = ScanJobs(jobs.db_path)
+        while not stopping.wait(HEARTBEAT_SECONDS):
+            beat_jobs.heartbeat(pid, started_at)
+            try:
+                save_metrics()
+                save_stage_metrics()
+            except Exception as e:
+                print(f"Error saving scan metrics: {e}")
+
+    def run(job):
+        try:
+            run_job(job, ScanJobs(jobs.db_path), CacheManager())
+        finally:
+            running.pop(job['job_id'], None)
+
+    jobs.heartbeat(pid, started_at)
+    jobs.remove_worker(-1)
+    threading.Thread(target=beat, name="scan-heartbeat", daemon=True).start()
+    idle_since = time.monotonic()
+    try:
+        while True:
+            if len(running) < max(1, concurrent_jobs):
+                job = jobs.claim_next(pid)
+                if job is not None:
+                    print(f"Starting scan job {job['job_id']}: {job['pattern']} / {job['interval']} / {job['exchange']}")
+                    thread = threading.Thread(target=run, args=(job,), name=f"scan-job-{job['job_id']}")
+                    running[job['job_id']] = thread
+                    thread.start()
+                    continue
+            if running:
+                idle_since = time.monotonic()
+            elif time.monotonic() - idle_since > idle_exit:
+                break
+            time.sleep(1)
+    finally:
+        stopping.set()
+        for thread in list(running.values()):
+            thread.join()
+        jobs.remove_worker(pid)
+
+def ensure_worker(jobs=None):
+    """Start a detached worker process unless one is already heartbeating"""
+    jobs = jobs or ScanJobs()
+    if jobs.live_worker() is not None:
+        return False
+    log_dir = os.path.dirname(jobs.db_path) or "."
+    with open(os.path.join(log_dir, "scan_worker.log"), 'a') as log:
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "worker"],
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            start_new_session=True,
+            env=dict(os.environ, SCANNER_JOBS_DB=os.path.abspath(jobs.db_path))
+        )
+    # Register the spawn right away so concurrent sessions do not start another one
+    jobs.heartbeat(-1, _now().isoformat())
+    return True
+
+def submit_scan(pattern, interval, exchange, **options):
+    """Queue (or join) a scan and make sure a worker will pick it up"""
+    jobs = ScanJobs()
+    job = jobs.submit(pattern, interval, exchange, **options)
+    ensure_worker(jobs)
+    return job
+
+if __name__ == "__main__":
+    # python scan_service.py worker  -> run queued scan jobs until idle
+    if len(sys.argv) > 1 and sys.argv[1] == "worker":
+        run_worker()
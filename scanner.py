@@ -0,0 +1,113 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from fetch_data import fetch_stock_data_batch, get_company_name
+from indicator_state import indicator_state_for
+from pattern_detection import detect_pattern
+from prefilter import get_summary_index
+from scan_metrics import get_stage_metrics, profile_thread
+
+DEFAULT_MAX_WORKERS = int(os.environ.get("SCANNER_MAX_WORKERS", "8"))
+DEFAULT_BATCH_SIZE = int(os.environ.get("SCANNER_BATCH_SIZE", "25"))
+
+def _pattern_list(pattern):
+    return [pattern] if isinstance(pattern, str) else list(pattern)
+
+def evaluate_ticker(ticker, data, has_period_issues, pattern, interval, exchange, scan_ids=None):
+    """Name and evaluate a single fetched ticker. Safe to run in a worker thread.
+
+    pattern may also be a list of patterns, all evaluated on the same data;
+    'pattern_matches' holds the outcome per pattern and 'matched' is True
+    when any of them matched. scan_ids maps a pattern to the scan log its
+    outcomes are recorded in.
+    """
+    patterns = _pattern_list(pattern)
+    result = {
+        'ticker': ticker,
+        'company_name': None,
+        'data': data,
+        'has_period_issues': has_period_issues,
+        'matched': False,
+        'pattern_matches': dict.fromkeys(patterns, False),
+        'fetch_seconds': 0.0,
+        'name_seconds': 0.0,
+        'detect_seconds': 0.0
+    }
+    if data.empty:
+        return result
+
+    metrics = get_stage_metrics()
+    started = time.perf_counter()
+    with metrics.time('name'):
+        result['company_name'] = get_company_name(ticker)
+    named = time.perf_counter()
+    state = indicator_state_for(ticker, interval, data)
+    for name in patterns:
+        with metrics.time('detect'):
+            result['pattern_matches'][name] = detect_pattern(data, pattern_type=name, ticker=ticker, interval=interval, exchange=exchange, state=state, scan_id=(scan_ids or {}).get(name))
+    result['matched'] = any(result['pattern_matches'].values())
+    try:
+        get_summary_index().update(ticker, interval, data)
+    except Exception as e:
+        print(f"Error updating summary index for {ticker}: {e}")
+    result['name_seconds'] = named - started
+    result['detect_seconds'] = time.perf_counter() - named
+    return result
+
+def process_batch(tickers, pattern, interval, exchange, offline=None, scan_ids=None):
+    """Fetch a chunk of tickers in one batch request and evaluate each of them.
+
+    Each result carries its share of the batch fetch time in 'fetch_seconds'.
+    """
+    with profile_thread():
+        started = time.perf_counter()
+        with get_stage_metrics().time('fetch'):
+            fetched = fetch_stock_data_batch(tickers, interval, chunk_size=len(tickers), offline=offline)
+        fetch_seconds = (time.perf_counter() - started) / max(1, len(tickers))
+        results = []
+        for ticker in tickers:
+            result = evaluate_ticker(ticker, *fetched[ticker], pattern, interval, exchange, scan_ids=scan_ids)
+            result['fetch_seconds'] = fetch_seconds
+            results.append(result)
+        return results
+
+def scan_tickers(tickers, pattern, interval, exchange, max_workers=DEFAULT_MAX_WORKERS, should_stop=None, batch_size=DEFAULT_BATCH_SIZE, offline=None, scan_ids=None):
+    """Run process_batch over tickers with bounded concurrency.
+
+    Tickers are fetched batch_size at a time. Yields one result dict per ticker in
+    completion order. At most 2 * max_workers batches are in flight at once, so a
+    stop request (should_stop returning True) or closing the generator leaves
+    little work behind; pending batches are cancelled. With offline set, bars come
+    only from the local bar store. pattern may be a list of patterns, which are
+    all evaluated on the one download of each ticker; scan_ids maps a pattern
+    to its scan log (see evaluate_ticker).
+    """
+    max_workers = max(1, int(max_workers))
+    batch_size = max(1, int(batch_size))
+    max_in_flight = max_workers * 2
+    tickers = list(tickers)
+    chunk_iter = iter(range(0, len(tickers), batch_size))
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scan")
+    in_flight = set()
+
+    def submit_next():
+        for start in chunk_iter:
+            chunk = tickers[start:start + batch_size]
+            in_flight.add(executor.submit(process_batch, chunk, pattern, interval, exchange, offline, scan_ids))
+            if len(in_flight) >= max_in_flight:
+                break
+
+    try:
+        submit_next()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                in_flight.discard(future)
+                for result in future.result():
+                    yield result
+            if should_stop and should_stop():
+                break
+            submit_next()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
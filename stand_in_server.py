@@ -0,0 +1,187 @@
+"""Local stand-in for Yahoo Finance and NSE that serves recorded fixtures.
+
+    SCANNER_FETCH_MODE=record python scan_cli.py --limit 200   # capture fixtures
+    python stand_in_server.py --latency 0.08 --throttle-rate 0.05 --rps 20
+    SCANNER_STAND_IN_URL=http://127.0.0.1:8765 python scan_cli.py --limit 200
+
+Requests arrive as /<original host>/<path>?<query> (see fetch_fixtures.stand_in_url).
+Latency, error and throttling behaviour is configurable globally and per host, and
+all randomness is seeded so runs are repeatable.
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from urllib.parse import parse_qs, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fetch_fixtures import FIXTURE_DIR, STAND_IN_HISTORY_PATH, FixtureStore, frame_to_payload
+
+DEFAULT_PORT = 8765
+DEFAULT_BEHAVIOUR = {
+    'latency': 0.05,          # seconds added to every response
+    'jitter': 0.02,           # plus uniform(0, jitter)
+    'ticker_latency': 0.0,    # plus this per ticker in a history request
+    'error_rate': 0.0,        # share of requests answered with a 503
+    'throttle_rate': 0.0,     # share of requests answered with a 429
+    'rps': 0.0,               # token bucket per host; requests beyond it get a 429 (0 = unlimited)
+    'retry_after': 1          # Retry-After seconds sent with every 429
+}
+
+class StandInServer:
+    """Threaded HTTP server answering from a FixtureStore with simulated network behaviour"""
+
+    def __init__(self, fixture_dir=FIXTURE_DIR, port=DEFAULT_PORT, bind="127.0.0.1", seed=0, hosts=None, **behaviour):
+        self.fixtures = FixtureStore(fixture_dir)
+        self.behaviour = dict(DEFAULT_BEHAVIOUR, **behaviour)
+        self.hosts = hosts or {}
+        self._random = random.Random(seed)
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.stats = {}
+        self.server = ThreadingHTTPServer((bind, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def config_for(self, host):
+        return dict(self.behaviour, **self.hosts.get(host, {}))
+
+    def _count(self, host, outcome):
+        host_stats = self.stats.setdefault(host, {'requests': 0, 'served': 0, 'missing': 0, 'throttled': 0, 'errors': 0})
+        host_stats['requests'] += 1
+        host_stats[outcome] += 1
+
+    def _admit(self, host, config):
+        """None to serve the request, or 'throttled' / 'errors' to fail it; also returns the latency to add"""
+        with self._lock:
+            latency = config['latency'] + self._random.uniform(0, config['jitter'])
+            if config['rps']:
+                now = time.monotonic()
+                tokens, updated = self._buckets.get(host, (config['rps'], now))
+                tokens = min(config['rps'], tokens + (now - updated) * config['rps'])
+                if tokens < 1:
+                    self._buckets[host] = (tokens, now)
+                    return 'throttled', latency
+                self._buckets[host] = (tokens - 1, now)
+            roll = self._random.random()
+            if roll < config['throttle_rate']:
+                return 'throttled', latency
+            if roll < config['throttle_rate'] + config['error_rate']:
+                return 'errors', latency
+            return None, latency
+
+    def _history(self, query):
+        params = parse_qs(query)
+        tickers = params.get('tickers', [""])[0].split(",")
+        interval = params.get('interval', ["1h"])[0]
+        period = params.get('period', [None])[0]
+        start = params.get('start', [None])[0]
+        payload = {}
+        for ticker in filter(None, tickers):
+            frame = self.fixtures.history(ticker, interval, period=period, start=start)
+            if not frame.empty:
+                payload[ticker] = frame_to_payload(frame)
+        return 200, 'application/json', json.dumps(payload).encode('utf-8'), len(tickers)
+
+    def respond(self, method, path):
+        """(status, headers, body) for one request path of the form /<host>/<path>?<query>"""
+        parts = urlsplit(path)
+        host, _, rest = parts.path.lstrip("/").partition("/")
+        rest = "/" + rest
+        if host == "_stand_in":
+            with self._lock:
+                body = json.dumps(self.stats).encode('utf-8')
+            return 200, {'Content-Type': 'application/json'}, body
+
+        config = self.config_for(host)
+        failure, latency = self._admit(host, config)
+        if rest == STAND_IN_HISTORY_PATH:
+            status, content_type, body, tickers = self._history(parts.query)
+            latency += config['ticker_latency'] * tickers
+        else:
+            url = f"https://{host}{rest}" + (f"?{parts.query}" if parts.query else "")
+            recorded = self.fixtures.load_response(method, url)
+            if recorded is None:
+                status, content_type, body = 404, 'text/plain', b"No fixture recorded"
+            else:
+                status, content_type, body = recorded
+        time.sleep(latency)
+
+        with self._lock:
+            if failure == 'throttled':
+                self._count(host, 'throttled')
+                return 429, {'Content-Type': 'text/plain', 'Retry-After': str(config['retry_after'])}, b"Too Many Requests"
+            if failure == 'errors':
+                self._count(host, 'errors')
+                return 503, {'Content-Type': 'text/plain'}, b"Service Unavailable"
+            self._count(host, 'missing' if status == 404 else 'served')
+        return status, {'Content-Type': content_type or 'application/octet-stream'}, body
+
+    def _handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                status, headers, body = stand_in.respond('GET', self.path)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """Serve from a background thread (for benchmarks); returns self"""
+        self._thread = threading.Thread(target=self.server.serve_forever, name="stand-in-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve recorded Yahoo/NSE fixtures with simulated latency, errors and throttling.")
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="Fixture directory written by SCANNER_FETCH_MODE=record")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--bind", default="127.0.0.1")
+    parser.add_argument("--seed", type=int, default=0)
+    for key, value in DEFAULT_BEHAVIOUR.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=type(value), default=value)
+    parser.add_argument("--hosts", help="JSON file of per-host overrides, e.g. {\"archives.nseindia.com\": {\"rps\": 2}}")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    hosts = {}
+    if args.hosts:
+        with open(args.hosts, 'r', encoding='utf-8') as f:
+            hosts = json.load(f)
+    behaviour = {key: getattr(args, key) for key in DEFAULT_BEHAVIOUR}
+    stand_in = StandInServer(args.fixtures, port=args.port, bind=args.bind, seed=args.seed, hosts=hosts, **behaviour)
+    print(f"Serving fixtures from {args.fixtures} on {stand_in.url}")
+    try:
+        stand_in.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stand_in.server.server_close()
+        print(json.dumps(stand_in.stats, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import os
+import json
+import threading
+from datetime import datetime, timedelta
+import pytz
+
+METADATA_FILE = os.environ.get("SCANNER_SYMBOL_METADATA", os.path.join("data", "symbol_metadata.json"))
+METADATA_TTL_HOURS = float(os.environ.get("SCANNER_SYMBOL_METADATA_TTL_HOURS", "24"))
+
+_table = None
+_scraped = {}
+_lock = threading.Lock()
+
+def get_symbol(ticker):
+    """Exchange symbol for a Yahoo ticker, e.g. RELIANCE.NS -> RELIANCE"""
+    for suffix in ('.NS', '.BO'):
+        if ticker.endswith(suffix):
+            return ticker[:-len(suffix)]
+    return ticker
+
+def build_symbol_metadata(equity_df):
+    """Build {symbol: metadata} from an NSE EQUITY_L.csv frame"""
+    df = equity_df.rename(columns=lambda c: str(c).strip().upper())
+    table = {}
+    for record in df.to_dict('records'):
+        symbol = str(record.get('SYMBOL', '')).strip()
+        if not symbol:
+            continue
+        table[symbol] = {
+            'name': str(record.get('NAME OF COMPANY', symbol)).strip(),
+            'series': str(record.get('SERIES', '')).strip(),
+            'isin': str(record.get('ISIN NUMBER', '')).strip(),
+            'listed': str(record.get('DATE OF LISTING', '')).strip()
+        }
+    return table
+
+def save_symbol_metadata(table, path=METADATA_FILE):
+    try:
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        temp_file = f"{path}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({'updated_at': datetime.now(pytz.UTC).isoformat(), 'symbols': table}, f)
+        os.replace(temp_file, path)
+    except Exception as e:
+        print(f"Error saving symbol metadata: {e}")
+
+def load_symbol_metadata(path=METADATA_FILE, ttl_hours=METADATA_TTL_HOURS):
+    """Return (table, is_fresh) from disk, or (None, False) when there is no usable file"""
+    if not os.path.exists(path):
+        return None, False
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        updated_at = datetime.fromisoformat(payload['updated_at'])
+        is_fresh = datetime.now(pytz.UTC) - updated_at < timedelta(hours=ttl_hours)
+        return payload['symbols'], is_fresh
+    except Exception as e:
+        print(f"Error reading symbol metadata: {e}")
+        return None, False
+
+def update_symbol_metadata(equity_df):
+    """Rebuild the in-process table from a freshly downloaded EQUITY_L.csv and persist it"""
+    global _table
+    table = build_symbol_metadata(equity_df)
+    if not table:
+        return
+    with _lock:
+        _table = table
+    save_symbol_metadata(table)
+
+def get_symbol_metadata(loader=None):
+    """Symbol table for this process, loaded once.
+
+    Uses the on-disk table while it is within its TTL; otherwise calls loader()
+    (which should return the EQUITY_L.csv frame or None) and falls back to the
+    stale file when that fails.
+    """
+    global _table
+    if _table is not None:
+        return _table
+    with _lock:
+        if _table is not None:
+            return _table
+        table, is_fresh = load_symbol_metadata()
+        if not is_fresh and loader is not None:
+            equity_df = loader()
+            if equity_df is not None and not equity_df.empty:
+                fresh_table = build_symbol_metadata(equity_df)
+                if fresh_table:
+                    table = fresh_table
+                    save_symbol_metadata(table)
+        _table = table or {}
+        return _table
+
+def lookup_company_name(ticker, loader=None):
+    """Company name for a ticker from the metadata table or earlier scrapes, else None"""
+    symbol = get_symbol(ticker)
+    entry = get_symbol_metadata(loader).get(symbol)
+    if entry:
+        return entry['name']
+    return _scraped.get(symbol)
+
+def remember_company_name(ticker, company_name):
+    _scraped[get_symbol(ticker)] = company_name
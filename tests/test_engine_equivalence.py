@@ -0,0 +1,88 @@
+"""Every pattern engine must agree with conditions.evaluate_pattern on the same data.
+
+The incremental indicator state and the backtester's vectorized checks each
+re-implement the registered conditions; these tests pin them to the batch
+checks over planted, random, short and gappy histories.
+"""
+import numpy as np
+import pytest
+
+from backtest import BarArrays, pattern_matches
+from benchmarks.synthetic import PLANTABLE, synthetic_ohlcv
+from conditions import ConditionContext, PATTERNS, evaluate_pattern, evaluate_pattern_state
+from indicator_state import IndicatorState
+
+PATTERN_NAMES = [pattern.name for pattern in PATTERNS.values()]
+
+def _with_gaps(data, seed):
+    # Missing bars as Yahoo sometimes returns them: whole rows of NaN prices
+    data = data.copy()
+    rows = np.random.default_rng(seed).choice(len(data), size=len(data) // 25, replace=False)
+    data.iloc[rows, [data.columns.get_loc(column) for column in ('Open', 'High', 'Low', 'Close')]] = np.nan
+    return data
+
+def _fixtures():
+    fixtures = {}
+    for number, name in enumerate(PLANTABLE):
+        for seed in range(3):
+            fixtures[f"planted-{number}-{seed}"] = synthetic_ohlcv(260, seed=seed, plant=name)
+    for bars in (59, 60, 61, 119, 120, 121, 300):
+        fixtures[f"walk-{bars}"] = synthetic_ohlcv(bars, seed=bars, volatility=0.02)
+    for seed in range(4):
+        fixtures[f"quiet-{seed}"] = synthetic_ohlcv(200, seed=50 + seed, volatility=0.004)
+        fixtures[f"gappy-{seed}"] = _with_gaps(synthetic_ohlcv(220, seed=70 + seed, plant=PLANTABLE[seed % len(PLANTABLE)]), seed)
+    return fixtures
+
+FIXTURES = _fixtures()
+
+def _expected_conditions(data, pattern):
+    """{condition: outcome} of the batch checks, for data the pattern's bar minimum and gates let through"""
+    if len(data) < pattern.min_bars:
+        return None
+    ctx = ConditionContext(data)
+    outcomes = {condition.name: bool(condition.check(ctx)) for condition in pattern.conditions}
+    if not all(outcomes[condition.name] for condition in pattern.conditions if condition.gate):
+        return None
+    return outcomes
+
+@pytest.mark.parametrize("pattern_name", PATTERN_NAMES)
+@pytest.mark.parametrize("fixture", sorted(FIXTURES))
+def test_incremental_state_matches_batch(pattern_name, fixture):
+    data = FIXTURES[fixture]
+    state = IndicatorState()
+    state.push_frame(data)
+    assert evaluate_pattern_state(state, pattern_name) == evaluate_pattern(data, pattern_name)
+    pattern = PATTERNS[pattern_name.lower()]
+    expected = _expected_conditions(data, pattern)
+    if expected is not None:
+        assert {condition.name: bool(condition.incremental(state)) for condition in pattern.conditions} == expected
+
+@pytest.mark.parametrize("pattern_name", PATTERN_NAMES)
+@pytest.mark.parametrize("fixture", sorted(FIXTURES))
+def test_vectorized_checks_match_batch(pattern_name, fixture):
+    data = FIXTURES[fixture]
+    pattern = PATTERNS[pattern_name.lower()]
+    bars = BarArrays(data)
+    cache = {}
+    matched = pattern_matches(bars, pattern, cache)
+    # The last bar and a spread of earlier ones, each against the history up to it
+    for end in sorted({len(data)} | set(range(pattern.min_bars - 1, len(data), 23))):
+        prefix = data.iloc[:end]
+        assert matched[end - 1] == evaluate_pattern(prefix, pattern_name)['matched'], f"bar {end - 1}"
+        expected = _expected_conditions(prefix, pattern)
+        if expected is not None:
+            assert {name: bool(cache[name][end - 1]) for name in expected} == expected, f"bar {end - 1}"
+
+@pytest.mark.parametrize("pattern_name", PATTERN_NAMES)
+@pytest.mark.parametrize("fixture", sorted(FIXTURES))
+def test_exhaustive_evaluation_records_every_condition(pattern_name, fixture):
+    data = FIXTURES[fixture]
+    pattern = PATTERNS[pattern_name.lower()]
+    expected = _expected_conditions(data, pattern)
+    state = IndicatorState()
+    state.push_frame(data)
+    for result in (evaluate_pattern(data, pattern_name, exhaustive=True), evaluate_pattern_state(state, pattern_name, exhaustive=True)):
+        assert result['matched'] == evaluate_pattern(data, pattern_name)['matched']
+        if expected is not None:
+            assert not result['skipped']
+            assert {name: True for name in result['met']} | {name: False for name in result['failed']} == expected
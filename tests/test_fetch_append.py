@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+
+import fetch_data
+from bar_store import BarStore
+from test_fetch_memo import FakeYahoo, history_frame
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = BarStore(str(tmp_path / "ohlcv.sqlite"))
+    monkeypatch.setattr(fetch_data, 'get_bar_store', lambda: store)
+    monkeypatch.setattr(fetch_data, 'OFFLINE_MODE', False)
+    return store
+
+class AppendingYahoo(FakeYahoo):
+    """FakeYahoo whose start= answers are the bars from start on of a given frame"""
+
+    def __init__(self):
+        super().__init__()
+        self.latest = pd.DataFrame()
+
+    def __call__(self, stock, interval, period=None, start=None):
+        if start is not None:
+            self.calls.append('start')
+            return self.latest[self.latest.index >= start]
+        return super().__call__(stock, interval, period=period)
+
+def test_split_in_appended_bars_triggers_full_download(store, monkeypatch):
+    yahoo = AppendingYahoo()
+    monkeypatch.setattr(fetch_data, '_history', yahoo)
+    original = history_frame()
+    yahoo.answers = {'6mo': original}
+    fetch_data.fetch_stock_data('X.NS', '1d')
+
+    # Same bars re-sent without an action: the stored series is just extended
+    yahoo.latest = original
+    yahoo.calls.clear()
+    fetch_data.fetch_stock_data('X.NS', '1d')
+    assert yahoo.calls == ['start']
+
+    # A 1:2 split on the last bar halves every earlier (adjusted) price
+    adjusted = original.copy()
+    adjusted[['Open', 'High', 'Low', 'Close']] /= 2
+    adjusted.iloc[-1, adjusted.columns.get_loc('Stock Splits')] = 2.0
+    yahoo.latest = adjusted
+    yahoo.answers = {'6mo': adjusted}
+    yahoo.calls.clear()
+    data, _ = fetch_data.fetch_stock_data('X.NS', '1d')
+    assert yahoo.calls == ['start', '6mo']
+    assert data['Close'].iloc[0] == pytest.approx(original['Close'].iloc[0] / 2)
+
+    # The split is now part of the stored series and no longer forces a download
+    yahoo.calls.clear()
+    fetch_data.fetch_stock_data('X.NS', '1d')
+    assert yahoo.calls == ['start']
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+
+import fetch_data
+from bar_store import BarStore
+
+def history_frame(days=60):
+    index = pd.date_range(end=pd.Timestamp.now(tz='Asia/Kolkata').normalize(), periods=days, freq='D', name='Date')
+    close = np.linspace(100.0, 120.0, days)
+    return pd.DataFrame({
+        'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+        'Volume': np.full(days, 1000, dtype='int64'), 'Dividends': 0.0, 'Stock Splits': 0.0
+    }, index=index)
+
+class FakeYahoo:
+    """Stands in for fetch_data._history: answers per period with a frame, nothing, or an exception"""
+
+    def __init__(self):
+        self.answers = {}
+        self.calls = []
+
+    def __call__(self, stock, interval, period=None, start=None):
+        self.calls.append(period or 'start')
+        if start is not None:
+            return pd.DataFrame()
+        answer = self.answers.get(period)
+        if isinstance(answer, Exception):
+            raise answer
+        return pd.DataFrame() if answer is None else answer
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = BarStore(str(tmp_path / "ohlcv.sqlite"))
+    monkeypatch.setattr(fetch_data, 'get_bar_store', lambda: store)
+    monkeypatch.setattr(fetch_data, 'OFFLINE_MODE', False)
+    return store
+
+@pytest.fixture
+def yahoo(monkeypatch):
+    yahoo = FakeYahoo()
+    monkeypatch.setattr(fetch_data, '_history', yahoo)
+    return yahoo
+
+def test_fallback_period_memo_reprobes_the_preferred_period(store, yahoo, monkeypatch):
+    yahoo.answers = {'6mo': requests.ConnectionError("reset by peer"), '3mo': history_frame()}
+    data, has_period_issues = fetch_data.fetch_stock_data('X.NS', '1d')
+    assert not data.empty and has_period_issues
+    assert store.get_fetch_memo('X.NS', '1d')['period'] == '3mo'
+
+    # Within the re-probe window the stored fallback series is only extended
+    yahoo.calls.clear()
+    yahoo.answers['6mo'] = history_frame(120)
+    data, has_period_issues = fetch_data.fetch_stock_data('X.NS', '1d')
+    assert yahoo.calls == ['start'] and has_period_issues
+
+    # Once the memo is stale the preferred period is tried first again and wins
+    monkeypatch.setattr(fetch_data, 'PERIOD_MEMO_REPROBE_HOURS', 0)
+    yahoo.calls.clear()
+    data, has_period_issues = fetch_data.fetch_stock_data('X.NS', '1d')
+    assert yahoo.calls == ['6mo']
+    assert len(data) == 120 and not has_period_issues
+    assert store.get_fetch_memo('X.NS', '1d')['period'] == '6mo'
+    assert store.get_series_info('X.NS', '1d')['period'] == '6mo'
+
+def test_failed_requests_do_not_negative_cache(store, yahoo):
+    yahoo.answers = {period: requests.Timeout("read timed out") for period in fetch_data.get_periods_to_try('1d')}
+    data, has_period_issues = fetch_data.fetch_stock_data('X.NS', '1d')
+    assert data.empty
+    assert store.get_fetch_memo('X.NS', '1d') is None
+
+    # A clean "no bars" for every period does negative-cache the ticker
+    yahoo.answers = {}
+    fetch_data.fetch_stock_data('X.NS', '1d')
+    memo = store.get_fetch_memo('X.NS', '1d')
+    assert memo['failures'] == 1 and memo['retry_at'] is not None
+    yahoo.calls.clear()
+    assert fetch_data.fetch_stock_data('X.NS', '1d')[0].empty
+    assert yahoo.calls == []
+
+def test_batch_miss_with_failed_walk_does_not_negative_cache(store, yahoo, monkeypatch):
+    monkeypatch.setattr(fetch_data, '_download_batch', lambda tickers, interval, **kwargs: {})
+    yahoo.answers = {'6mo': requests.ConnectionError("reset by peer")}
+    results = fetch_data.fetch_stock_data_batch(['X.NS'], '1d')
+    assert results['X.NS'][0].empty
+    assert store.get_fetch_memo('X.NS', '1d') is None
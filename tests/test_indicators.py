@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+
+def bars(count=30):
+    index = pd.date_range("2024-01-01", periods=count, freq="D", tz="Asia/Kolkata")
+    close = 100 + np.arange(count, dtype=float)
+    return pd.DataFrame({
+        'Open': close - 0.5,
+        'High': close + 1.0,
+        'Low': close - 1.0,
+        'Close': close,
+        'Volume': np.full(count, 1000)
+    }, index=index)
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    indicators.clear_indicator_cache()
+    yield
+    indicators.clear_indicator_cache()
+
+def test_forming_last_bar_is_recomputed():
+    data = bars()
+    first = indicators.average_true_range(data, ticker='X.NS', interval='1d')
+
+    # Same timestamp and bar count, but the still-forming candle moved
+    moved = data.copy()
+    moved.iloc[-1, moved.columns.get_loc('High')] += 50
+    cached = indicators.average_true_range(moved, ticker='X.NS', interval='1d')
+    uncached = indicators.average_true_range(moved)
+
+    assert cached[-1] != first[-1]
+    np.testing.assert_array_equal(cached, uncached)
+
+def test_unchanged_frame_is_served_from_cache():
+    data = bars()
+    first = indicators.ema(data, span=20, ticker='X.NS', interval='1d')
+    assert indicators.ema(data.copy(), span=20, ticker='X.NS', interval='1d') is first
@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import scan_cli
+from scan_service import ScanJobs
+
+class RecordingCache:
+    """Stands in for CacheManager: no cached results, records what would be saved"""
+
+    def __init__(self):
+        self.saved = []
+
+    def get_final_results(self, pattern, interval, exchange):
+        return None
+
+    def save_final_results(self, pattern, interval, exchange, matching_stocks, stocks_with_issues, total_stocks):
+        self.saved.append((pattern, interval, exchange, total_stocks))
+
+def fake_scan_tickers(tickers, patterns, interval, exchange, **kwargs):
+    for ticker in tickers:
+        yield {
+            'ticker': ticker, 'company_name': ticker, 'data': pd.DataFrame(), 'has_period_issues': False,
+            'pattern_matches': dict.fromkeys(patterns, False),
+            'fetch_seconds': 0.0, 'name_seconds': 0.0, 'detect_seconds': 0.0
+        }
+
+@pytest.fixture
+def jobs(tmp_path, monkeypatch):
+    jobs = ScanJobs(str(tmp_path / "jobs.sqlite"))
+    monkeypatch.setattr(scan_cli, 'ScanJobs', lambda: jobs)
+    monkeypatch.setattr(scan_cli, 'get_universe', lambda exchange, offline=False: [f"T{i}.NS" for i in range(10)])
+    monkeypatch.setattr(scan_cli, 'scan_tickers', fake_scan_tickers)
+    monkeypatch.setattr(scan_cli, 'begin_scan_log', lambda pattern, interval, exchange: SimpleNamespace(scan_id=pattern))
+    monkeypatch.setattr(scan_cli, 'finish_scan_log', lambda *args, **kwargs: None)
+    return jobs
+
+def test_limited_run_is_not_cached(jobs):
+    cache = RecordingCache()
+    summary = scan_cli.run_scan("Low Volume", "1d", "NSE", cache, limit=3, log=lambda message: None)
+    assert summary['total_stocks'] == 3
+    assert cache.saved == []
+
+    scan_cli.run_scan("Low Volume", "1d", "NSE", cache, log=lambda message: None)
+    assert cache.saved == [("Low Volume", "1d", "NSE", 10)]
+
+def test_full_run_refuses_a_key_with_an_active_job(jobs):
+    cache = RecordingCache()
+    jobs.submit("Low Volume", "1d", "NSE")
+    with pytest.raises(RuntimeError):
+        scan_cli.run_scan("Low Volume", "1d", "NSE", cache, log=lambda message: None)
+    assert cache.saved == []
+
+    # A limited run writes nothing, so it does not conflict with the job
+    scan_cli.run_scan("Low Volume", "1d", "NSE", cache, limit=3, log=lambda message: None)
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+import scan_logger
+from scan_logger import begin_scan_log, finish_scan_log, get_scan_logger
+
+@pytest.fixture(autouse=True)
+def log_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(scan_logger, '_loggers', {})
+    monkeypatch.setattr(scan_logger, '_current', {})
+    monkeypatch.setattr('condition_analytics.ANALYTICS_ENABLED', False)
+    return tmp_path / scan_logger.LOG_DIR
+
+def records(log_dir):
+    path = log_dir / scan_logger.get_scan_folder_name("Low Volume", "1d", "NSE") / "pattern_scan.jsonl"
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+def test_concurrent_scans_of_one_pattern_keep_separate_logs(log_dir):
+    first = begin_scan_log("Low Volume", "1d", "NSE")
+    second = begin_scan_log("Low Volume", "1d", "NSE")
+    assert first.scan_id != second.scan_id
+
+    get_scan_logger("Low Volume", "1d", "NSE", scan_id=first.scan_id).record("A.NS", ['low_volume'])
+    get_scan_logger("Low Volume", "1d", "NSE", scan_id=second.scan_id).record("B.NS", [], ['low_volume'])
+    finish_scan_log("Low Volume", "1d", "NSE", scan_id=second.scan_id)
+    get_scan_logger("Low Volume", "1d", "NSE", scan_id=first.scan_id).record("C.NS", ['low_volume'])
+    finish_scan_log("Low Volume", "1d", "NSE", scan_id=first.scan_id)
+
+    by_scan = {}
+    for record in records(log_dir):
+        by_scan.setdefault(record['scan_id'], []).append(record['ticker'])
+    assert by_scan == {first.scan_id: ['A.NS', 'C.NS'], second.scan_id: ['B.NS']}
+    assert first.total_scanned == 2 and second.total_scanned == 1
+
+def test_resume_skips_a_scan_still_running(log_dir):
+    stopped = begin_scan_log("Low Volume", "1d", "NSE")
+    stopped.record("A.NS", ['low_volume'])
+    finish_scan_log("Low Volume", "1d", "NSE", scan_id=stopped.scan_id)
+
+    running = begin_scan_log("Low Volume", "1d", "NSE")
+    running.record("B.NS", ['low_volume'])
+    running.flush()
+
+    resumed = begin_scan_log("Low Volume", "1d", "NSE", resume=True)
+    assert resumed.scan_id == stopped.scan_id
+    assert resumed.total_scanned == 1
@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import scan_logger
+import scanner
+import universe_cache
+from scan_service import ScanJobs, run_job
+
+class FakeCache:
+    """Stands in for CacheManager: no saved progress, records final results"""
+
+    def __init__(self):
+        self.final = []
+
+    def get_progress_from_cache(self, pattern, interval, exchange):
+        return None
+
+    def save_progress_to_cache(self, *args, **kwargs):
+        return True
+
+    def save_final_results(self, pattern, interval, exchange, matching_stocks, stocks_with_issues, total_stocks):
+        self.final.append(pattern)
+
+class FakeScan:
+    def __init__(self, tickers, patterns, interval, exchange, **kwargs):
+        self.patterns = patterns
+        self.results = iter([{
+            'ticker': ticker, 'company_name': ticker, 'data': pd.DataFrame(), 'has_period_issues': False,
+            'pattern_matches': dict.fromkeys(patterns, False)
+        } for ticker in tickers])
+
+    def __iter__(self):
+        return self.results
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(universe_cache, 'get_universe', lambda exchange, offline=False: ["A.NS", "B.NS"])
+    monkeypatch.setattr(scanner, 'scan_tickers', FakeScan)
+    monkeypatch.setattr(scan_logger, 'begin_scan_log', lambda pattern, *args, **kwargs: SimpleNamespace(scan_id=pattern))
+    monkeypatch.setattr(scan_logger, 'finish_scan_log', lambda *args, **kwargs: None)
+    return ScanJobs(str(tmp_path / "jobs.sqlite"))
+
+def test_all_patterns_request_upgrades_a_queued_job(jobs):
+    plain = jobs.submit("Low Volume", "1d", "NSE")
+    joined = jobs.submit("Low Volume", "1d", "NSE", all_patterns=True)
+    assert joined['job_id'] == plain['job_id']
+    assert jobs.claim_next(1)['options'].get('all_patterns')
+
+def test_all_patterns_request_on_a_running_job_queues_a_follow_up(jobs):
+    jobs.submit("Low Volume", "1d", "NSE")
+    claimed = jobs.claim_next(1)
+    joined = jobs.submit("Low Volume", "1d", "NSE", all_patterns=True)
+    assert joined['job_id'] == claimed['job_id']
+
+    cache = FakeCache()
+    run_job(claimed, jobs, cache)
+    assert cache.final == ["Low Volume"]
+    follow_up = jobs.claim_next(1)
+    assert follow_up['job_id'] != claimed['job_id'] and follow_up['options'].get('all_patterns')
+
+    run_job(follow_up, jobs, cache)
+    assert len(cache.final) > 2 and jobs.get(follow_up['job_id'])['status'] == 'done'
@@ -0,0 +1,61 @@
+import threading
+import time
+
+import pytest
+
+import universe_cache
+from universe_cache import get_universe
+
+class SlowFetcher:
+    """Returns tickers once released, counting the downloads"""
+
+    def __init__(self, tickers):
+        self.tickers = tickers
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, exchange_filter):
+        self.calls += 1
+        self.started.set()
+        assert self.release.wait(5)
+        return self.tickers
+
+@pytest.fixture(autouse=True)
+def universe_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(universe_cache, 'UNIVERSE_DIR', str(tmp_path))
+    monkeypatch.setattr(universe_cache, 'SNAPSHOT_FILE', str(tmp_path / "missing_snapshot.json"))
+    monkeypatch.setattr(universe_cache, 'RETRY_AFTER_MINUTES', 0)
+
+def test_stale_cache_is_served_while_one_thread_refreshes():
+    get_universe("NSE", fetcher=lambda exchange: ["A.NS", "B.NS"])
+    fetcher = SlowFetcher(["A.NS", "B.NS", "C.NS"])
+    results = {}
+    refresher = threading.Thread(target=lambda: results.update(refresher=get_universe("NSE", fetcher=fetcher, ttl_hours=0)))
+    refresher.start()
+    assert fetcher.started.wait(5)
+
+    # Not blocked behind the download, and not starting a second one
+    started = time.monotonic()
+    assert get_universe("NSE", fetcher=fetcher, ttl_hours=0) == ["A.NS", "B.NS"]
+    assert time.monotonic() - started < 1
+
+    fetcher.release.set()
+    refresher.join(5)
+    assert results['refresher'] == ["A.NS", "B.NS", "C.NS"]
+    assert fetcher.calls == 1
+    assert get_universe("NSE", fetcher=fetcher) == ["A.NS", "B.NS", "C.NS"]
+
+def test_callers_without_a_cache_share_one_download():
+    fetcher = SlowFetcher(["A.NS"])
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(get_universe("NIFTY50", fetcher=fetcher))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    assert fetcher.started.wait(5)
+    time.sleep(0.1)
+    fetcher.release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == [["A.NS"]] * 4
+    assert fetcher.calls == 1
@@ -0,0 +1,174 @@
+import os
+import sys
+import json
+import threading
+from datetime import datetime, timedelta
+import pytz
+
+UNIVERSE_DIR = os.environ.get("SCANNER_UNIVERSE_DIR", os.path.join("data", "universe"))
+UNIVERSE_TTL_HOURS = float(os.environ.get("SCANNER_UNIVERSE_TTL_HOURS", "12"))
+SNAPSHOT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "universe_snapshot.json")
+
+# A refresh that returns far fewer symbols than the cached universe is treated as
+# a partial/failed upstream response and is not allowed to replace it.
+MIN_REFRESH_RATIO = 0.5
+# After a rejected or failed refresh, keep serving the cache for this long before retrying.
+RETRY_AFTER_MINUTES = 15
+
+# Guards the cache files and _refreshing; never held across a download
+_lock = threading.Lock()
+# exchange -> {'done': Event, 'tickers': list} of the refresh in flight
+_refreshing = {}
+
+def _universe_file(exchange_filter):
+    return os.path.join(UNIVERSE_DIR, f"universe_{exchange_filter.upper()}.json")
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+def _write_json(path, payload):
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    os.replace(temp_file, path)
+
+def _load_snapshot(exchange_filter):
+    snapshot = _read_json(SNAPSHOT_FILE)
+    if not snapshot:
+        return None
+    entry = snapshot.get('universes', {}).get(exchange_filter.upper())
+    if not entry or not entry.get('tickers'):
+        return None
+    return {
+        'exchange': exchange_filter.upper(),
+        'tickers': entry['tickers'],
+        'refreshed_at': entry.get('refreshed_at', snapshot.get('generated_at')),
+        'checked_at': None,
+        'source': 'snapshot'
+    }
+
+def _is_due(entry, ttl_hours, now):
+    checked_at = entry.get('checked_at')
+    if checked_at and now - datetime.fromisoformat(checked_at) < timedelta(minutes=RETRY_AFTER_MINUTES):
+        return False
+    refreshed_at = entry.get('refreshed_at')
+    if not refreshed_at:
+        return True
+    return now - datetime.fromisoformat(refreshed_at) >= timedelta(hours=ttl_hours)
+
+def _refresh(exchange_filter, fetcher, entry, path):
+    """Download the universe and cache it if it looks complete; returns the tickers to serve"""
+    try:
+        tickers = fetcher(exchange_filter)
+    except Exception as e:
+        print(f"Error refreshing {exchange_filter} universe: {e}")
+        tickers = []
+
+    now = datetime.now(pytz.UTC)
+    previous = entry or _load_snapshot(exchange_filter)
+    previous_count = len(previous['tickers']) if previous else 0
+    if tickers and len(tickers) >= previous_count * MIN_REFRESH_RATIO:
+        entry = {
+            'exchange': exchange_filter.upper(),
+            'tickers': list(dict.fromkeys(tickers)),
+            'refreshed_at': now.isoformat(),
+            'checked_at': now.isoformat(),
+            'source': 'live'
+        }
+    elif previous:
+        print(f"Keeping cached {exchange_filter} universe ({previous_count} symbols); refresh returned {len(tickers)}")
+        entry = dict(previous, checked_at=now.isoformat())
+    else:
+        return tickers
+
+    try:
+        with _lock:
+            _write_json(path, entry)
+    except Exception as e:
+        print(f"Error saving {exchange_filter} universe: {e}")
+    return entry['tickers']
+
+def get_universe(exchange_filter="NSE", fetcher=None, ttl_hours=None, force_refresh=False, offline=False):
+    """Ticker universe for exchange_filter, served from the on-disk cache while fresh.
+
+    fetcher(exchange_filter) returns the live ticker list (fetch_all_tickers by
+    default). Once the cache is older than ttl_hours the whole list is
+    downloaded again, and replaces the cached one only if it holds at least
+    MIN_REFRESH_RATIO as many symbols. One thread refreshes an exchange at a
+    time; the others keep serving the cached list meanwhile, or wait for the
+    download when there is none. Without any cache the bundled snapshot in
+    static/ is used. With offline set the cache (or snapshot) is returned
+    however old it is.
+    """
+    if fetcher is None:
+        from fetch_data import fetch_all_tickers
+        fetcher = fetch_all_tickers
+    ttl_hours = UNIVERSE_TTL_HOURS if ttl_hours is None else ttl_hours
+    path = _universe_file(exchange_filter)
+    key = exchange_filter.upper()
+
+    with _lock:
+        entry = _read_json(path)
+        if offline:
+            entry = entry if entry and entry.get('tickers') else _load_snapshot(exchange_filter)
+            return entry['tickers'] if entry else []
+        cached = entry['tickers'] if entry and entry.get('tickers') else None
+        if cached and not force_refresh and not _is_due(entry, ttl_hours, datetime.now(pytz.UTC)):
+            return cached
+        flight = _refreshing.get(key)
+        owner = flight is None
+        if owner:
+            flight = _refreshing[key] = {'done': threading.Event(), 'tickers': []}
+
+    if not owner:
+        if cached and not force_refresh:
+            return cached
+        flight['done'].wait()
+        return flight['tickers']
+
+    try:
+        flight['tickers'] = _refresh(exchange_filter, fetcher, entry, path)
+    finally:
+        with _lock:
+            del _refreshing[key]
+        flight['done'].set()
+    return flight['tickers']
+
+def get_universe_info(exchange_filter="NSE"):
+    """When the cached universe was last refreshed, how many symbols it holds and where it came from"""
+    entry = _read_json(_universe_file(exchange_filter)) or _load_snapshot(exchange_filter)
+    if not entry:
+        return None
+    return {
+        'exchange': exchange_filter.upper(),
+        'refreshed_at': datetime.fromisoformat(entry['refreshed_at']) if entry.get('refreshed_at') else None,
+        'count': len(entry.get('tickers', [])),
+        'source': entry.get('source', 'live')
+    }
+
+def write_snapshot(exchanges=("NSE", "NIFTY50", "ALL")):
+    """Copy the current cached universes into the bundled offline snapshot"""
+    snapshot = _read_json(SNAPSHOT_FILE) or {'universes': {}}
+    for exchange_filter in exchanges:
+        entry = _read_json(_universe_file(exchange_filter))
+        if entry and entry.get('tickers'):
+            snapshot['universes'][exchange_filter.upper()] = {
+                'refreshed_at': entry.get('refreshed_at'),
+                'tickers': entry['tickers']
+            }
+    snapshot['generated_at'] = datetime.now(pytz.UTC).isoformat()
+    _write_json(SNAPSHOT_FILE, snapshot)
+
+if __name__ == "__main__":
+    # python universe_cache.py snapshot  -> refresh the bundled offline snapshot
+    if len(sys.argv) > 1 and sys.argv[1] == "snapshot":
+        for exchange_filter in ("NSE", "NIFTY50", "ALL"):
+            get_universe(exchange_filter, force_refresh=True)
+        write_snapshot()
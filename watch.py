@@ -0,0 +1,263 @@
+"""Keep pattern matches current through the NSE session.
+
+    python watch.py -p "15% Reversal" -i 15m -e NSE
+
+Shortly after every bar close of the interval the universe is fetched
+incrementally (each batch request only asks for the bars after the last stored
+one), tickers whose latest bars did not change are skipped, the rest are
+re-evaluated and enter/exit events are emitted for pattern matches. Events are
+printed and appended to data/watch_events.jsonl; the current matches are kept
+in data/watch_state.json so a restarted watch does not re-announce them.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+import pytz
+
+from conditions import PATTERNS, get_pattern
+from fetch_data import OFFLINE_MODE, fetch_stock_data_batch
+from market_hours import BAR_MINUTES, MARKET_TZ, in_session, next_bar_close
+from scan_metrics import get_stage_metrics
+from scanner import DEFAULT_BATCH_SIZE, DEFAULT_MAX_WORKERS, evaluate_ticker
+from universe_cache import get_universe
+
+# Yahoo publishes a bar a little after it closes
+SETTLE_SECONDS = float(os.environ.get("SCANNER_WATCH_SETTLE", "20"))
+WATCH_STATE_FILE = os.environ.get("SCANNER_WATCH_STATE", os.path.join("data", "watch_state.json"))
+WATCH_EVENTS_FILE = os.environ.get("SCANNER_WATCH_EVENTS", os.path.join("data", "watch_events.jsonl"))
+FINGERPRINT_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+def fingerprint(data):
+    """Digest of the last two bars; the one before the newest is included because Yahoo revises it once it closes"""
+    tail = data[[column for column in FINGERPRINT_COLUMNS if column in data.columns]].tail(2)
+    digest = hashlib.sha1(tail.index.as_unit('ns').asi8.tobytes())
+    digest.update(tail.to_numpy(dtype='float64').tobytes())
+    return digest.hexdigest()
+
+class Watcher:
+    """Bar-close re-evaluation of several patterns over one (interval, exchange) universe.
+
+    on_event(event) is called for every enter/exit event in addition to the
+    events file. Matches and per-ticker fingerprints survive restarts through
+    state_file.
+    """
+
+    def __init__(self, patterns, interval="15m", exchange="NSE", max_workers=DEFAULT_MAX_WORKERS, batch_size=DEFAULT_BATCH_SIZE,
+                 offline=False, limit=None, state_file=WATCH_STATE_FILE, events_file=WATCH_EVENTS_FILE, on_event=None, log=print):
+        if interval not in BAR_MINUTES:
+            raise ValueError(f"Watch mode needs an intraday interval ({', '.join(BAR_MINUTES)}), got {interval}")
+        self.patterns = list(patterns)
+        self.interval = interval
+        self.exchange = exchange
+        self.max_workers = max(1, int(max_workers))
+        self.batch_size = max(1, int(batch_size))
+        self.offline = offline
+        self.limit = limit
+        self.state_file = state_file
+        self.events_file = events_file
+        self.on_event = on_event
+        self.log = log
+        self.matches = {pattern: {} for pattern in self.patterns}
+        self.fingerprints = {}
+        self.load_state()
+
+    def load_state(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get('interval') != self.interval or state.get('exchange') != self.exchange:
+            return
+        self.fingerprints = state.get('fingerprints', {})
+        for pattern in self.patterns:
+            self.matches[pattern] = state.get('matches', {}).get(pattern, {})
+        # A pattern added since the last run has no matches yet, so every ticker needs evaluating once
+        if set(self.patterns) - set(state.get('matches', {})):
+            self.fingerprints = {}
+
+    def save_state(self):
+        directory = os.path.dirname(self.state_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        temp_file = f"{self.state_file}.{os.getpid()}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'interval': self.interval,
+                    'exchange': self.exchange,
+                    'updated_at': datetime.now(pytz.UTC).isoformat(),
+                    'matches': self.matches,
+                    'fingerprints': self.fingerprints
+                }, f)
+            os.replace(temp_file, self.state_file)
+        except Exception as e:
+            print(f"Error saving watch state: {e}")
+
+    def universe(self):
+        tickers = get_universe(self.exchange, offline=self.offline)
+        return tickers[:self.limit] if self.limit else tickers
+
+    def _fetch_and_evaluate(self, tickers):
+        """Fetch one batch and evaluate the tickers whose latest bars changed; runs in a worker thread"""
+        with get_stage_metrics().time('fetch'):
+            fetched = fetch_stock_data_batch(tickers, self.interval, chunk_size=len(tickers), offline=self.offline)
+        evaluated = []
+        for ticker in tickers:
+            data, has_period_issues = fetched.get(ticker, (None, False))
+            if data is None or data.empty:
+                continue
+            digest = fingerprint(data)
+            if self.fingerprints.get(ticker) == digest:
+                continue
+            evaluated.append((digest, evaluate_ticker(ticker, data, has_period_issues, self.patterns, self.interval, self.exchange)))
+        return evaluated
+
+    def _events_for(self, result):
+        data = result['data']
+        bar = data.index[-1].isoformat()
+        close = float(data['Close'].iloc[-1])
+        events = []
+        for pattern, matched in result['pattern_matches'].items():
+            current = self.matches[pattern]
+            ticker = result['ticker']
+            if matched == (ticker in current):
+                if matched:
+                    current[ticker]['last_bar'] = bar
+                continue
+            if matched:
+                current[ticker] = {'since': bar, 'last_bar': bar}
+            else:
+                del current[ticker]
+            events.append({
+                'time': datetime.now(pytz.UTC).isoformat(),
+                'event': 'enter' if matched else 'exit',
+                'pattern': pattern,
+                'interval': self.interval,
+                'exchange': self.exchange,
+                'ticker': ticker,
+                'company_name': result['company_name'],
+                'bar': bar,
+                'close': close
+            })
+        return events
+
+    def emit(self, event):
+        self.log(f"{event['event'].upper():<5} {event['pattern']}: {event['ticker']} ({event['company_name']}) "
+                 f"at {event['close']:.2f}, bar {event['bar']}")
+        try:
+            directory = os.path.dirname(self.events_file)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            with open(self.events_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(event) + "\n")
+        except Exception as e:
+            print(f"Error writing watch event: {e}")
+        if self.on_event:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                print(f"Error in watch event listener: {e}")
+
+    def run_cycle(self, tickers, bar_close=None):
+        """Fetch the universe once, re-evaluate the changed tickers and emit events; returns a cycle summary"""
+        started = time.perf_counter()
+        evaluated = 0
+        events = []
+        chunks = [tickers[start:start + self.batch_size] for start in range(0, len(tickers), self.batch_size)]
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="watch") as executor:
+            for future in as_completed([executor.submit(self._fetch_and_evaluate, chunk) for chunk in chunks]):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    print(f"Error in watch batch: {e}")
+                    continue
+                for digest, result in results:
+                    evaluated += 1
+                    self.fingerprints[result['ticker']] = digest
+                    for event in self._events_for(result):
+                        events.append(event)
+                        self.emit(event)
+        self.save_state()
+        seconds = time.perf_counter() - started
+        return {
+            'bar_close': bar_close.isoformat() if bar_close else None,
+            'tickers': len(tickers),
+            'evaluated': evaluated,
+            'events': len(events),
+            'matches': {pattern: len(current) for pattern, current in self.matches.items()},
+            'seconds': seconds,
+            'overran': seconds > BAR_MINUTES[self.interval] * 60
+        }
+
+    def report(self, cycle):
+        matches = ", ".join(f"{pattern}: {count}" for pattern, count in cycle['matches'].items())
+        self.log(f"Cycle {cycle['bar_close'] or 'catch-up'}: {cycle['evaluated']}/{cycle['tickers']} re-evaluated, "
+                 f"{cycle['events']} events, {cycle['seconds']:.1f}s ({matches})")
+        if cycle['overran']:
+            self.log(f"Warning: cycle took longer than one {self.interval} bar; raise --workers or --batch-size")
+
+    def run(self, once=False, stop_event=None):
+        """Catch up immediately, then run a cycle after every bar close until stop_event is set"""
+        stop_event = stop_event or threading.Event()
+        tickers = self.universe()
+        if not tickers:
+            raise RuntimeError(f"No tickers available for {self.exchange}")
+        day = datetime.now(MARKET_TZ).date()
+        self.log(f"Watching {len(tickers)} {self.exchange} tickers on {self.interval} for {', '.join(self.patterns)}")
+        self.report(self.run_cycle(tickers))
+        while not once:
+            close = next_bar_close(self.interval)
+            wake = close + timedelta(seconds=SETTLE_SECONDS)
+            if not in_session():
+                self.log(f"Market closed; next bar closes at {close:%Y-%m-%d %H:%M %Z}")
+            if stop_event.wait(max(0.0, (wake - datetime.now(MARKET_TZ)).total_seconds())):
+                break
+            if close.date() != day:
+                day = close.date()
+                tickers = self.universe() or tickers
+            self.report(self.run_cycle(tickers, bar_close=close))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Re-evaluate patterns at every bar close during NSE trading hours.")
+    parser.add_argument("-p", "--pattern", action="append", help="Pattern name (repeatable, default: every pattern)")
+    parser.add_argument("-i", "--interval", choices=list(BAR_MINUTES), default="15m")
+    parser.add_argument("-e", "--exchange", choices=["NSE", "NIFTY50", "ALL"], default="NSE")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_MAX_WORKERS, help="Concurrent fetch/evaluate workers")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Tickers per download batch")
+    parser.add_argument("--offline", action="store_true", default=OFFLINE_MODE, help="Use locally stored bars only")
+    parser.add_argument("--limit", type=int, help="Watch only the first N tickers of the universe")
+    parser.add_argument("--once", action="store_true", help="Run a single cycle and exit")
+    parser.add_argument("--state", default=WATCH_STATE_FILE, help="Watch state file")
+    parser.add_argument("--events", default=WATCH_EVENTS_FILE, help="JSON lines file the enter/exit events are appended to")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    patterns = []
+    for name in args.pattern or [pattern.name for pattern in PATTERNS.values()]:
+        pattern = get_pattern(name)
+        if pattern is None:
+            print(f"Unknown pattern: {name}. Choose from: {', '.join(p.name for p in PATTERNS.values())}")
+            return 2
+        patterns.append(pattern.name)
+
+    watcher = Watcher(patterns, args.interval, args.exchange, max_workers=args.workers, batch_size=args.batch_size,
+                      offline=args.offline, limit=args.limit, state_file=args.state, events_file=args.events)
+    try:
+        watcher.run(once=args.once)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"Error watching {args.exchange} {args.interval}: {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())